@@ -0,0 +1,89 @@
+"""
+Directory copy throughput: shutil.copytree (the previous copy_directory)
+against the fast mode of FileService.copy_directory, with and without hardlinks.
+
+The tree mimics a virtualenv: many small files and a few large ones. Run with
+`make bench` or `uv run python benchmarks/bench_copy_directory.py [--folder DIR]`,
+the folder decides the filesystem and therefore which strategies are available.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from basic_ci.schemes.copy_report import Copy_report
+from basic_ci.services.file_service import FileService
+
+
+def make_tree(root: Path, small_files: int, large_files: int) -> int:
+    """Creates the source tree and returns its size in bytes."""
+    size = 0
+    for i in range(small_files):
+        folder = root / f"package{i // 100}"
+        folder.mkdir(parents=True, exist_ok=True)
+        data = os.urandom(512 + (i * 997) % 16384)
+        (folder / f"module{i}.py").write_bytes(data)
+        size += len(data)
+    for i in range(large_files):
+        data = os.urandom(8 * 1024 * 1024)
+        (root / f"library{i}.so").write_bytes(data)
+        size += len(data)
+    return size
+
+
+def measure(
+    methods: Dict[str, Callable[[Path], Optional[Copy_report]]], work: Path, size: int, repeat: int
+) -> None:
+    """
+    Runs the methods in turns and prints the best time of each. Dirty pages are
+    written back before every copy so one copy does not pay for the previous one.
+    """
+    best = {name: float("inf") for name in methods}
+    reports: Dict[str, Optional[Copy_report]] = {}
+    for i in range(repeat):
+        for name, copy in methods.items():
+            target = work / f"copy-{i}"
+            os.sync()
+            start = time.perf_counter()
+            reports[name] = copy(target)
+            best[name] = min(best[name], time.perf_counter() - start)
+            shutil.rmtree(target)
+    for name in methods:
+        report = reports[name]
+        used = f"  {report.strategies}" if report is not None else ""
+        print(f"  {name:<18} {best[name] * 1000:9.1f} ms  {size / best[name] / 1e6:9.1f} MB/s{used}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--small-files", type=int, default=3000)
+    parser.add_argument("--large-files", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--folder", type=Path, default=None)
+    args = parser.parse_args()
+
+    file_service = FileService()
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        work = Path(folder)
+        source = work / "source"
+        size = make_tree(source, args.small_files, args.large_files)
+        print(f"{args.small_files} small and {args.large_files} large files, {size / 1e6:.1f} MB in {work}")
+        measure(
+            {
+                "copytree": lambda target: file_service.copy_directory(source, target),
+                "fast": lambda target: file_service.copy_directory(source, target, fast=True),
+                "fast, 1 worker": lambda target: file_service.copy_directory(
+                    source, target, fast=True, workers=1
+                ),
+                "fast, hardlink": lambda target: file_service.copy_directory(
+                    source, target, fast=True, hardlink=True
+                ),
+            },
+            work, size, args.repeat,
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Encode/decode throughput of TaskResult: the typed codec against the previous
+dataclasses.asdict + json.dump(default=str) / TaskResult(**dict) approach.
+
+Run with `make bench` or `uv run python benchmarks/bench_task_result_codec.py`.
+"""
+import argparse
+import json
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Callable
+
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.task_result_codec import decode_task_result, encode_task_result
+from basic_ci.schemes.TaskResult import TaskResult
+
+
+def large_run(stages: int, output_bytes: int) -> TaskResult:
+    """A run with many stages, each with timing data and output_bytes of output."""
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    line = "tests/test_module.py::test_case PASSED                       [ 42%]\n"
+    output = (line * (output_bytes // len(line) + 1))[:output_bytes]
+    return TaskResult(
+        run_id="0123456789abcdef01234567",
+        repo_url="https://github.com/owner/repo",
+        branch="main",
+        commit_sha="0" * 40,
+        status="success",
+        started_at=start,
+        finished_at=start + timedelta(minutes=15),
+        stages=[
+            Stage_result(
+                name=f"stage {i}", success=True, command="make test", output=output,
+                log_file=f"{i:02d}_stage_{i}.log.gz", started_at=start + timedelta(seconds=i),
+                finished_at=start + timedelta(seconds=i + 1), exit_code=0, wall_time=1.0,
+                user_time=0.8, sys_time=0.1, max_rss_kb=65536,
+            )
+            for i in range(stages)
+        ],
+        summary="pipeline ran without errors",
+        phase_timings={"setup": 0.01, "clone": 1.2, "stages": 880.0, "teardown": 0.3},
+    )
+
+
+def old_encode(task_result: TaskResult) -> bytes:
+    return json.dumps(asdict(task_result), indent=2, default=str).encode()
+
+
+def old_decode(data: bytes) -> TaskResult:
+    task_result_dict = json.loads(data)
+    task_result = TaskResult(**task_result_dict)
+    task_result.stages = [Stage_result(**stage) for stage in task_result_dict["stages"]]
+    return task_result
+
+
+def measure(name: str, function: Callable[[], object], size: int, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<14} {best * 1000:9.2f} ms  {size / best / 1e6:9.1f} MB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for output_bytes in (0, 64 * 1024):
+        task_result = large_run(args.stages, output_bytes)
+        old_data = old_encode(task_result)
+        new_data = encode_task_result(task_result)
+        assert decode_task_result(new_data) == task_result
+        print(f"{args.stages} stages with {output_bytes} bytes of output each "
+              f"(old {len(old_data) / 1e6:.2f} MB, codec {len(new_data) / 1e6:.2f} MB)")
+        measure("old encode", lambda: old_encode(task_result), len(old_data), args.repeat)
+        measure("codec encode", lambda: encode_task_result(task_result), len(new_data), args.repeat)
+        measure("old decode", lambda: old_decode(old_data), len(old_data), args.repeat)
+        measure("codec decode", lambda: decode_task_result(new_data), len(new_data), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from starlette.templating import _TemplateResponse
 
+from basic_ci.schemes.log_page import Log_page
+from basic_ci.schemes.run_summary import Run_page
+from basic_ci.services.log_stream_service import (
+    Log_stream_service,
+    get_Log_stream_service,
+)
+from basic_ci.services.page_cache import Page_cache, get_Page_cache
 from basic_ci.services.read_results_service import (
     Read_results_service,
     get_Read_results_service,
@@ -12,57 +25,297 @@ templates = Jinja2Templates(directory="src/basic_ci/templates")
 
 
 
-@router.get("/runs/{run_id}")
-def run_details_page(request: Request, run_id: str, db: Read_results_service = Depends(get_Read_results_service)) -> _TemplateResponse:
+# finished runs never change, running runs have to be revalidated on every view
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if the If-None-Match header (a list of, possibly weak, ETags or *) matches etag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _http_date(value: object) -> Optional[str]:
+    if not value:
+        return None
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+@router.get("/runs/{run_id}", response_model=None)
+def run_details_page(
+    request: Request,
+    run_id: str,
+    db: Read_results_service = Depends(get_Read_results_service),
+    page_cache: Page_cache = Depends(get_Page_cache),
+) -> Response:
     """
     Endpoint to render the details page for a specific run.
+
+    The page carries a strong ETag derived from the run's saved summary. Pages of
+    finished runs are immutable: a matching If-None-Match is answered with 304 from
+    the remembered ETag without reading the run, and the rendered HTML of the most
+    viewed finished runs is served from the Page_cache.
+
     Args:
         request (Request): The incoming HTTP request, required for template rendering.
         run_id (str): The ID of the run to display details for.
         db (Read_results_service, optional): Dependency-injected service to read results. Defaults to get_Read_results_service().
+        page_cache (Page_cache): Dependency-injected cache of finished run pages.
     Returns:
-        _TemplateResponse: The rendered HTML page with run details.
+        Response: The rendered HTML page with run details, or 304 Not Modified.
     """
-    task_result = db.get_task_result(run_id)
-    if not task_result:
+    if_none_match = request.headers.get("if-none-match")
+    known_etag = page_cache.etag(run_id)
+    if known_etag is not None and _etag_matches(if_none_match, known_etag):
+        page_cache.count_not_modified()
+        return Response(
+            status_code=304, headers={"ETag": known_etag, "Cache-Control": IMMUTABLE}
+        )
+    cached_page = page_cache.page(run_id)
+    if cached_page is not None:
+        headers, body = cached_page
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+
+    # stage logs are loaded by the page on demand, see stage_log
+    try:
+        task_result, etag = db.get_task_result_and_etag(run_id)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
 
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if task_result.is_finished() else REVALIDATE,
+    }
+    last_modified = _http_date(task_result.finished_at or task_result.started_at)
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
     # Render HTML page
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "run_details.html",
         {
             "request": request,     # REQUIRED by Jinja2Templates
             "run": task_result,     # pass TaskResult to template
         },
+        headers=headers,
     )
+    if task_result.is_finished():
+        page_cache.put(run_id, headers, bytes(response.body))
+    return response
+
+
+class Run_filters:
+    """
+    Query parameters shared by the HTML and the JSON run listing.
+    """
+    def __init__(
+        self,
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        branch: Optional[str] = None,
+        status: Optional[str] = None,
+        commit_sha: Optional[str] = None,
+    ) -> None:
+        self.limit = limit
+        # the filter form submits empty fields for filters that are not set
+        self.cursor = cursor or None
+        self.branch = branch or None
+        self.status = status or None
+        self.commit_sha = commit_sha or None
+
+    def query_params(self) -> dict[str, str]:
+        """Returns the filters that are set (without limit and cursor) for building links."""
+        params = {"branch": self.branch, "status": self.status, "commit_sha": self.commit_sha}
+        return {key: value for key, value in params.items() if value}
+
+
+def _get_run_page(db: Read_results_service, filters: Run_filters) -> Run_page:
+    try:
+        return db.get_runs(
+            limit=filters.limit,
+            cursor=filters.cursor,
+            branch=filters.branch,
+            status=filters.status,
+            commit_sha=filters.commit_sha,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/runs")
 def runs_overview_page(
     request: Request, 
+    filters: Run_filters = Depends(),
     db: Read_results_service = Depends(get_Read_results_service)
 ) -> _TemplateResponse:
     """
-    Endpoint to render an overview page of all pipeline runs.
+    Endpoint to render an overview page of the pipeline runs, one page at a time.
     
     Args:
         request (Request): The incoming HTTP request, required for template rendering.
+        filters (Run_filters): limit, cursor and the branch/status/commit_sha filters.
         db (Read_results_service): Dependency-injected service to read results.
     
     Returns:
-        _TemplateResponse: The rendered HTML page with all runs.
+        _TemplateResponse: The rendered HTML page with one page of runs.
     """
-    all_runs = db.get_all_runs()
-    sorted_runs = sorted(
-        all_runs, 
-        key=lambda x: x.started_at if x.started_at else "", 
-        reverse=True
-    )
+    page = _get_run_page(db, filters)
     
     return templates.TemplateResponse(
         "all_runs.html",
         {
             "request": request,
-            "runs": sorted_runs,
+            "runs": page.runs,
+            "next_cursor": page.next_cursor,
+            "filters": filters,
         },
     )
+
+
+@router.get("/api/runs")
+def runs_overview_json(
+    filters: Run_filters = Depends(),
+    db: Read_results_service = Depends(get_Read_results_service)
+) -> Run_page:
+    """
+    JSON variant of the run overview for scripts, accepts the same query parameters as /runs.
+
+    Args:
+        filters (Run_filters): limit, cursor and the branch/status/commit_sha filters.
+        db (Read_results_service): Dependency-injected service to read results.
+
+    Returns:
+        Run_page: The runs of the page and the cursor of the next page.
+    """
+    return _get_run_page(db, filters)
+
+
+@router.get("/runs/{run_id}/stages/{stage_name}/log/stream")
+def stage_log_stream(
+    run_id: str,
+    stage_name: str,
+    offset: int = Query(0, ge=0),
+    last_event_id: Optional[str] = Header(None),
+    db: Read_results_service = Depends(get_Read_results_service),
+    log_stream: Log_stream_service = Depends(get_Log_stream_service),
+) -> StreamingResponse:
+    """
+    Streams the output of a stage as Server-Sent Events while it is produced.
+
+    The id of every event is the byte offset after its data. A viewer starts at
+    `offset`, a reconnecting EventSource continues at its Last-Event-ID. The stream
+    ends with an `end` event once the run is saved.
+
+    Args:
+        run_id (str): The ID of the run.
+        stage_name (str): Name of the stage as defined in the pipeline.
+        offset (int): Byte offset in the log to start at. Defaults to 0.
+        last_event_id (Optional[str]): Sent by a reconnecting EventSource, overrides offset.
+        db (Read_results_service): Dependency-injected service to read results.
+        log_stream (Log_stream_service): Dependency-injected shared log streamer.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+    """
+    if last_event_id is not None and last_event_id.isdigit():
+        offset = int(last_event_id)
+    try:
+        log_path = db.stage_log_path(run_id, stage_name)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"No log for stage '{stage_name}' of run '{run_id}'"
+        )
+
+    return StreamingResponse(
+        log_stream.events(log_path, offset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single byte range ("bytes=a-b", "bytes=a-" or "bytes=-n") of a Range header.
+
+    Returns:
+        Optional[Tuple[int, int]]: First and last byte (inclusive), None if the header
+        is not a single byte range and should be ignored.
+
+    Raises:
+        HTTPException: 416 if the range lies outside the log.
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header)
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.get("/runs/{run_id}/stages/{stage_name}/log", response_model=None)
+def stage_log(
+    run_id: str,
+    stage_name: str,
+    offset: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: Read_results_service = Depends(get_Read_results_service),
+) -> Response | Log_page:
+    """
+    The output of a stage as plain text, without loading the whole log.
+
+    Supports a single HTTP byte range (206 Partial Content). With `limit` a window
+    of lines is returned as JSON instead: `limit` lines from line `offset` on, or
+    the last `limit` lines if no offset is given.
+
+    Args:
+        run_id (str): The ID of the run.
+        stage_name (str): Name of the stage as defined in the pipeline.
+        offset (Optional[int]): Number of the first line (0 based) of the line window.
+        limit (Optional[int]): Number of lines of the line window.
+        range_header (Optional[str]): The Range header of the request.
+        db (Read_results_service): Dependency-injected service to read results.
+
+    Returns:
+        Union[Response, Log_page]: The (partial) log, or the requested lines.
+    """
+    try:
+        log_path = db.stage_log_path(run_id, stage_name)
+    except FileNotFoundError:
+        log_path = None
+    if log_path is None or not log_path.exists():
+        raise HTTPException(
+            status_code=404, detail=f"No log for stage '{stage_name}' of run '{run_id}'"
+        )
+
+    log_index = db.log_store.index(log_path)
+    if limit is not None:
+        return db.log_store.read_lines(log_path, offset, limit, log_index=log_index)
+
+    byte_range = _parse_range(range_header, log_index.size) if range_header else None
+    start, end = byte_range or (0, log_index.size - 1)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{log_index.size}"
+    return StreamingResponse(
+        db.log_store.iter_range(log_path, start, end + 1, log_index=log_index),
+        status_code=206 if byte_range is not None else 200,
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
+    )
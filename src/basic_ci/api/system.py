@@ -1,6 +1,29 @@
 from importlib.metadata import PackageNotFoundError, version
+from typing import Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from basic_ci.services.github_rate_limit import (
+    Rate_limit_budget,
+    get_Rate_limit_budget,
+)
+from basic_ci.services.notification_outbox_service import (
+    Notification_outbox,
+    get_Notification_outbox,
+)
+from basic_ci.services.page_cache import Page_cache, get_Page_cache
+from basic_ci.services.task_result_cache import (
+    Task_result_cache,
+    get_Task_result_cache,
+)
+from basic_ci.services.workspace_pool_service import (
+    Workspace_pool,
+    get_Workspace_pool,
+)
+from basic_ci.services.workspace_reaper_service import (
+    Workspace_reaper,
+    get_Workspace_reaper,
+)
 
 router = APIRouter(tags=["system"])
 
@@ -16,4 +39,26 @@ def get_version() -> dict[str, str]:
 @router.get("/health")
 def get_health() -> dict[str, str]:
     """Health check endpoint."""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/metrics")
+def get_metrics(
+    result_cache: Task_result_cache = Depends(get_Task_result_cache),
+    page_cache: Page_cache = Depends(get_Page_cache),
+    workspace_pool: Optional[Workspace_pool] = Depends(get_Workspace_pool),
+    workspace_reaper: Workspace_reaper = Depends(get_Workspace_reaper),
+    notification_outbox: Optional[Notification_outbox] = Depends(get_Notification_outbox),
+    github_rate_limit: Rate_limit_budget = Depends(get_Rate_limit_budget),
+) -> dict[str, dict[str, int]]:
+    """Counters of the in-process caches, e.g. hits and misses of the run result cache."""
+    metrics = {
+        "result_cache": result_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "workspace_reaper": workspace_reaper.stats(),
+        "github_rate_limit": github_rate_limit.stats(),
+    }
+    if workspace_pool is not None:
+        metrics["workspace_pool"] = workspace_pool.stats()
+    if notification_outbox is not None:
+        metrics["notification_outbox"] = notification_outbox.stats()
+    return metrics
@@ -1,22 +1,34 @@
+import time
 from typing import Annotated
 
 from fastapi import APIRouter, Header
 from fastapi.params import Depends
 
+from basic_ci.core.run_queue import RunQueue, get_RunQueue
 from basic_ci.core.signature import Signature_verifier, get_signature_verifier
 from basic_ci.schemes.push_payload import Push_payload
-from basic_ci.schemes.TaskResult import TaskResult
 from basic_ci.services.task_service import TaskService, get_TaskService
 
 router = APIRouter(tags=["webhook"])
 
-@router.post("/webhook")
-async def handle_webhook(
+@router.post("/webhook", status_code=202)
+def handle_webhook(
     push_payload: Push_payload,  
     verifier: Annotated[Signature_verifier, Depends(get_signature_verifier)],
     task_service: Annotated[TaskService, Depends(get_TaskService)],
+    run_queue: Annotated[RunQueue, Depends(get_RunQueue)],
     x_hub_signature_256: str = Header(...), 
-) -> TaskResult:
-    """Verifyies Signature and extract payload from incoming github webhook payloads."""
+) -> dict[str, str]:
+    """
+    Verifyies Signature and extract payload from incoming github webhook payloads.
+    The run is only queued here, it is executed by the RunQueue workers.
+    The pending status is reported afterwards, so it never keeps the run from
+    being queued, with the time the run was queued so the outbox drops it if the
+    run already reported. The handler is sync as the outbox writes to SQLite.
+    """
     print(f"Received webhook for repo: {push_payload.repository.full_name}")
-    return task_service.run_task(push_payload)
\ No newline at end of file
+    task = task_service.create_task(push_payload)
+    queued_at = time.time()
+    run_queue.enqueue(task)
+    task_service.report_queued(task, queued_at)
+    return {"run_id": task.run_id, "status": "queued"}
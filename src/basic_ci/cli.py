@@ -0,0 +1,64 @@
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence
+
+from basic_ci.core.config import get_settings
+from basic_ci.services.read_results_service import get_Read_results_service
+from basic_ci.services.result_save_service import get_Results_save_service
+from basic_ci.services.run_index_service import get_Run_index_service
+
+
+def reindex() -> int:
+    """
+    Rebuilds the run index from the result folders in SAVE_FOLDER.
+
+    Returns:
+        int: Number of indexed runs.
+    """
+    settings = get_settings()
+    run_index = get_Run_index_service(settings=settings)
+    reader = get_Read_results_service(settings=settings)
+    return run_index.rebuild(reader.scan_saved_runs())
+
+
+def migrate() -> int:
+    """
+    Converts all runs saved in the old single taskResult.json format into
+    summary.json plus compressed stage logs. Runs that are already migrated
+    are left alone, so the command can safely be run more than once.
+
+    Returns:
+        int: Number of migrated runs.
+    """
+    settings = get_settings()
+    saver = get_Results_save_service(settings=settings)
+    save_folder = Path(settings.SAVE_FOLDER)
+    if not save_folder.exists():
+        return 0
+    return sum(
+        saver.migrate_legacy_run(run_folder)
+        for run_folder in save_folder.iterdir()
+        if run_folder.is_dir()
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Maintenance commands for the CI server, e.g. `python -m basic_ci.cli reindex`.
+    """
+    parser = argparse.ArgumentParser(prog="basic_ci")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("reindex", help="rebuild the run index from SAVE_FOLDER")
+    subparsers.add_parser(
+        "migrate", help="convert taskResult.json results into summary.json and compressed logs"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "reindex":
+        print(f"Indexed {reindex()} runs")
+    elif args.command == "migrate":
+        print(f"Migrated {migrate()} runs")
+
+
+if __name__ == "__main__":
+    main()
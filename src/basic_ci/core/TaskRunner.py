@@ -1,13 +1,26 @@
+import logging
 import tempfile
+import time
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
 
 from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.stage_result import Stage_result
 from basic_ci.schemes.task import Task
 from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.dependency_cache_service import (
+    Dependency_cache,
+    get_Dependency_cache,
+)
 from basic_ci.services.file_service import FileService, get_FileService
 from basic_ci.services.gitclone_service import GitcloneService, get_GitCloneService
+from basic_ci.services.github_rate_limit import Rate_limited
+from basic_ci.services.notification_outbox_service import (
+    Notification_outbox,
+    get_Notification_outbox,
+)
 from basic_ci.services.notification_service import (
     NotificationService,
     get_NotificationService,
@@ -20,7 +33,21 @@ from basic_ci.services.result_save_service import (
     Results_save_service,
     get_Results_save_service,
 )
+from basic_ci.services.run_index_service import (
+    Run_index_service,
+    get_Run_index_service,
+)
 from basic_ci.services.ServiceCommand import ServiceCommand, get_ServiceCommand
+from basic_ci.services.workspace_pool_service import (
+    Workspace_pool,
+    get_Workspace_pool,
+)
+from basic_ci.services.workspace_reaper_service import (
+    Workspace_reaper,
+    get_Workspace_reaper,
+)
+
+logger = logging.getLogger(__name__)
 
 """
 - Get Task Object from Task Service
@@ -31,6 +58,15 @@ Create TaskResult object.
 Send TaskResult Object to Notification Service
 """
 
+@contextmanager
+def _timed(phase_timings: Dict[str, float], phase: str) -> Iterator[None]:
+    """Adds the wall-clock seconds spent in the with block to phase_timings[phase]."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        phase_timings[phase] = phase_timings.get(phase, 0.0) + time.monotonic() - start
+
 class TaskRunner:
     """
     Run the actual task itself, by coordinating the other basic_ci services.
@@ -41,7 +77,12 @@ class TaskRunner:
                 git_service: GitcloneService , 
                 pipeline_stage_service: Pipeline_stage_service,
                 result_saver: Results_save_service,
-                settings: Settings = get_settings()
+                settings: Settings = get_settings(),
+                build_cache: Optional[Run_index_service] = None,
+                dependency_cache: Optional[Dependency_cache] = None,
+                workspace_pool: Optional[Workspace_pool] = None,
+                workspace_reaper: Optional[Workspace_reaper] = None,
+                notification_outbox: Optional[Notification_outbox] = None,
                 ):
         self.file_service = file_service
         self.service_command = service_command
@@ -50,6 +91,16 @@ class TaskRunner:
         self.pipeline_stage_service = pipeline_stage_service
         self.result_saver = result_saver
         self.settings = settings
+        # None disables reusing results of identical trees
+        self.build_cache = build_cache
+        # None runs every stage without a shared package cache
+        self.dependency_cache = dependency_cache
+        # None creates, clones and deletes a fresh workspace for every run
+        self.workspace_pool = workspace_pool
+        # None deletes fresh workspaces in the run instead of in the background
+        self.workspace_reaper = workspace_reaper
+        # None sends the GitHub status in the run instead of in the background
+        self.notification_outbox = notification_outbox
 
     def run_task(self,task: Task) ->TaskResult:
         """
@@ -58,35 +109,87 @@ class TaskRunner:
         OUT: TaskResult (object)
         """
         started_at = datetime.now()
+        build_key = self._build_key(task)
+        if build_key is not None:
+            reused_run_id = self.build_cache.find_build(*build_key) if self.build_cache else None
+            if reused_run_id is not None:
+                return self._reuse_result(task, reused_run_id, started_at)
 
-        temp_dir = Path(tempfile.gettempdir())
-        task_folder = self.file_service.create_folder(temp_dir / task.run_id)
+        phase_timings: Dict[str, float] = {}
+        running_result = TaskResult(
+            run_id=task.run_id,
+            repo_url=task.repo_url,
+            branch=task.branch,
+            commit_sha=task.commit_sha,
+            status="running",
+            started_at=started_at,
+            details_url=self.settings.RESULTS_URL_TEMPLATE.format(run_id=task.run_id),
+            tree_id=task.tree_id,
+        )
+        # makes the run visible in /runs and its stage logs streamable right away
+        self.result_saver.save_task_result(running_result)
+
+        with _timed(phase_timings, "setup"):
+            task_folder = self._create_workspace(task)
         
-        self.git_service.clone_repo(task.commit_sha, str(task_folder))
+        try:
+            with _timed(phase_timings, "clone"):
+                self._checkout(task, task_folder)
+        except Exception as e:
+            # do not leave a half cloned workspace behind for the next run
+            self._release_workspace(task_folder)
+            self._save_error(running_result, phase_timings, f"cloning the repository failed: {e}")
+            raise
 
+        # every path from here on returns the workspace, a leaked pooled one blocks later runs
         try:
-            stage_results = self.pipeline_stage_service.run_stages(task_folder)
-        except FileNotFoundError as e:
-            stage_results=[]
-            status = "failure"
-            summary = f"pipeline.yaml not found: {e}"
-        except ValueError as e:
-            stage_results=[]
-            status = "failure"
-            summary = f"pipeline.yaml contains erros: {e}"
-
-        for stage_result in stage_results:
-            if not stage_result.success:
+            dependency_key: Optional[str] = None
+            env: Dict[str, str] = {}
+            if self.dependency_cache is not None:
+                with _timed(phase_timings, "dependencies"):
+                    env = self.dependency_cache.environment()
+                    dependency_key = self.dependency_cache.key(task_folder)
+                    if dependency_key is not None:
+                        self.dependency_cache.restore_venv(task_folder, dependency_key)
+
+            try:
+                with _timed(phase_timings, "stages"), self._dependencies_in_use():
+                    stage_results = self.pipeline_stage_service.run_stages(
+                        task_folder,
+                        log_folder=Path(self.settings.SAVE_FOLDER) / task.run_id / "logs",
+                        env=env or None,
+                        on_progress=self._stage_progress(task),
+                    )
+            except FileNotFoundError as e:
+                stage_results=[]
                 status = "failure"
-                summary = f" Stage {stage_result.name} failed"
-                break
-        else:
-            if len(stage_results):
-                status = "success"
-                summary = "pipeline ran without errors"
+                summary = f"pipeline.yaml not found: {e}"
+            except ValueError as e:
+                stage_results=[]
+                status = "failure"
+                summary = f"pipeline.yaml contains erros: {e}"
+
+            for stage_result in stage_results:
+                if stage_result.is_failure():
+                    status = "failure"
+                    summary = f" Stage {stage_result.name} failed"
+                    break
+            else:
+                if len(stage_results):
+                    status = "success"
+                    summary = "pipeline ran without errors"
 
-        if temp_dir.exists():
-            self.file_service.delete_folder(task_folder) 
+            with _timed(phase_timings, "teardown"):
+                if self.dependency_cache is not None and dependency_key is not None and status == "success":
+                    self.dependency_cache.save_venv(task_folder, dependency_key)
+        except BaseException as e:
+            # do not leave the run "running" forever in /runs and its log streams
+            self._save_error(running_result, phase_timings, f"running the pipeline failed: {e!r}")
+            raise
+        finally:
+            with _timed(phase_timings, "teardown"):
+                self._release_workspace(task_folder)
+                self._evict_dependencies()
 
         finished_at = datetime.now()
         task_result = TaskResult(
@@ -99,11 +202,166 @@ class TaskRunner:
             finished_at=finished_at,
             stages = stage_results,
             summary=summary,
-            details_url=self.settings.RESULTS_URL_TEMPLATE.format(run_id=task.run_id)
+            details_url=self.settings.RESULTS_URL_TEMPLATE.format(run_id=task.run_id),
+            phase_timings=phase_timings,
+            tree_id=task.tree_id,
         )
         
         self.result_saver.save_task_result(task_result)
-        self.notification_service.send_github_status(task_result)
+        if build_key is not None and self.build_cache is not None and task_result.is_success():
+            self.build_cache.remember_build(*build_key, task.run_id)
+        self._notify(task_result)
+        return task_result
+
+    def _save_error(self, running_result: TaskResult, phase_timings: Dict[str, float], summary: str) -> None:
+        """
+        Saves and reports the final result of a run that was aborted by an
+        exception, so the commit does not stay pending on GitHub.
+        """
+        running_result.status = "error"
+        running_result.finished_at = datetime.now()
+        running_result.summary = summary
+        running_result.phase_timings = phase_timings
+        self.result_saver.save_task_result(running_result)
+        self._notify(running_result)
+
+    def report_queued(self, task: Task, queued_at: Optional[float] = None) -> None:
+        """
+        Posts a pending commit status for a task that waits in the run queue.
+        Like the progress updates during a run it is only sent with an outbox,
+        which sends the statuses of a commit in order.
+
+        Args:
+            task (Task): The queued task.
+            queued_at (Optional[float]): Unix time the task was queued, defaults to now.
+                The status is dropped if the run already reported a newer one.
+        """
+        self._report_pending(task, "queued", queued_at)
+
+    def _report_pending(self, task: Task, summary: str, created_at: Optional[float] = None) -> None:
+        if self.notification_outbox is None:
+            return
+        self._notify(TaskResult(
+            run_id=task.run_id,
+            repo_url=task.repo_url,
+            branch=task.branch,
+            commit_sha=task.commit_sha,
+            status="pending",
+            summary=summary,
+            details_url=self.settings.RESULTS_URL_TEMPLATE.format(run_id=task.run_id),
+            tree_id=task.tree_id,
+        ), created_at)
+
+    def _stage_progress(self, task: Task) -> Optional[Callable[[List[Stage_result], int], None]]:
+        """The on_progress callback of run_stages that posts e.g. "3/5 stages passed"."""
+        if not self.settings.NOTIFICATION_STAGE_PROGRESS or self.notification_outbox is None:
+            return None
+
+        def on_progress(results: List[Stage_result], total: int) -> None:
+            passed = sum(1 for result in results if result.success)
+            failed = [result.name for result in results if result.is_failure()]
+            summary = f"{passed}/{total} stages passed"
+            if failed:
+                summary += f", {', '.join(failed)} failed"
+            self._report_pending(task, summary)
+
+        return on_progress
+
+    def _notify(self, task_result: TaskResult, created_at: Optional[float] = None) -> None:
+        """
+        Reports the result to GitHub through the outbox, or directly without one.
+        A failing notification (GitHub, the outbox database, ...) is logged, it
+        neither stops queueing or running a task nor changes its result. Only the
+        outbox defers a status until the GitHub rate limit is refilled, without
+        one it is not sent.
+        """
+        try:
+            if self.notification_outbox is not None:
+                self.notification_outbox.enqueue(task_result, created_at=created_at)
+            else:
+                self.notification_service.send_github_status(task_result)
+        except Rate_limited:
+            logger.warning("GitHub rate limit reached, status of run %s not sent", task_result.run_id)
+        except Exception:
+            logger.warning("Reporting run %s to GitHub failed", task_result.run_id, exc_info=True)
+
+    def _create_workspace(self, task: Task) -> Path:
+        """Leases a workspace from the pool, or creates a fresh one in the temp folder."""
+        if self.workspace_pool is not None:
+            return self.workspace_pool.acquire()
+        return self.file_service.create_folder(Path(tempfile.gettempdir()) / task.run_id)
+
+    def _checkout(self, task: Task, task_folder: Path) -> None:
+        if self.workspace_pool is not None:
+            self.workspace_pool.checkout(task_folder, task.commit_sha)
+        else:
+            self.git_service.clone_repo(task.commit_sha, str(task_folder))
+
+    def _release_workspace(self, task_folder: Path) -> None:
+        """Returns a pooled workspace to the pool, has a fresh one deleted."""
+        if self.workspace_pool is not None:
+            self.workspace_pool.release(task_folder)
+        elif self.workspace_reaper is not None:
+            self.workspace_reaper.discard(task_folder)
+        else:
+            self.file_service.delete_folder(task_folder)
+
+    def _dependencies_in_use(self) -> ContextManager[None]:
+        """Keeps the dependency cache from being evicted while the stages use it."""
+        if self.dependency_cache is None:
+            return nullcontext()
+        return self.dependency_cache.in_use()
+
+    def _evict_dependencies(self) -> None:
+        """
+        Keeps the dependency cache within its size after every run, whether it
+        failed or not and whether venvs are snapshotted or not, the package cache
+        grows with every run. A failing eviction is logged, it does not change
+        the result.
+        """
+        if self.dependency_cache is None:
+            return
+        try:
+            self.dependency_cache.evict()
+        except OSError:
+            logger.warning("Evicting the dependency cache failed", exc_info=True)
+
+    def _build_key(self, task: Task) -> Optional[Tuple[str, str]]:
+        """
+        The build cache key of a task: its tree and the pipeline configuration.
+
+        Returns:
+            Optional[Tuple[str, str]]: (tree_id, config hash), None if the cache is
+            disabled or the task has no tree_id or there is no pipeline configuration.
+        """
+        if self.build_cache is None or not task.tree_id:
+            return None
+        config_hash = self.pipeline_stage_service.pipeline_config_service.config_hash()
+        if config_hash is None:
+            return None
+        return task.tree_id, config_hash
+
+    def _reuse_result(self, task: Task, reused_run_id: str, started_at: datetime) -> TaskResult:
+        """
+        Finishes a task without cloning or running stages, because a successful run
+        of the identical tree with the same pipeline configuration exists.
+        The GitHub status links to the original run.
+        """
+        task_result = TaskResult(
+            run_id=task.run_id,
+            repo_url=task.repo_url,
+            branch=task.branch,
+            commit_sha=task.commit_sha,
+            status="success",
+            started_at=started_at,
+            finished_at=datetime.now(),
+            summary=f"reused the result of run {reused_run_id} (identical tree)",
+            details_url=self.settings.RESULTS_URL_TEMPLATE.format(run_id=reused_run_id),
+            tree_id=task.tree_id,
+            reused_from=reused_run_id,
+        )
+        self.result_saver.save_task_result(task_result)
+        self._notify(task_result)
         return task_result
 
 def get_TaskRunner(settings:Settings = get_settings(),notification_service:Optional[NotificationService]=None) -> TaskRunner:
@@ -119,9 +377,16 @@ def get_TaskRunner(settings:Settings = get_settings(),notification_service:Optio
     command_service = get_ServiceCommand()
     git_service = get_GitCloneService(settings=settings)
     pipeline_stage_service = get_Pipeline_stage_service(settings= settings)
+    notification_outbox = None
     if notification_service is None:
+        # an explicitly passed notification service is called directly
         notification_service = get_NotificationService(settings=settings)
+        notification_outbox = get_Notification_outbox(settings=settings)
     result_saver = get_Results_save_service(settings= settings)
-    return TaskRunner(file_service=fileService,service_command=command_service, notification_service=notification_service, git_service=git_service, pipeline_stage_service=pipeline_stage_service, result_saver=result_saver,settings=settings)  
+    build_cache = get_Run_index_service(settings=settings) if settings.BUILD_CACHE_ENABLED else None
+    dependency_cache = get_Dependency_cache(settings=settings)
+    workspace_pool = get_Workspace_pool(settings=settings)
+    workspace_reaper = get_Workspace_reaper(settings=settings)
+    return TaskRunner(file_service=fileService,service_command=command_service, notification_service=notification_service, git_service=git_service, pipeline_stage_service=pipeline_stage_service, result_saver=result_saver,settings=settings,build_cache=build_cache,dependency_cache=dependency_cache,workspace_pool=workspace_pool,workspace_reaper=workspace_reaper,notification_outbox=notification_outbox)  
 
     
\ No newline at end of file
@@ -1,3 +1,5 @@
+from typing import List, Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,6 +14,37 @@ class Settings(BaseSettings):
     REPO_URL:str
     SAVE_FOLDER: str
     RESULTS_URL_TEMPLATE: str = "http://77.42.84.29:8009/runs/{run_id}"
+    MAX_CONCURRENT_RUNS: int = 2
+    CLONE_STRATEGY: Literal["full", "mirror", "shallow"] = "full"
+    GIT_CACHE_FOLDER: str = ".ci_cache/git"
+    GIT_CLONE_FILTER: Optional[str] = None
+    GIT_SPARSE_PATHS: List[str] = []
+    RUN_INDEX_PATH: Optional[str] = None  # defaults to <SAVE_FOLDER>/index.sqlite3
+    RESULT_CACHE_MAX_ENTRIES: int = 256  # parsed run summaries kept in memory, 0 disables
+    RESULT_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    PAGE_CACHE_MAX_PAGES: int = 64  # rendered details pages of finished runs, 0 disables
+    PAGE_CACHE_MAX_ETAGS: int = 4096  # ETags of finished runs answered without disk access
+    BUILD_CACHE_ENABLED: bool = False  # reuse successful results of identical trees
+    STAGE_CACHE_PATH: Optional[str] = None  # defaults to <SAVE_FOLDER>/stage_cache.sqlite3
+    STAGE_CACHE_MAX_ENTRIES: int = 1024  # results of stages with `inputs:`, 0 disables
+    DEPENDENCY_CACHE_FOLDER: str = ".ci_cache/deps"
+    DEPENDENCY_CACHE_MAX_BYTES: int = 5 * 1024**3  # package cache and venv snapshots, 0 disables
+    DEPENDENCY_VENV_SNAPSHOTS: bool = False  # restore the venv of the last run with the same lock files
+    DEPENDENCY_VENV_FOLDER: str = ".venv"
+    WORKSPACE_POOL_SIZE: int = 0  # reused checkouts, 0 creates and deletes a workspace per run
+    WORKSPACE_POOL_FOLDER: str = ".ci_cache/workspaces"
+    WORKSPACE_KEEP_PATHS: List[str] = [".venv", ".mypy_cache", ".ruff_cache", ".pytest_cache"]
+    WORKSPACE_HEALTH_CHECK: Literal["none", "status", "fsck"] = "status"
+    WORKSPACE_MAX_USES: int = 50  # runs before a workspace is cloned again, 0 for never
+    WORKSPACE_REAPER_WORKERS: int = 2  # workspaces deleted in the background at once, 0 deletes in the run
+    WORKSPACE_TRASH_FOLDER: Optional[str] = None  # defaults to <tempdir>/.basic_ci_trash
+    NOTIFICATION_OUTBOX_PATH: Optional[str] = None  # defaults to <SAVE_FOLDER>/outbox.sqlite3
+    NOTIFICATION_WORKERS: int = 4  # statuses sent at once in the background, 0 sends in the run
+    NOTIFICATION_MAX_ATTEMPTS: int = 10  # before a status is given up and kept as failed
+    NOTIFICATION_RETRY_DELAY: float = 2.0  # seconds before the first retry, doubled per attempt
+    NOTIFICATION_MAX_RETRY_DELAY: float = 900.0
+    NOTIFICATION_RATE_LIMIT_RESERVE: int = 0  # GitHub API requests per hour left to other users of the token
+    NOTIFICATION_STAGE_PROGRESS: bool = False  # pending statuses like "3/5 stages passed" during a run
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -0,0 +1,63 @@
+import threading
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - fcntl does not exist on Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class FileLock:
+    """
+    Exclusive lock on a lock file, usable as a context manager.
+
+    Protects shared on-disk state (caches, mirrors) against concurrent runs.
+    Threads of the same process are serialized by an in-process lock and other
+    processes (e.g. several server workers) by an flock on the lock file.
+    On platforms without fcntl only the in-process lock is used.
+    """
+
+    _thread_locks: dict[Path, threading.Lock] = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Args:
+            path (Union[str, Path]): Path of the lock file, it is created if missing.
+        """
+        self.path = Path(path).resolve()
+        with FileLock._guard:
+            self._thread_lock = FileLock._thread_locks.setdefault(
+                self.path, threading.Lock()
+            )
+        self._file: Optional[IO[bytes]] = None
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._release()
+            raise
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
@@ -0,0 +1,131 @@
+import logging
+import queue
+import threading
+from typing import Callable, Optional
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.core.TaskRunner import TaskRunner, get_TaskRunner
+from basic_ci.schemes.task import Task
+
+logger = logging.getLogger(__name__)
+
+
+class RunQueue:
+    """
+    Queue of pending CI runs that is drained by a pool of background worker threads.
+
+    The webhook only enqueues a Task and returns, the actual work (clone, stages,
+    notification) happens in the workers through TaskRunner.run_task.
+    Up to `workers` runs execute at the same time. Every worker builds its own
+    TaskRunner so no service state is shared between concurrent runs, each run
+    works in its own folder and every stage command gets its own process group.
+    """
+
+    def __init__(
+        self, task_runner_factory: Callable[[], TaskRunner], workers: int = 1
+    ) -> None:
+        """
+        Initialize the RunQueue.
+
+        Args:
+            task_runner_factory (Callable[[], TaskRunner]): Creates the TaskRunner
+                                 of a worker, called once per worker thread.
+            workers (int): Number of runs that may execute concurrently. Defaults to 1.
+
+        Returns:
+            None
+        """
+        self.task_runner_factory = task_runner_factory
+        self.workers = max(1, workers)
+        self._queue: queue.Queue[Optional[Task]] = queue.Queue()
+        self._threads: list[threading.Thread] = []
+
+    def enqueue(self, task: Task) -> None:
+        """
+        Add a task to the queue without waiting for it to run.
+
+        Args:
+            task (Task): The task to run.
+
+        Returns:
+            None
+        """
+        self._queue.put(task)
+
+    def pending(self) -> int:
+        """
+        Returns:
+            int: Approximate number of tasks waiting to be picked up by a worker.
+        """
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """
+        Start the worker threads. Calling start on a running queue does nothing.
+
+        Returns:
+            None
+        """
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"run-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the workers once they have finished the tasks already in the queue.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for each worker. Defaults to None
+                                       (wait until finished).
+
+        Returns:
+            None
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        """
+        Worker loop, takes tasks from the queue and runs them until a stop sentinel
+        (None) is received. A failing task is logged and does not kill the worker.
+        """
+        task_runner = self.task_runner_factory()
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                task_runner.run_task(task)
+            except Exception:
+                logger.exception("Run %s failed", task.run_id if task else "?")
+            finally:
+                self._queue.task_done()
+
+
+_run_queue: Optional[RunQueue] = None
+
+
+def get_RunQueue() -> RunQueue:
+    """
+    Factory for the RunQueue. The queue is shared by the whole application so
+    the same instance is returned on every call.
+
+    :return: the application wide RunQueue
+    :rtype: RunQueue
+    """
+    global _run_queue
+    if _run_queue is None:
+        settings: Settings = get_settings()
+        _run_queue = RunQueue(
+            task_runner_factory=lambda: get_TaskRunner(settings=settings),
+            workers=settings.MAX_CONCURRENT_RUNS,
+        )
+    return _run_queue
@@ -1,9 +1,39 @@
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 
+from basic_ci.api.run_information import router as runs_router
 from basic_ci.api.system import router as system_router
 from basic_ci.api.webhook import router as webhook_router
-from basic_ci.api.run_information import router as runs_router
-app = FastAPI()
+from basic_ci.core.config import get_settings
+from basic_ci.core.run_queue import get_RunQueue
+from basic_ci.services.notification_outbox_service import get_Notification_outbox
+from basic_ci.services.workspace_reaper_service import get_Workspace_reaper
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Starts the run queue workers on startup and stops them on shutdown.
+    Workspaces left behind by runs of a crashed server are deleted before.
+    The notification outbox sends statuses left from before and is stopped last.
+    """
+    workspace_reaper = get_Workspace_reaper()
+    workspace_reaper.sweep(tempfile.gettempdir(), get_settings().SAVE_FOLDER)
+    notification_outbox = get_Notification_outbox()
+    if notification_outbox is not None:
+        notification_outbox.start()
+    run_queue = get_RunQueue()
+    run_queue.start()
+    yield
+    run_queue.stop()
+    workspace_reaper.wait(timeout=30)
+    if notification_outbox is not None:
+        notification_outbox.stop(timeout=30)
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def get_root() -> dict[str, str]:
@@ -11,4 +41,4 @@ def get_root() -> dict[str, str]:
 
 app.include_router(system_router)
 app.include_router(webhook_router)
-app.include_router(runs_router)
\ No newline at end of file
+app.include_router(runs_router)
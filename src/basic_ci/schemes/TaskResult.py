@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from basic_ci.schemes.stage_result import Stage_result
 
@@ -24,6 +24,14 @@ class TaskResult:
     stages: List[Stage_result] = field(default_factory=list)
     summary: str = ""
     details_url: Optional[str] = None  # later: /builds/<run_id> or similar
+    # wall-clock seconds spent in each phase of the run (setup, clone, stages, teardown)
+    phase_timings: Dict[str, float] = field(default_factory=dict)
+    tree_id: Optional[str] = None
+    reused_from: Optional[str] = None  # run whose result was reused for an identical tree
 
     def is_success(self) -> bool:
         return self.status == "success"
+
+    def is_finished(self) -> bool:
+        """True once the run has ended, its result does not change anymore."""
+        return self.status in ("success", "failure", "error")
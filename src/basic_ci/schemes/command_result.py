@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class Command_result:
+    """
+    Outcome of a command run by ServiceCommand, including the resources it used.
+    The CPU times and the peak RSS cover the command and all children it waited for.
+    """
+    args: str
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wall_time: float = 0.0  # seconds
+    user_time: float = 0.0  # CPU seconds in user mode
+    sys_time: float = 0.0  # CPU seconds in kernel mode
+    max_rss_kb: int = 0  # peak resident set size in KiB
@@ -0,0 +1,21 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class Copy_report:
+    """
+    What a fast directory copy did: how many files and bytes were copied and
+    how many files each strategy (reflink, hardlink, copy_file_range, sendfile,
+    bytes, symlink) handled.
+    """
+    files: int = 0
+    bytes: int = 0
+    strategies: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def strategy(self) -> Optional[str]:
+        """The strategy used for most files, None if nothing was copied."""
+        if not self.strategies:
+            return None
+        return max(self.strategies, key=lambda name: self.strategies[name])
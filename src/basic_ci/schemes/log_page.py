@@ -0,0 +1,25 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+@dataclass
+class Log_index:
+    """
+    Sparse index of a stage log, stored next to the compressed log.
+    Every block is an independent gzip member that starts at a line boundary,
+    described by (uncompressed offset, compressed offset, number of the first line).
+    """
+    size: int  # uncompressed size in bytes
+    lines: int
+    blocks: List[Tuple[int, int, int]] = field(default_factory=list)
+
+
+@dataclass
+class Log_page:
+    """
+    A window of lines of a stage log. offset is the number of the first line (0 based).
+    """
+    offset: int
+    lines: List[str]
+    total_lines: int
+    size: int  # size of the whole log in bytes
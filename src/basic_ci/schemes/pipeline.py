@@ -1,14 +1,79 @@
 
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Optional
 
 
 @dataclass
 class Stage:
     stage: str
     command: str
+    # None means "after the previous stage", an empty list means "no dependencies"
+    needs: Optional[List[str]] = None
+    # a failure of this stage neither fails the pipeline nor triggers fail_fast
+    allow_failure: bool = False
+    # glob patterns of the files the stage depends on, if unchanged the stage is not run again
+    inputs: Optional[List[str]] = None
 
 @dataclass
 class PipelineConfig:
     project: str
-    stages: List[Stage]
\ No newline at end of file
+    stages: List[Stage]
+    max_parallel: int = 1
+    # skip the remaining stages (and cancel running ones) after the first failure
+    fail_fast: bool = False
+
+    def dependencies(self) -> Dict[str, List[str]]:
+        """
+        Resolves the dependencies of every stage.
+
+        A stage without a `needs:` entry depends on the stage defined before it,
+        so pipelines without `needs:` keep running strictly in order.
+
+        Returns:
+            Dict[str, List[str]]: Stage name mapped to the names of the stages it needs.
+        """
+        dependencies: Dict[str, List[str]] = {}
+        previous: Optional[str] = None
+        for stage in self.stages:
+            if stage.needs is not None:
+                dependencies[stage.stage] = list(stage.needs)
+            else:
+                dependencies[stage.stage] = [previous] if previous else []
+            previous = stage.stage
+        return dependencies
+
+    def validate(self) -> None:
+        """
+        Checks that the stages form a valid dependency graph.
+
+        Raises:
+            ValueError: If stage names are duplicated, a stage needs an unknown
+                        stage or the dependencies contain a cycle.
+        """
+        names = [stage.stage for stage in self.stages]
+        if len(names) != len(set(names)):
+            raise ValueError("Stage names must be unique")
+        if self.max_parallel < 1:
+            raise ValueError("max_parallel must be at least 1")
+
+        dependencies = self.dependencies()
+        for name, needs in dependencies.items():
+            for need in needs:
+                if need not in dependencies:
+                    raise ValueError(f"Stage '{name}' needs unknown stage '{need}'")
+
+        # Kahn's algorithm, whatever cannot be ordered is part of a cycle
+        remaining = {name: set(needs) for name, needs in dependencies.items()}
+        ready = [name for name, missing in remaining.items() if not missing]
+        while ready:
+            done = ready.pop()
+            del remaining[done]
+            for name, missing in remaining.items():
+                if done in missing:
+                    missing.discard(done)
+                    if not missing:
+                        ready.append(name)
+        if remaining:
+            raise ValueError(
+                f"Stage dependencies contain a cycle: {', '.join(sorted(remaining))}"
+            )
@@ -0,0 +1,29 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+
+@dataclass
+class Run_summary:
+    """
+    Small summary of a run as stored in the run index, used for run listings.
+    Does not contain any stage information.
+    """
+    run_id: str
+    repo_url: str
+    branch: str
+    commit_sha: str
+    status: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration: Optional[float] = None  # seconds between started_at and finished_at
+    summary: str = ""
+
+
+@dataclass
+class Run_page:
+    """
+    One page of a run listing. next_cursor is None on the last page.
+    """
+    runs: List[Run_summary] = field(default_factory=list)
+    next_cursor: Optional[str] = None
@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
 
 
 @dataclass
@@ -6,4 +8,20 @@ class Stage_result:
     name: str
     success: bool
     command: str
-    output: str
\ No newline at end of file
+    output: str
+    skipped: bool = False  # not run (or cancelled) because an earlier stage failed
+    allow_failure: bool = False  # a failure of this stage does not fail the pipeline
+    log_file: Optional[str] = None  # file name of the streamed output in the run's logs folder
+    cached: bool = False  # not run, a successful result for identical inputs was reused
+
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    exit_code: Optional[int] = None
+    wall_time: float = 0.0  # seconds
+    user_time: float = 0.0  # CPU seconds in user mode, children included
+    sys_time: float = 0.0  # CPU seconds in kernel mode, children included
+    max_rss_kb: int = 0  # peak resident set size of the stage's processes in KiB
+
+    def is_failure(self) -> bool:
+        """True if this stage failed in a way that fails the whole pipeline."""
+        return not self.success and not self.skipped and not self.allow_failure
\ No newline at end of file
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass(frozen=True)
@@ -10,4 +11,5 @@ class Task:
     run_id: str
     repo_url: str
     branch: str
-    commit_sha: str
\ No newline at end of file
+    commit_sha: str
+    tree_id: Optional[str] = None  # git tree of the head commit, identical content has the same tree
\ No newline at end of file
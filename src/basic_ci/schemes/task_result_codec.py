@@ -0,0 +1,150 @@
+"""
+Typed JSON encoding of TaskResult and Stage_result.
+
+Unlike dataclasses.asdict + json.dump(default=str) this does not deep copy the
+result and writes datetimes as ISO 8601 strings that are parsed back into
+datetimes, and stages back into Stage_result objects, when decoding.
+Keys missing in older files get the field defaults, unknown keys are ignored.
+"""
+import json
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.TaskResult import TaskResult
+
+_STAGE_DATETIMES = ("started_at", "finished_at")
+_TASK_DATETIMES = ("started_at", "finished_at")
+_STAGE_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(Stage_result))
+_TASK_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(TaskResult) if f.name != "stages")
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def _encode_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _decode_datetime(value: Optional[datetime | str]) -> Optional[datetime]:
+    """Accepts the ISO strings written by the codec and the str(datetime) of older files."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def stage_result_to_dict(stage: Stage_result, with_output: bool = True) -> Dict[str, Any]:
+    """
+    Args:
+        stage (Stage_result): The stage to encode.
+        with_output (bool): Include the output of the stage. Defaults to True.
+
+    Returns:
+        Dict[str, Any]: A json serializable dict of the stage.
+    """
+    data = {name: getattr(stage, name) for name in _STAGE_FIELDS}
+    for name in _STAGE_DATETIMES:
+        data[name] = _encode_datetime(data[name])
+    if not with_output:
+        del data["output"]
+    return data
+
+
+def stage_result_from_dict(data: Dict[str, Any]) -> Stage_result:
+    """
+    Args:
+        data (Dict[str, Any]): A stage as written by stage_result_to_dict.
+
+    Returns:
+        Stage_result: The decoded stage, output is empty if it was not stored.
+
+    Raises:
+        ValueError: If required fields are missing.
+    """
+    values = {name: data[name] for name in _STAGE_FIELDS if name in data}
+    values.setdefault("output", "")
+    for name in _STAGE_DATETIMES:
+        values[name] = _decode_datetime(values.get(name))
+    try:
+        return Stage_result(**values)
+    except TypeError as e:
+        raise ValueError(f"Invalid stage result: {e}") from e
+
+
+def task_result_to_dict(task_result: TaskResult, with_output: bool = True) -> Dict[str, Any]:
+    """
+    Args:
+        task_result (TaskResult): The run to encode.
+        with_output (bool): Include the output of the stages. Defaults to True.
+
+    Returns:
+        Dict[str, Any]: A json serializable dict of the run.
+    """
+    data = {name: getattr(task_result, name) for name in _TASK_FIELDS}
+    for name in _TASK_DATETIMES:
+        data[name] = _encode_datetime(data[name])
+    data["phase_timings"] = dict(task_result.phase_timings)
+    data["stages"] = [stage_result_to_dict(stage, with_output) for stage in task_result.stages]
+    return data
+
+
+def task_result_from_dict(data: Dict[str, Any]) -> TaskResult:
+    """
+    Args:
+        data (Dict[str, Any]): A run as written by task_result_to_dict.
+
+    Returns:
+        TaskResult: The decoded run with Stage_result objects and datetimes.
+
+    Raises:
+        ValueError: If required fields are missing.
+    """
+    values = {name: data[name] for name in _TASK_FIELDS if name in data}
+    for name in _TASK_DATETIMES:
+        values[name] = _decode_datetime(values.get(name))
+    try:
+        task_result = TaskResult(**values)
+    except TypeError as e:
+        raise ValueError(f"Invalid task result: {e}") from e
+    task_result.stages = [stage_result_from_dict(stage) for stage in data.get("stages", [])]
+    return task_result
+
+
+def encode_task_result(task_result: TaskResult, with_output: bool = True) -> bytes:
+    """
+    Encodes a run as compact UTF-8 JSON.
+
+    Args:
+        task_result (TaskResult): The run to encode.
+        with_output (bool): Include the output of the stages. Defaults to True.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    return encode_json(task_result_to_dict(task_result, with_output))
+
+
+def encode_json(data: Dict[str, Any]) -> bytes:
+    """Encodes a dict from task_result_to_dict, e.g. after adding fields to it."""
+    return _encoder.encode(data).encode("utf-8")
+
+
+def decode_task_result(data: bytes | str) -> TaskResult:
+    """
+    Decodes a run encoded by encode_task_result (or an older taskResult.json).
+
+    Args:
+        data (Union[bytes, str]): The JSON document.
+
+    Returns:
+        TaskResult: The decoded run.
+
+    Raises:
+        ValueError: If the document is not valid JSON or not a run.
+    """
+    decoded = json.loads(data)
+    if not isinstance(decoded, dict):
+        raise ValueError("A task result has to be a JSON object")
+    return task_result_from_dict(decoded)
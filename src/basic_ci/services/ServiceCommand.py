@@ -1,33 +1,188 @@
+import os
+import selectors
+import signal
 import subprocess
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Optional
 
+from basic_ci.schemes.command_result import Command_result
 
-class ServiceCommand:
 
+class ServiceCommand:
+    # seconds between checks whether a running command has been cancelled
+    CANCEL_POLL_INTERVAL = 0.2
+    # bytes read from an output pipe at once
+    CHUNK_SIZE = 64 * 1024
 
-    def run_command(self, command: list[str], path: Path) -> subprocess.CompletedProcess:
+    def run_command(
+        self,
+        command: list[str],
+        path: Path,
+        cancel_event: Optional[threading.Event] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Command_result:
         """
         This service runs a custom command in the folder we're in. It runs them in a shell.
+        Every command is started in its own session, so the shell and everything it
+        spawns form a separate process group that does not interfere with other runs.
 
         Args:
             command (list of str): Commands to run.
             path (Path): path to directory where commands are run from
+            cancel_event (Optional[threading.Event]): When set while the command is
+                running, its whole process group is killed. Defaults to None.
+            env (Optional[Dict[str, str]]): Variables added to the environment of
+                the command. Defaults to None.
 
         Returns:
-            CompletedProcess object: Contains args, returncode, stdout, stderr
+            Command_result object: Contains args, returncode, stdout, stderr and
+            the timing and resource usage of the command
         """
         
         command_str = " ".join(command) # To make command format compatible with shell=True 
         
-        output = subprocess.run(
+        started_at, start = datetime.now(), time.monotonic()
+        process = subprocess.Popen(
             command_str,
             cwd=str(path),        
-            capture_output=True,  
-            text=True,
-            check=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             shell=True, # subprocess will get the correct shell for the correct OS, making get_OS redundant
+            start_new_session=True,
+            env={**os.environ, **env} if env else None,
+        )
+        assert process.stdout is not None and process.stderr is not None
+        stdout, stderr = bytearray(), bytearray()
+        self._pump(
+            process,
+            {process.stdout.fileno(): stdout.extend, process.stderr.fileno(): stderr.extend},
+            cancel_event,
+        )
+        result = self._wait(process, command_str, started_at, start)
+        result.stdout = stdout.decode("utf-8", errors="replace")
+        result.stderr = stderr.decode("utf-8", errors="replace")
+        return result
+
+    def stream_command(
+        self,
+        command: list[str],
+        path: Path,
+        log_path: Path,
+        cancel_event: Optional[threading.Event] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Command_result:
+        """
+        Runs a command like run_command but streams its output into a log file
+        instead of keeping it in memory.
+
+        stdout and stderr are merged into one pipe (so their order is kept) and
+        copied to the log file in chunks of at most CHUNK_SIZE bytes as soon as
+        they are produced, so memory use does not depend on the output size and
+        the log can be read while the command is still running.
+
+        Args:
+            command (list of str): Commands to run.
+            path (Path): path to directory where commands are run from
+            log_path (Path): file the output is written to, parents are created.
+            cancel_event (Optional[threading.Event]): When set while the command is
+                running, its whole process group is killed. Defaults to None.
+            env (Optional[Dict[str, str]]): Variables added to the environment of
+                the command. Defaults to None.
+
+        Returns:
+            Command_result object: Contains args, returncode, timing and resource
+            usage, stdout and stderr are empty since the output is in the log file.
+        """
+        command_str = " ".join(command)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(log_path, "wb", buffering=0) as log_file:
+            started_at, start = datetime.now(), time.monotonic()
+            process = subprocess.Popen(
+                command_str,
+                cwd=str(path),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                shell=True,
+                start_new_session=True,
+                env={**os.environ, **env} if env else None,
+            )
+            assert process.stdout is not None
+            self._pump(process, {process.stdout.fileno(): log_file.write}, cancel_event)
+            return self._wait(process, command_str, started_at, start)
+
+    def _pump(
+        self,
+        process: subprocess.Popen,
+        sinks: Dict[int, Callable[[bytes], object]],
+        cancel_event: Optional[threading.Event],
+    ) -> None:
+        """
+        Copies everything written to the output pipes of a process into their sinks
+        in chunks of at most CHUNK_SIZE bytes, until all pipes are closed.
+        Kills the process group as soon as the cancel event is set.
+        """
+        with selectors.DefaultSelector() as selector:
+            for fd in sinks:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                if cancel_event is not None and cancel_event.is_set():
+                    self.kill_process_group(process)
+                for key, _ in selector.select(timeout=self.CANCEL_POLL_INTERVAL):
+                    chunk = os.read(key.fd, self.CHUNK_SIZE)
+                    if chunk:
+                        sinks[key.fd](chunk)
+                    else:
+                        selector.unregister(key.fd)
+        for pipe in (process.stdout, process.stderr):
+            if pipe is not None:
+                pipe.close()
+
+    @staticmethod
+    def _wait(
+        process: subprocess.Popen, command_str: str, started_at: datetime, start: float
+    ) -> Command_result:
+        """
+        Waits for the process and collects its resource usage with wait4, which
+        reports the usage of exactly this process and the children it waited for
+        (unlike RUSAGE_CHILDREN deltas, which would mix up concurrent runs).
+        """
+        user_time = sys_time = 0.0
+        max_rss_kb = 0
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            user_time, sys_time = usage.ru_utime, usage.ru_stime
+            max_rss_kb = usage.ru_maxrss
+        except (AttributeError, ChildProcessError):
+            # no wait4 on this platform or the process was already reaped
+            process.wait()
+        return Command_result(
+            args=command_str,
+            returncode=process.returncode,
+            started_at=started_at,
+            finished_at=datetime.now(),
+            wall_time=time.monotonic() - start,
+            user_time=user_time,
+            sys_time=sys_time,
+            max_rss_kb=max_rss_kb,
         )
-        return output
+
+    @staticmethod
+    def kill_process_group(process: subprocess.Popen) -> None:
+        """
+        Kills the process group started for a command (the shell and all its children).
+
+        Args:
+            process (Popen): The process started by run_command.
+        """
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
     
 def get_ServiceCommand()->ServiceCommand:
     """
@@ -35,4 +190,4 @@ def get_ServiceCommand()->ServiceCommand:
     :return: returns a new instance of ServiceCommand
     :rtype: ServiceCommand
     """
-    return ServiceCommand()
\ No newline at end of file
+    return ServiceCommand()
@@ -0,0 +1,301 @@
+import hashlib
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.services.file_service import FileService, get_FileService
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - fcntl does not exist on Windows
+    fcntl = None  # type: ignore[assignment]
+
+SNAPSHOT_FOLDER = "venvs"
+PACKAGE_FOLDER = "packages"
+ORIGIN_FILE = "origin"  # absolute path the snapshotted venv was created at
+
+
+class Dependency_cache:
+    """
+    Keeps dependencies between runs, which all start in a fresh workspace.
+
+    - a package cache folder shared by all runs, exported to the stages as
+      UV_CACHE_DIR so `uv sync` does not download and build packages again
+    - optionally a snapshot of the virtualenv of a successful run per hash of
+      the lock files, hardlinked (or copied across filesystems) into the next
+      workspace with the same hash, so `uv sync` only has to check it
+
+    Snapshots are created in a temporary folder and renamed into place, so
+    concurrent runs never see a partial snapshot. Runs hold a shared lock while
+    they use the cache (see in_use), eviction needs an exclusive one and is
+    skipped while any run uses the cache, so every run calls evict() once it is
+    done with the cache. Once the cache is larger than max_bytes the least
+    recently restored snapshots are evicted, then the package cache.
+    """
+    KEY_FILES = ("uv.lock", "pyproject.toml")
+    # files in the venv's bin folder larger than this are not scanned for the old venv path
+    MAX_SCRIPT_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        cache_folder: str | Path,
+        max_bytes: int = 5 * 1024**3,
+        venv_folder: str = ".venv",
+        snapshots: bool = False,
+        file_service: Optional[FileService] = None,
+    ) -> None:
+        """
+        Args:
+            cache_folder (Union[str, Path]): Folder of the package cache and the snapshots.
+            max_bytes (int): Maximum size of the cache. Defaults to 5 GiB.
+            venv_folder (str): The virtualenv folder in the workspace. Defaults to ".venv".
+            snapshots (bool): Snapshot and restore virtualenvs. Defaults to False.
+            file_service (Optional[FileService]): Copies the venvs. Defaults to a FileService.
+        """
+        self.cache_folder = Path(cache_folder)
+        self.max_bytes = max_bytes
+        self.venv_folder = venv_folder
+        self.snapshots = snapshots
+        self.file_service = file_service or get_FileService()
+
+    @property
+    def package_cache(self) -> Path:
+        return self.cache_folder / PACKAGE_FOLDER
+
+    def environment(self) -> Dict[str, str]:
+        """
+        Returns:
+            Dict[str, str]: Variables to add to the environment of the stages.
+        """
+        self.package_cache.mkdir(parents=True, exist_ok=True)
+        return {"UV_CACHE_DIR": str(self.package_cache.resolve())}
+
+    @contextmanager
+    def in_use(self) -> Iterator[None]:
+        """Holds a shared lock so the cache is not evicted, e.g. while stages run."""
+        with self._locked(exclusive=False):
+            yield
+
+    def key(self, workspace: Path) -> Optional[str]:
+        """
+        Hashes the lock files of a workspace.
+
+        Args:
+            workspace (Path): The checkout.
+
+        Returns:
+            Optional[str]: The sha256 hex digest, None if none of the KEY_FILES exists.
+        """
+        digest = hashlib.sha256()
+        found = False
+        for name in self.KEY_FILES:
+            path = workspace / name
+            if path.is_file():
+                found = True
+                digest.update(name.encode() + b"\0")
+                digest.update(path.read_bytes())
+            digest.update(b"\0")
+        return digest.hexdigest() if found else None
+
+    def restore_venv(self, workspace: Path, key: str) -> bool:
+        """
+        Links the snapshot of the virtualenv for the key into the workspace.
+
+        Args:
+            workspace (Path): The checkout.
+            key (str): The hash of its lock files.
+
+        Returns:
+            bool: True if a snapshot was restored.
+        """
+        target = workspace / self.venv_folder
+        if not self.snapshots or target.exists():
+            return False
+        snapshot = self._snapshot_path(key)
+        with self._locked(exclusive=False):
+            if not snapshot.is_dir():
+                return False
+            os.utime(snapshot)  # the modification time orders the snapshots for eviction
+            self._link_tree(snapshot / "venv", target)
+            origin = (snapshot / ORIGIN_FILE).read_text()
+        self._relocate(target, origin)
+        return True
+
+    def save_venv(self, workspace: Path, key: str) -> bool:
+        """
+        Snapshots the virtualenv of a workspace for the key if there is none yet.
+
+        Args:
+            workspace (Path): The checkout after a successful run.
+            key (str): The hash of its lock files.
+
+        Returns:
+            bool: True if a new snapshot was created.
+        """
+        source = workspace / self.venv_folder
+        snapshot = self._snapshot_path(key)
+        if not self.snapshots or not source.is_dir() or snapshot.exists():
+            return False
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        temporary = snapshot.parent / f".tmp-{uuid.uuid4().hex}"
+        with self._locked(exclusive=False):
+            try:
+                self._link_tree(source, temporary / "venv")
+                (temporary / ORIGIN_FILE).write_text(str(source.resolve()))
+                os.rename(temporary, snapshot)
+                created = True
+            except OSError:
+                # another run created the snapshot first (or the venv vanished)
+                created = False
+            finally:
+                shutil.rmtree(temporary, ignore_errors=True)
+        return created
+
+    def evict(self) -> int:
+        """
+        Removes the least recently restored snapshots, and if that is not enough
+        the package cache, until the cache is not larger than max_bytes.
+
+        Returns:
+            int: Number of removed folders.
+        """
+        removed = 0
+        with self._locked(exclusive=True, blocking=False) as locked:
+            if not locked:
+                return 0  # a run uses the cache, it evicts when it is done
+            seen: Set[Tuple[int, int]] = set()
+            snapshots = sorted(self._snapshots(), key=lambda path: path.stat().st_mtime)
+            sizes = {path: self._size(path, seen) for path in snapshots}
+            total = sum(sizes.values()) + self._size(self.package_cache, seen)
+            for path in snapshots:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= sizes[path]
+                removed += 1
+            if total > self.max_bytes and self.package_cache.exists():
+                self._remove(self.package_cache)
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Current usage of the cache.
+        """
+        seen: Set[Tuple[int, int]] = set()
+        snapshots = self._snapshots()
+        size = sum(self._size(path, seen) for path in snapshots)
+        return {
+            "snapshots": len(snapshots),
+            "bytes": size + self._size(self.package_cache, seen),
+            "max_bytes": self.max_bytes,
+        }
+
+    def _snapshot_path(self, key: str) -> Path:
+        return self.cache_folder / SNAPSHOT_FOLDER / key
+
+    def _snapshots(self) -> List[Path]:
+        folder = self.cache_folder / SNAPSHOT_FOLDER
+        if not folder.is_dir():
+            return []
+        return [path for path in folder.iterdir() if not path.name.startswith(".")]
+
+    @contextmanager
+    def _locked(self, exclusive: bool, blocking: bool = True) -> Iterator[bool]:
+        """
+        Holds a shared or exclusive lock on the cache folder (core.file_lock.FileLock
+        is exclusive only), yields False if blocking is off and it is taken.
+        Without fcntl nothing is locked.
+        """
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_folder / ".lock", "a") as lock_file:
+            locked = False
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                try:
+                    fcntl.flock(lock_file, flags if blocking else flags | fcntl.LOCK_NB)
+                    locked = True
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if locked:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _link_tree(self, source: Path, target: Path) -> None:
+        """
+        Copies a folder tree keeping symlinks, hardlinking the files if both are on
+        the same filesystem (reflink or kernel copy otherwise).
+        """
+        self.file_service.copy_directory(source, target, fast=True, hardlink=True)
+
+    def _relocate(self, venv: Path, origin: str) -> None:
+        """
+        Replaces the path the venv was created at in its scripts (shebangs of the
+        entry points, activate scripts). The files are written anew so the
+        hardlinked snapshot is not changed.
+        """
+        new = str(venv.resolve()).encode()
+        for folder in ("bin", "Scripts"):
+            if not (venv / folder).is_dir():
+                continue
+            for path in (venv / folder).iterdir():
+                if path.is_symlink() or not path.is_file():
+                    continue
+                if path.stat().st_size > self.MAX_SCRIPT_SIZE:
+                    continue
+                data = path.read_bytes()
+                if origin.encode() not in data:
+                    continue
+                temporary = path.with_name(path.name + ".tmp")
+                temporary.write_bytes(data.replace(origin.encode(), new))
+                shutil.copymode(path, temporary)
+                os.replace(temporary, path)
+
+    @staticmethod
+    def _size(path: Path, seen: Set[Tuple[int, int]]) -> int:
+        """Disk usage of a folder, files hardlinked more than once are counted once."""
+        size = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    stat = os.lstat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                if (stat.st_dev, stat.st_ino) in seen:
+                    continue
+                seen.add((stat.st_dev, stat.st_ino))
+                size += stat.st_size
+        return size
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        """Renames the folder out of the way first so it disappears at once."""
+        trash = path.with_name(f".tmp-{uuid.uuid4().hex}")
+        os.rename(path, trash)
+        shutil.rmtree(trash, ignore_errors=True)
+
+
+def get_Dependency_cache(settings: Settings = get_settings()) -> Optional[Dependency_cache]:
+    """
+    Factory for the Dependency_cache
+    Args:
+        settings (Settings, optional): The settings to use. Defaults to get_settings().
+    Returns:
+        Optional[Dependency_cache]: The cache, None if DEPENDENCY_CACHE_MAX_BYTES disables it
+    """
+    if settings.DEPENDENCY_CACHE_MAX_BYTES <= 0:
+        return None
+    return Dependency_cache(
+        settings.DEPENDENCY_CACHE_FOLDER,
+        max_bytes=settings.DEPENDENCY_CACHE_MAX_BYTES,
+        venv_folder=settings.DEPENDENCY_VENV_FOLDER,
+        snapshots=settings.DEPENDENCY_VENV_SNAPSHOTS,
+    )
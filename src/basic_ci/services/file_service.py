@@ -1,8 +1,33 @@
+import os
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from basic_ci.schemes.copy_report import Copy_report
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - fcntl does not exist on Windows
+    fcntl = None  # type: ignore[assignment]
+
+# ioctl that makes the destination share the extents of the source (btrfs, xfs, ...)
+FICLONE = 0x40049409
+# copy_file_range or sendfile with the arguments (source fd, target fd, count, source offset)
+_Copy_range = Callable[[int, int, int, int], int]
 
 
 class FileService:
+    # files copied at the same time by a fast directory copy
+    COPY_WORKERS = 8
+    # files handed to a worker at once
+    COPY_BATCH_FILES = 64
+    COPY_BATCH_BYTES = 64 * 1024 * 1024
+    CHUNK_SIZE = 1024 * 1024
+    # strategies of a fast copy, in the order they are tried
+    COPY_STRATEGIES = ("hardlink", "reflink", "copy_file_range", "sendfile", "bytes")
+
     def __init__(self, base_workspace: str | Path | None = None) -> None:
         """
         Initialize the FileService with an optional base workspace.
@@ -122,7 +147,14 @@ class FileService:
         dst.parent.mkdir(parents=True, exist_ok=True)
         shutil.copy2(src, dst)
 
-    def copy_directory(self, source: str | Path, destination: str | Path) -> None:
+    def copy_directory(
+        self,
+        source: str | Path,
+        destination: str | Path,
+        fast: bool = False,
+        hardlink: bool = False,
+        workers: Optional[int] = None,
+    ) -> Optional[Copy_report]:
         """
         Copy a directory and all of its contents recursively.
 
@@ -131,12 +163,27 @@ class FileService:
         may be overwritten). The destination path is validated against the base
         workspace, but the source path is not.
 
+        The fast mode copies the files on a thread pool and avoids reading and
+        writing every byte where the system allows it. Per file it tries, in order:
+        a hardlink (only with hardlink=True, for content that is never modified in
+        place), a reflink (FICLONE, copy-on-write on btrfs/xfs), copy_file_range,
+        sendfile and finally a plain byte copy. The hardlink comes first because it
+        is opt-in: a caller allowing it wants the files shared, which is cheaper than
+        any copy. A strategy the filesystem does not support is not tried again for
+        the remaining files. Unlike the normal mode,
+        symlinks are recreated instead of being followed.
+
         Args:
             source (Union[str, Path]): Path of the directory to copy
             destination (Union[str, Path]): Destination directory path
+            fast (bool): Use the fast mode. Defaults to False.
+            hardlink (bool): In fast mode, hardlink the files. Defaults to False.
+            workers (Optional[int]): In fast mode, files copied at the same time.
+                                     Defaults to COPY_WORKERS.
 
         Returns:
-            None
+            Optional[Copy_report]: In fast mode the number of files and bytes copied
+            and which strategies were used, None otherwise.
 
         Raises:
             FileNotFoundError: If the source directory does not exist
@@ -152,7 +199,154 @@ class FileService:
         if not src.is_dir():
             raise ValueError(f"Source is not a directory: {src}")
 
+        if fast:
+            return self._fast_copy_directory(src, dst, hardlink, workers or self.COPY_WORKERS)
         shutil.copytree(src, dst, dirs_exist_ok=True)
+        return None
+
+    def _fast_copy_directory(
+        self, src: Path, dst: Path, hardlink: bool, workers: int
+    ) -> Copy_report:
+        """
+        Creates the directories and symlinks while walking the tree and copies
+        the files in batches on a thread pool, see copy_directory. Batches of
+        about COPY_BATCH_FILES files or COPY_BATCH_BYTES keep the hand-off
+        between threads cheap compared to the copies.
+        """
+        report = Copy_report()
+        batches: List[List[Tuple[str, str, int]]] = [[]]
+        batch_bytes = 0
+        directories: List[Tuple[str, str]] = []
+        pending = [(str(src), str(dst))]
+        while pending:
+            source_root, target_root = pending.pop()
+            os.makedirs(target_root, exist_ok=True)
+            directories.append((source_root, target_root))
+            with os.scandir(source_root) as entries:
+                for entry in entries:
+                    target_path = os.path.join(target_root, entry.name)
+                    if entry.is_symlink():
+                        if os.path.lexists(target_path) and not os.path.isdir(target_path):
+                            os.unlink(target_path)
+                        os.symlink(os.readlink(entry.path), target_path)
+                        report.strategies["symlink"] = report.strategies.get("symlink", 0) + 1
+                    elif entry.is_dir():
+                        pending.append((entry.path, target_path))
+                    else:
+                        size = entry.stat().st_size
+                        if len(batches[-1]) >= self.COPY_BATCH_FILES or batch_bytes >= self.COPY_BATCH_BYTES:
+                            batches.append([])
+                            batch_bytes = 0
+                        batches[-1].append((entry.path, target_path, size))
+                        batch_bytes += size
+
+        unsupported: Dict[str, bool] = {"hardlink": not hardlink}
+        lock = threading.Lock()
+
+        def copy(batch: List[Tuple[str, str, int]]) -> None:
+            used: Dict[str, int] = {}
+            for source_path, target_path, size in batch:
+                strategy = self._fast_copy_file(source_path, target_path, size, unsupported)
+                used[strategy] = used.get(strategy, 0) + 1
+            with lock:
+                report.files += len(batch)
+                report.bytes += sum(size for _, _, size in batch)
+                for strategy, count in used.items():
+                    report.strategies[strategy] = report.strategies.get(strategy, 0) + count
+
+        if workers <= 1 or len(batches) == 1:
+            for batch in batches:
+                copy(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # list() re-raises the first error of a copy
+                list(pool.map(copy, batches))
+        for source_root, target_root in reversed(directories):
+            shutil.copystat(source_root, target_root)
+        return report
+
+    def _fast_copy_file(
+        self, src: str, dst: str, size: int, unsupported: Dict[str, bool]
+    ) -> str:
+        """
+        Copies one file with the first strategy that works.
+
+        Args:
+            src (str): The file to copy.
+            dst (str): The target, replaced if it exists.
+            size (int): The size of the file.
+            unsupported (Dict[str, bool]): Strategies that failed before, shared by
+                all files of the copy and updated when a strategy fails.
+
+        Returns:
+            str: The strategy used.
+        """
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        if not unsupported.get("hardlink"):
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError:
+                unsupported["hardlink"] = True
+
+        with open(src, "rb") as source_file, open(dst, "wb") as target_file:
+            source_fd, target_fd = source_file.fileno(), target_file.fileno()
+            strategy = "bytes"
+            if fcntl is not None and not unsupported.get("reflink"):
+                try:
+                    fcntl.ioctl(target_fd, FICLONE, source_fd)
+                    strategy = "reflink"
+                except OSError:
+                    unsupported["reflink"] = True
+            if strategy == "bytes" and hasattr(os, "copy_file_range") and not unsupported.get("copy_file_range"):
+                if self._copy_with(os.copy_file_range, source_fd, target_fd, size):
+                    strategy = "copy_file_range"
+                else:
+                    unsupported["copy_file_range"] = True
+            if strategy == "bytes" and hasattr(os, "sendfile") and not unsupported.get("sendfile"):
+                if self._copy_with(
+                    lambda source, target, count, offset: os.sendfile(target, source, offset, count),
+                    source_fd, target_fd, size,
+                ):
+                    strategy = "sendfile"
+                else:
+                    unsupported["sendfile"] = True
+            if strategy == "bytes":
+                source_file.seek(0)
+                target_file.seek(0)
+                target_file.truncate()
+                shutil.copyfileobj(source_file, target_file, self.CHUNK_SIZE)
+        shutil.copystat(src, dst)
+        return strategy
+
+    def _copy_with(self, copy_range: _Copy_range, source_fd: int, target_fd: int, size: int) -> bool:
+        """
+        Copies size bytes in the kernel with copy_file_range or sendfile.
+
+        Returns:
+            bool: False if the system call is not supported for these files (it fails
+            or copies nothing, e.g. on procfs), the caller then falls back to the
+            next strategy.
+
+        Raises:
+            OSError: If the copy fails or ends early after some bytes were copied,
+                e.g. because the file was truncated meanwhile.
+        """
+        offset = 0
+        try:
+            while offset < size:
+                copied = copy_range(source_fd, target_fd, min(self.CHUNK_SIZE * 64, size - offset), offset)
+                if copied == 0:
+                    if offset:
+                        raise OSError(f"Copy ended after {offset} of {size} bytes")
+                    return False
+                offset += copied
+        except OSError:
+            if offset:
+                raise
+            return False
+        return True
 
 def get_FileService() -> FileService:
     return FileService()
\ No newline at end of file
@@ -1,27 +1,69 @@
-from git import Repo  #  git = gitPython package
+import hashlib
+import shutil
+from pathlib import Path
 
-from basic_ci.core.config import Settings, get_settings  #  git = gitPython package
+from git import GitCommandError, Repo  #  git = gitPython package
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.core.file_lock import FileLock
 
 
 class GitcloneService:
     """
     Clones a repo into a directory and checks out given commit.
+
+    Supported strategies:
+    - "full": clone the whole repository from the remote for every run.
+    - "mirror": keep a bare mirror of the remote in a cache folder, fetch only the
+      requested commit into it and create the run checkout as a shared clone of
+      the mirror (objects are borrowed through git alternates, nothing is copied).
+    - "shallow": initialize an empty repository and fetch only the requested commit
+      with depth 1, optionally as a partial clone (e.g. filter "blob:none") and with
+      a sparse checkout. Falls back to "full" if the server refuses fetch-by-SHA.
     """
-    def __init__(self, repo_url: str) -> None:
+    STRATEGIES = ("full", "mirror", "shallow")
+
+    def __init__(
+        self,
+        repo_url: str,
+        strategy: str = "full",
+        cache_folder: str | Path | None = None,
+        clone_filter: str | None = None,
+        sparse_paths: list[str] | None = None,
+    ) -> None:
         """
         Initialize the GitcloneService with a repository URL.
 
         Args:
             repo_url (str): URL of the Git repository to clone.
                            Supports HTTPS, SSH, and local file protocols.
+            strategy (str): Clone strategy, one of STRATEGIES. Defaults to "full".
+            cache_folder (Optional[Union[str, Path]]): Folder holding the bare
+                           mirrors, required for the "mirror" strategy.
+            clone_filter (Optional[str]): Partial clone filter used by the "shallow"
+                           strategy, e.g. "blob:none". Defaults to None (no filter).
+            sparse_paths (Optional[list[str]]): Paths/patterns to check out with the
+                           "shallow" strategy. Defaults to None (whole tree).
 
         Returns:
             None
 
+        Raises:
+            ValueError: If the strategy is unknown or "mirror" is used without
+                        a cache folder.
+
         Example:
             >>> service = GitcloneService("https://github.com/user/repo.git")
         """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown clone strategy: {strategy}")
+        if strategy == "mirror" and cache_folder is None:
+            raise ValueError("The mirror clone strategy needs a cache folder")
         self.repo_url = repo_url
+        self.strategy = strategy
+        self.cache_folder = Path(cache_folder) if cache_folder is not None else None
+        self.clone_filter = clone_filter
+        self.sparse_paths = sparse_paths or []
     
     def clone_repo(self, head_commit_hash: str, directory: str) -> None:
         """
@@ -32,9 +74,8 @@ class GitcloneService:
            specified directory.
         2. Checks out the exact commit identified by the provided hash.
 
-        The clone operation is shallow (full history is cloned). For large
-        repositories, consider implementing shallow clone with depth=1 if
-        full history is not needed.
+        With the default "full" strategy the full history is cloned. The
+        "mirror" and "shallow" strategies (see class docstring) avoid that.
 
         Args:
             head_commit_hash (str): Full or abbreviated commit SHA to checkout.
@@ -55,9 +96,130 @@ class GitcloneService:
                                     - Invalid commit hash
             OSError: If the target directory cannot be created or accessed.
         """
+        if self.strategy == "mirror":
+            self._clone_from_mirror(head_commit_hash, directory)
+            return
+        if self.strategy == "shallow":
+            self._shallow_clone(head_commit_hash, directory)
+            return
         repo = Repo.clone_from(self.repo_url, directory)
         repo.git.checkout(head_commit_hash)
 
+    def reset_checkout(
+        self, head_commit_hash: str, directory: str, keep_paths: list[str] | None = None
+    ) -> None:
+        """
+        Reuse an existing checkout of the repository for another commit.
+
+        The commit is fetched if the checkout does not have it yet (through the
+        mirror with the "mirror" strategy, with depth 1 with "shallow"), then it
+        is checked out with --force and every untracked and ignored file is
+        removed except the keep_paths (e.g. ".venv", ".mypy_cache").
+
+        Args:
+            head_commit_hash (str): Full commit SHA to check out.
+            directory (str): The existing checkout.
+            keep_paths (Optional[list[str]]): Patterns of untracked paths to keep.
+
+        Raises:
+            git.exc.GitCommandError: If the commit cannot be fetched or checked out.
+        """
+        repo = Repo(directory)
+        if self.strategy == "mirror":
+            self.update_mirror(head_commit_hash)
+        if not self._has_commit(repo, head_commit_hash):
+            fetch_args = ["--depth=1"] if self.strategy == "shallow" else []
+            if self.strategy == "shallow" and self.clone_filter:
+                fetch_args.append(f"--filter={self.clone_filter}")
+            try:
+                repo.git.fetch(*fetch_args, "origin", head_commit_hash)
+            except GitCommandError:
+                repo.git.fetch("origin", "+refs/heads/*:refs/remotes/origin/*")
+        repo.git.checkout("--force", "--detach", head_commit_hash)
+        repo.git.clean("-ffdx", *[f"--exclude={path}" for path in keep_paths or []])
+
+    def _shallow_clone(self, head_commit_hash: str, directory: str) -> None:
+        """
+        Fetch only the given commit (depth 1) into a fresh repository and check it out.
+
+        If the server does not allow fetching the commit by its SHA the partially
+        initialized repository is removed and a full clone is done instead.
+        """
+        repo = Repo.init(directory)
+        repo.create_remote("origin", self.repo_url)
+        if self.sparse_paths:
+            repo.git.sparse_checkout("set", "--no-cone", *self.sparse_paths)
+
+        fetch_args = ["--depth=1"]
+        if self.clone_filter:
+            fetch_args.append(f"--filter={self.clone_filter}")
+        try:
+            repo.git.fetch(*fetch_args, "origin", head_commit_hash)
+        except GitCommandError:
+            shutil.rmtree(Path(directory) / ".git")
+            repo = Repo.clone_from(self.repo_url, directory)
+        repo.git.checkout(head_commit_hash)
+
+    def _mirror_path(self) -> Path:
+        """
+        Returns:
+            Path: Location of the bare mirror of repo_url inside the cache folder.
+        """
+        assert self.cache_folder is not None
+        url_hash = hashlib.sha256(self.repo_url.encode("utf-8")).hexdigest()[:16]
+        return self.cache_folder / f"{url_hash}.git"
+
+    def update_mirror(self, head_commit_hash: str) -> Path:
+        """
+        Make sure the bare mirror exists and contains the given commit.
+
+        The mirror is created on first use. Afterwards only the requested commit
+        is fetched, falling back to fetching all branches if the server refuses
+        to serve a commit by its SHA. All changes to the mirror happen under a
+        file lock so concurrent runs can share it.
+
+        Args:
+            head_commit_hash (str): Commit SHA that must be available.
+
+        Returns:
+            Path: Path of the bare mirror.
+
+        Raises:
+            git.exc.GitCommandError: If the commit cannot be fetched.
+        """
+        mirror = self._mirror_path()
+        with FileLock(mirror.with_suffix(".lock")):
+            if (mirror / "HEAD").exists():
+                repo = Repo(mirror)
+            else:
+                repo = Repo.init(mirror, bare=True)
+                repo.create_remote("origin", self.repo_url)
+                # run checkouts borrow objects from the mirror, they must never be pruned
+                repo.git.config("gc.auto", "0")
+
+            if not self._has_commit(repo, head_commit_hash):
+                try:
+                    repo.git.fetch("origin", head_commit_hash)
+                except GitCommandError:
+                    repo.git.fetch("origin", "+refs/heads/*:refs/heads/*")
+        return mirror
+
+    def _clone_from_mirror(self, head_commit_hash: str, directory: str) -> None:
+        """
+        Create the run checkout as a shared clone of the mirror and check out the commit.
+        """
+        mirror = self.update_mirror(head_commit_hash)
+        repo = Repo.clone_from(str(mirror), directory, shared=True, no_checkout=True)
+        repo.git.checkout(head_commit_hash)
+
+    @staticmethod
+    def _has_commit(repo: Repo, head_commit_hash: str) -> bool:
+        try:
+            repo.git.cat_file("-e", f"{head_commit_hash}^{{commit}}")
+        except GitCommandError:
+            return False
+        return True
+
     
 def get_GitCloneService(settings:Settings = get_settings()) -> GitcloneService:
     """
@@ -67,4 +229,10 @@ def get_GitCloneService(settings:Settings = get_settings()) -> GitcloneService:
     :return: Description
     :rtype: GitcloneService
     """
-    return GitcloneService(settings.REPO_URL)
\ No newline at end of file
+    return GitcloneService(
+        settings.REPO_URL,
+        strategy=settings.CLONE_STRATEGY,
+        cache_folder=settings.GIT_CACHE_FOLDER,
+        clone_filter=settings.GIT_CLONE_FILTER,
+        sparse_paths=settings.GIT_SPARSE_PATHS,
+    )
\ No newline at end of file
@@ -0,0 +1,173 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+import requests
+
+from basic_ci.core.config import Settings, get_settings
+
+
+class Rate_limited(requests.RequestException):
+    """
+    A request was not sent, or was rejected, because the GitHub rate limit is
+    exhausted. It can be sent again at retry_at.
+    """
+
+    def __init__(self, retry_at: float, *args: object, **kwargs: object) -> None:
+        """
+        Args:
+            retry_at (float): Unix time after which the request may be sent again.
+        """
+        super().__init__(*args, **kwargs)  # type: ignore[arg-type]
+        self.retry_at = retry_at
+
+
+class Rate_limit_budget:
+    """
+    Tracks the GitHub API rate limit of a token from the response headers.
+
+    - X-RateLimit-Limit / -Remaining / -Reset: the hourly budget, the requests
+      left and the Unix time it is refilled
+    - Retry-After: seconds to wait after a secondary rate limit (403 or 429)
+
+    Every request takes one token of the budget before it is sent, so concurrent
+    senders do not overshoot it before the next response corrects the count. Once
+    no more than `reserve` tokens are left, or GitHub asked to retry later,
+    acquire() tells the caller how long to wait instead of letting the request
+    fail. Without any headers seen yet the budget is unknown and nothing is held back.
+    """
+    # GitHub asks to wait at least a minute after a secondary rate limit without Retry-After
+    DEFAULT_RETRY_AFTER = 60.0
+
+    def __init__(self, reserve: int = 0) -> None:
+        """
+        Args:
+            reserve (int): Tokens left to other users of the token. Defaults to 0.
+        """
+        self.reserve = reserve
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes a token for a request if the budget allows it.
+
+        Returns:
+            float: 0 if the request may be sent now, otherwise the seconds to wait.
+        """
+        now = time.time()
+        with self._lock:
+            wait = self._wait(now)
+            if wait <= 0 and self.remaining is not None:
+                self.remaining -= 1
+            return wait
+
+    def wait(self) -> float:
+        """
+        Returns:
+            float: Seconds until a request may be sent, 0 if it may be sent now.
+        """
+        with self._lock:
+            return self._wait(time.time())
+
+    def update(self, headers: Mapping[str, str], status_code: int) -> bool:
+        """
+        Updates the budget from a response.
+
+        Args:
+            headers (Mapping[str, str]): The response headers.
+            status_code (int): The response status code.
+
+        Returns:
+            bool: True if the request was rejected because of a rate limit.
+        """
+        now = time.time()
+        retry_after = self._retry_after(headers.get("Retry-After"), now)
+        with self._lock:
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+            limited = status_code == 429 or (
+                status_code == 403 and (retry_after is not None or self.remaining == 0)
+            )
+            if not limited:
+                return False
+            self.throttled += 1
+            if retry_after is not None:
+                until = now + retry_after
+            elif self.remaining == 0 and self.reset_at is not None and self.reset_at > now:
+                until = self.reset_at
+            else:
+                until = now + self.DEFAULT_RETRY_AFTER
+            self.blocked_until = max(self.blocked_until, until)
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: The budget (-1 while unknown), the seconds until it is
+            refilled and until requests may be sent again, and the number of rate
+            limited responses.
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                "limit": self.limit if self.limit is not None else -1,
+                "remaining": self.remaining if self.remaining is not None else -1,
+                "reset_in": int(max(0.0, (self.reset_at or now) - now)),
+                "wait": int(self._wait(now) + 0.999),
+                "throttled": self.throttled,
+            }
+
+    def _wait(self, now: float) -> float:
+        wait = self.blocked_until - now
+        if self.reset_at is not None and self.reset_at <= now:
+            # the budget was refilled, the next response tells how much is left
+            self.remaining = None
+            self.reset_at = None
+        if self.remaining is not None and self.remaining <= self.reserve and self.reset_at is not None:
+            wait = max(wait, self.reset_at - now)
+        return max(0.0, wait)
+
+    @staticmethod
+    def _retry_after(value: Optional[str], now: float) -> Optional[float]:
+        """Retry-After is either seconds or an HTTP date."""
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+        except (TypeError, ValueError):
+            return None
+
+
+_rate_limit_budget: Optional[Rate_limit_budget] = None
+_rate_limit_budget_guard = threading.Lock()
+
+
+def get_Rate_limit_budget(settings: Settings = get_settings()) -> Rate_limit_budget:
+    """
+    Factory for the Rate_limit_budget. The rate limit belongs to the token, so
+    every NotificationService shares the same instance, with or without outbox.
+
+    :param settings: The settings holding the reserve of the rate limit
+    :type settings: Settings
+    :return: the application wide Rate_limit_budget
+    :rtype: Rate_limit_budget
+    """
+    global _rate_limit_budget
+    with _rate_limit_budget_guard:
+        if _rate_limit_budget is None:
+            _rate_limit_budget = Rate_limit_budget(reserve=settings.NOTIFICATION_RATE_LIMIT_RESERVE)
+    return _rate_limit_budget
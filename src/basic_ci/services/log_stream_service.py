@@ -0,0 +1,279 @@
+import asyncio
+import codecs
+import os
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from fastapi.concurrency import iterate_in_threadpool
+
+from basic_ci.services.stage_log_store import (
+    COMPRESSED_SUFFIX,
+    Stage_log_store,
+    get_Stage_log_store,
+)
+
+# (offset of the first byte, bytes) or None once the log is complete
+Chunk = Optional[Tuple[int, bytes]]
+
+
+class Log_subscription:
+    """
+    One viewer of a Log_tail. Chunks are handed over from the tail thread to
+    the event loop of the viewer's request.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue[Chunk] = asyncio.Queue()
+
+    def push(self, chunk: Chunk) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, chunk)
+        except RuntimeError:
+            pass  # the viewer's event loop is closed, it is removed on unsubscribe
+
+
+class Log_tail:
+    """
+    Follows a log file that a stage is writing to with a single reader thread
+    and hands every new chunk to all subscribers.
+
+    The tail only reads what is appended after it was started. Subscribers catch
+    up on older bytes themselves, from a duplicate of the tail's file descriptor,
+    so the log is still readable if it is replaced by its compressed version.
+    The log is complete once the file is removed (compressed when the run is
+    saved) and everything written to it has been read.
+    """
+    POLL_INTERVAL = 0.2
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, path: Path) -> None:
+        """
+        Args:
+            path (Path): The log file to follow.
+
+        Raises:
+            FileNotFoundError: If the log file does not exist.
+        """
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        self.position = os.fstat(self._fd).st_size
+        self.finished = False
+        self._subscribers: Set[Log_subscription] = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._follow, name=f"log-tail-{path.name}", daemon=True
+        )
+        self._thread.start()
+
+    def add(self, subscription: Log_subscription) -> Tuple[int, int]:
+        """
+        Registers a subscriber. It receives every chunk read from now on.
+
+        Returns:
+            Tuple[int, int]: A duplicated file descriptor of the log and the
+            position from which on chunks are pushed, bytes before that position
+            have to be read from the descriptor.
+
+        Raises:
+            FileNotFoundError: If the tail has already stopped.
+        """
+        with self._lock:
+            if self.finished:
+                raise FileNotFoundError(self.path)
+            self._subscribers.add(subscription)
+            return os.dup(self._fd), self.position
+
+    def remove(self, subscription: Log_subscription) -> bool:
+        """
+        Removes a subscriber.
+
+        Returns:
+            bool: True if no subscribers are left and the tail has stopped.
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                self.finished = True
+            return self.finished
+
+    def _follow(self) -> None:
+        try:
+            while True:
+                chunk = os.pread(self._fd, self.CHUNK_SIZE, self.position)
+                with self._lock:
+                    if self.finished:
+                        return
+                    if chunk:
+                        for subscription in self._subscribers:
+                            subscription.push((self.position, chunk))
+                        self.position += len(chunk)
+                        continue
+                    if os.fstat(self._fd).st_nlink == 0:
+                        self.finished = True
+                        for subscription in self._subscribers:
+                            subscription.push(None)
+                        return
+                time.sleep(self.POLL_INTERVAL)
+        finally:
+            with self._lock:
+                self.finished = True
+                os.close(self._fd)
+
+
+class Log_stream_service:
+    """
+    Streams stage logs to viewers as Server-Sent Events.
+
+    Every log file that is being written has at most one Log_tail reading it,
+    shared by all its viewers. Each event carries the byte offset after its data
+    as id, so a reconnecting viewer (Last-Event-ID) or a viewer passing an offset
+    continues exactly where it left off. A saved log is read from the block its
+    offset falls into (see Stage_log_store), off the event loop.
+    """
+    KEEPALIVE_INTERVAL = 15.0
+    RETRY_MS = 2000
+
+    def __init__(self, log_store: Optional[Stage_log_store] = None) -> None:
+        """
+        Args:
+            log_store (Optional[Stage_log_store]): Reads the saved logs. Defaults
+                to the one of get_Stage_log_store.
+        """
+        self.log_store = log_store or get_Stage_log_store()
+        self._tails: Dict[Path, Log_tail] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, path: Path) -> Tuple[Log_tail, Log_subscription, int, int]:
+        """
+        Subscribes the calling request to the live tail of a log file.
+
+        Args:
+            path (Path): The plain log a stage is writing to.
+
+        Returns:
+            Tuple[Log_tail, Log_subscription, int, int]: The tail, the subscription,
+            a file descriptor to catch up from and the position live chunks start at.
+
+        Raises:
+            FileNotFoundError: If the log file does not exist (anymore).
+        """
+        subscription = Log_subscription(asyncio.get_running_loop())
+        with self._lock:
+            tail = self._tails.get(path)
+            if tail is None or tail.finished:
+                tail = self._tails[path] = Log_tail(path)
+            fd, position = tail.add(subscription)
+        return tail, subscription, fd, position
+
+    def unsubscribe(self, tail: Log_tail, subscription: Log_subscription) -> None:
+        with self._lock:
+            if tail.remove(subscription) and self._tails.get(tail.path) is tail:
+                del self._tails[tail.path]
+
+    async def events(self, log_path: Optional[Path], offset: int = 0) -> AsyncIterator[str]:
+        """
+        Server-Sent Events with the content of a stage log from a byte offset on.
+
+        A complete (compressed) log is sent at once, a log that is still written
+        is followed until it is complete. Both end with an `end` event. If the stage
+        has no log yet a `waiting` event is sent and the stream is closed, the
+        EventSource of the viewer reconnects after the retry interval.
+
+        Args:
+            log_path (Optional[Path]): Path of the log, see Read_results_service.stage_log_path.
+            offset (int): Byte offset to start at. Defaults to 0.
+
+        Returns:
+            AsyncIterator[str]: The encoded events.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        if log_path is not None and log_path.suffix != COMPRESSED_SUFFIX:
+            try:
+                tail, subscription, fd, position = self.subscribe(log_path)
+            except FileNotFoundError:
+                # compressed while subscribing, the run has just been saved
+                log_path = log_path.with_name(log_path.name + COMPRESSED_SUFFIX)
+            else:
+                try:
+                    async for event in self._live_events(subscription, fd, position, offset, decoder):
+                        yield event
+                finally:
+                    self.unsubscribe(tail, subscription)
+                return
+
+        if log_path is None or not log_path.exists():
+            yield f"retry: {self.RETRY_MS}\nevent: waiting\ndata: \n\n"
+            return
+        async for chunk in iterate_in_threadpool(self.log_store.iter_range(log_path, offset)):
+            offset += len(chunk)
+            yield self.format_event(decoder.decode(chunk), offset)
+        yield self.format_event(decoder.decode(b"", final=True), offset, "end")
+
+    async def _live_events(
+        self,
+        subscription: Log_subscription,
+        fd: int,
+        position: int,
+        offset: int,
+        decoder: codecs.IncrementalDecoder,
+    ) -> AsyncIterator[str]:
+        try:
+            while offset < position:
+                chunk = os.pread(fd, min(Log_tail.CHUNK_SIZE, position - offset), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield self.format_event(decoder.decode(chunk), offset)
+        finally:
+            os.close(fd)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=self.KEEPALIVE_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is None:
+                break
+            start, chunk = item
+            if start + len(chunk) <= offset:
+                continue
+            chunk = chunk[max(0, offset - start):]
+            offset += len(chunk)
+            yield self.format_event(decoder.decode(chunk), offset)
+        yield self.format_event(decoder.decode(b"", final=True), offset, "end")
+
+    @staticmethod
+    def format_event(data: str, event_id: int, event: Optional[str] = None) -> str:
+        """
+        Encodes one Server-Sent Event. Every line of data becomes its own data
+        field, so the viewer gets the text back with "\\n" line breaks.
+        """
+        lines = data.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        fields = [f"id: {event_id}"]
+        if event is not None:
+            fields.append(f"event: {event}")
+        fields.extend(f"data: {line}" for line in lines)
+        return "\n".join(fields) + "\n\n"
+
+
+_log_stream_service: Optional[Log_stream_service] = None
+
+
+def get_Log_stream_service() -> Log_stream_service:
+    """
+    Factory for the Log_stream_service. The tails are shared by all requests
+    so the same instance is returned on every call.
+
+    :return: the application wide Log_stream_service
+    :rtype: Log_stream_service
+    """
+    global _log_stream_service
+    if _log_stream_service is None:
+        _log_stream_service = Log_stream_service()
+    return _log_stream_service
@@ -0,0 +1,418 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+import requests
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.github_rate_limit import Rate_limited
+from basic_ci.services.notification_service import (
+    NotificationService,
+    get_NotificationService,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT 'basic-ci',
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt);
+CREATE INDEX IF NOT EXISTS outbox_key ON outbox (url, context, state);
+CREATE TABLE IF NOT EXISTS latest_status (
+    url TEXT NOT NULL,
+    context TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (url, context)
+);
+"""
+
+# answers that may succeed when sent again, GitHub answers 403 to secondary rate limits
+RETRY_STATUS_CODES = frozenset({403, 408, 429, 500, 502, 503, 504})
+
+
+class Notification_outbox:
+    """
+    Persistent queue of GitHub commit statuses, delivered in the background.
+
+    A run only stores the status in the outbox (a SQLite database) and goes on,
+    a dispatcher thread sends it through the pooled session of the
+    NotificationService with at most `workers` requests at the same time.
+    Statuses that fail with a network error, a timeout, a rate limit or a server
+    error are retried with exponential backoff (with jitter); they stay in the
+    outbox until they are delivered, so a restart does not lose them. After
+    max_attempts, or on an error that will not go away (e.g. 404, 422), the
+    status is kept as failed for inspection. While the GitHub rate limit of the
+    token is exhausted (see Rate_limit_budget) nothing is sent, statuses that hit
+    it anyway are deferred until it is refilled without using up an attempt.
+
+    Statuses are coalesced per commit and context: a new status replaces the ones
+    of the same commit and context that were not sent yet, e.g. progress updates
+    queued up during a rate limit, so only the latest state is sent. Statuses of
+    the same commit and context are never sent at the same time, so GitHub
+    receives them in order. A status created before the latest one enqueued for
+    its commit and context (e.g. the "queued" status of the webhook after the run
+    already reported) is dropped.
+
+    The outbox is shared by the workers of one process, the database must not be
+    dispatched by several server processes at the same time.
+    """
+    # seconds the dispatcher sleeps at most, in case statuses were added by another process
+    POLL_INTERVAL = 60.0
+    # seconds the creation time of the latest status per commit and context is kept
+    LATEST_RETENTION = 24 * 3600.0
+
+    def __init__(
+        self,
+        outbox_path: str | Path,
+        notification_service: NotificationService,
+        workers: int = 4,
+        max_attempts: int = 10,
+        retry_delay: float = 2.0,
+        max_retry_delay: float = 900.0,
+    ) -> None:
+        """
+        Initialize the outbox. The database file is created on first use.
+
+        Args:
+            outbox_path (Union[str, Path]): Path of the SQLite database file.
+            notification_service (NotificationService): Builds and sends the statuses.
+            workers (int): Statuses sent at the same time. Defaults to 4.
+            max_attempts (int): Attempts before a status is given up. Defaults to 10.
+            retry_delay (float): Seconds before the first retry. Defaults to 2.
+            max_retry_delay (float): Upper bound of the backoff. Defaults to 900.
+
+        Raises:
+            ValueError: If workers is not positive.
+        """
+        if workers < 1:
+            raise ValueError("A notification outbox needs at least one worker")
+        self.outbox_path = Path(outbox_path)
+        self.notification_service = notification_service
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.sent = 0
+        self.retried = 0
+        self.coalesced = 0
+        self.deferred = 0
+        self._initialized = False
+        # entry id -> (url, context) of the statuses being sent
+        self._in_flight: Dict[int, Tuple[str, str]] = {}
+        self._futures: Set[Future[None]] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.outbox_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.outbox_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(outbox)")]
+            if columns and "context" not in columns:
+                # outboxes created before statuses were coalesced
+                conn.execute("ALTER TABLE outbox ADD COLUMN context TEXT NOT NULL DEFAULT 'basic-ci'")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def enqueue(
+        self, task_result: TaskResult, context: str = "basic-ci", created_at: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        Stores the commit status of a run for delivery, replacing the statuses of
+        the same commit and context that were not sent yet.
+
+        Args:
+            task_result (TaskResult): The run to report.
+            context (str): Label of the status check. Defaults to "basic-ci".
+            created_at (Optional[float]): Unix time the status was determined,
+                defaults to now.
+
+        Returns:
+            Optional[int]: The id of the outbox entry, None if a newer status of the
+            commit and context was enqueued before and this one was dropped.
+
+        Raises:
+            ValueError: If the repository URL is not from GitHub.
+            sqlite3.Error: If the outbox database cannot be written.
+        """
+        url, payload = self.notification_service.github_status_request(task_result, context)
+        now = time.time()
+        created_at = now if created_at is None else created_at
+        with closing(self._connect()) as conn, conn:
+            newest = conn.execute(
+                "INSERT INTO latest_status (url, context, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (url, context) DO UPDATE SET created_at = excluded.created_at "
+                "WHERE excluded.created_at >= latest_status.created_at",
+                (url, context, created_at),
+            ).rowcount
+            if not newest:
+                return None
+            conn.execute("DELETE FROM latest_status WHERE created_at < ?", (now - self.LATEST_RETENTION,))
+            # a replaced status that is being sent is dropped if it fails (see _failed)
+            replaced = conn.execute(
+                "DELETE FROM outbox WHERE url = ? AND context = ? AND state = 'pending'", (url, context)
+            ).rowcount
+            cursor = conn.execute(
+                "INSERT INTO outbox (url, context, payload, next_attempt, created_at) VALUES (?, ?, ?, ?, ?)",
+                (url, context, json.dumps(payload), now, now),
+            )
+        with self._lock:
+            self.coalesced += replaced
+        self._wake.set()
+        return int(cursor.lastrowid or 0)
+
+    def start(self) -> None:
+        """Starts the dispatcher, statuses left from before a restart are sent first."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="notification")
+            self._thread = threading.Thread(target=self._dispatch, name="notification-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the dispatcher and waits for the requests in flight. Statuses not sent
+        yet stay in the outbox for the next start.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most. Defaults to None (no limit).
+        """
+        with self._lock:
+            thread, executor = self._thread, self._executor
+            self._thread = self._executor = None
+        if thread is None or executor is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread.join(timeout)
+        with self._lock:
+            futures = set(self._futures)
+        wait(futures, timeout=timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every status was sent or given up, e.g. in tests.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most. Defaults to None (no limit).
+
+        Returns:
+            bool: True if no status is left pending in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                idle = not self._in_flight
+            if idle and not self._pending():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Statuses not delivered yet (pending, of those in flight)
+            and given up (failed), and how often statuses were sent, retried,
+            replaced by a newer one (coalesced) and deferred for the rate limit
+            since the start.
+        """
+        counts: Dict[str, int] = {}
+        if self._initialized or self.outbox_path.exists():  # /metrics does not create the database
+            with closing(self._connect()) as conn:
+                counts = dict(conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+        with self._lock:
+            return {
+                "pending": counts.get("pending", 0),
+                "in_flight": len(self._in_flight),
+                "failed": counts.get("failed", 0),
+                "sent": self.sent,
+                "retried": self.retried,
+                "coalesced": self.coalesced,
+                "deferred": self.deferred,
+            }
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Args:
+            attempts (int): Failed attempts so far, at least 1.
+
+        Returns:
+            float: Seconds until the next attempt, between half and all of
+            retry_delay * 2 ** (attempts - 1), capped by max_retry_delay.
+        """
+        delay = min(self.max_retry_delay, self.retry_delay * 2.0 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _pending(self) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM outbox WHERE state = 'pending' LIMIT 1").fetchone()
+        return row is not None
+
+    def _dispatch(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                delay = self._submit_due()
+            except sqlite3.Error:
+                logger.warning("Reading the notification outbox failed", exc_info=True)
+                delay = self.POLL_INTERVAL
+            self._wake.wait(delay)
+
+    def _submit_due(self) -> float:
+        """Submits due statuses to free workers and returns the seconds until the next one is due."""
+        rate_limit_wait = self.notification_service.rate_limit.wait()
+        if rate_limit_wait > 0:
+            return min(self.POLL_INTERVAL, rate_limit_wait)
+        now = time.time()
+        with self._lock:
+            in_flight = dict(self._in_flight)
+        free = self.workers - len(in_flight)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, url, context, payload, attempts FROM outbox "
+                "WHERE state = 'pending' AND next_attempt <= ? ORDER BY next_attempt, id LIMIT ?",
+                (now, free + len(in_flight)),
+            ).fetchall() if free > 0 else []
+            (next_attempt,) = conn.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE state = 'pending' AND next_attempt > ?", (now,)
+            ).fetchone()
+        busy = set(in_flight.values())
+        for entry_id, url, context, payload, attempts in rows:
+            # a newer status of a commit waits until the older one was sent
+            if free <= 0 or entry_id in in_flight or (url, context) in busy:
+                continue
+            busy.add((url, context))
+            self._submit(entry_id, (url, context), json.loads(payload), attempts)
+            free -= 1
+        if len(busy) >= self.workers or next_attempt is None:
+            return self.POLL_INTERVAL  # woken by a finished request or a new status
+        return min(self.POLL_INTERVAL, max(0.0, float(next_attempt) - now))
+
+    def _submit(self, entry_id: int, key: Tuple[str, str], payload: Dict[str, Any], attempts: int) -> None:
+        executor = self._executor
+        if executor is None:
+            return
+        with self._lock:
+            self._in_flight[entry_id] = key
+        future = executor.submit(self._deliver, entry_id, key[0], payload, attempts)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda done: self._done(entry_id, key[0], attempts, done))
+
+    def _done(self, entry_id: int, url: str, attempts: int, future: "Future[None]") -> None:
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            # not a request error, e.g. the outbox database or a bug, counts as an attempt
+            logger.error("Sending status to %s failed unexpectedly", url, exc_info=error)
+            try:
+                self._failed(entry_id, url, attempts + 1, error)
+            except Exception:
+                logger.exception("Recording the failed status %d in the outbox failed", entry_id)
+        with self._lock:
+            self._in_flight.pop(entry_id, None)
+            self._futures.discard(future)
+        self._wake.set()
+
+    def _deliver(self, entry_id: int, url: str, payload: Dict[str, Any], attempts: int) -> None:
+        try:
+            self.notification_service.post_github_status(url, payload)
+        except requests.RequestException as e:
+            self._failed(entry_id, url, attempts + 1, e)
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+        with self._lock:
+            self.sent += 1
+
+    def _failed(self, entry_id: int, url: str, attempts: int, error: BaseException) -> None:
+        if isinstance(error, Rate_limited):
+            self._defer(entry_id, error.retry_at)
+            return
+        response = error.response if isinstance(error, requests.RequestException) else None
+        retry = response is None or response.status_code in RETRY_STATUS_CODES
+        with closing(self._connect()) as conn, conn:
+            if retry and attempts < self.max_attempts:
+                updated = conn.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                    (attempts, time.time() + self.backoff(attempts), str(error), entry_id),
+                ).rowcount
+                if not updated:
+                    return  # replaced by a newer status while it was sent
+                logger.info("Sending status to %s failed (attempt %d), retrying: %s", url, attempts, error)
+                with self._lock:
+                    self.retried += 1
+                return
+            conn.execute(
+                "UPDATE outbox SET state = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, str(error), entry_id),
+            )
+        logger.warning("Giving up sending status to %s after %d attempts: %s", url, attempts, error)
+
+    def _defer(self, entry_id: int, retry_at: float) -> None:
+        """Reschedules a status that hit the rate limit, the attempt does not count."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE outbox SET next_attempt = ?, last_error = 'rate limited' WHERE id = ?",
+                (retry_at, entry_id),
+            )
+        with self._lock:
+            self.deferred += 1
+        logger.info("GitHub rate limit reached, deferring statuses for %.0fs", retry_at - time.time())
+
+
+_notification_outbox: Optional[Notification_outbox] = None
+_notification_outbox_guard = threading.Lock()
+
+
+def get_Notification_outbox(settings: Settings = get_settings()) -> Optional[Notification_outbox]:
+    """
+    Factory for the Notification_outbox. The outbox is shared by all TaskRunners
+    so the same instance is returned on every call.
+
+    :param settings: The settings holding the outbox configuration
+    :type settings: Settings
+    :return: the application wide Notification_outbox, None if NOTIFICATION_WORKERS is 0
+    :rtype: Optional[Notification_outbox]
+    """
+    global _notification_outbox
+    if settings.NOTIFICATION_WORKERS <= 0:
+        return None
+    with _notification_outbox_guard:
+        if _notification_outbox is None:
+            outbox_path = settings.NOTIFICATION_OUTBOX_PATH or Path(settings.SAVE_FOLDER) / "outbox.sqlite3"
+            _notification_outbox = Notification_outbox(
+                outbox_path,
+                notification_service=get_NotificationService(settings=settings),
+                workers=settings.NOTIFICATION_WORKERS,
+                max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+                retry_delay=settings.NOTIFICATION_RETRY_DELAY,
+                max_retry_delay=settings.NOTIFICATION_MAX_RETRY_DELAY,
+            )
+    return _notification_outbox
@@ -1,8 +1,17 @@
 
+import time
+from typing import Any, Dict, Optional, Tuple
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from basic_ci.core.config import Settings, get_settings
 from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.github_rate_limit import (
+    Rate_limit_budget,
+    Rate_limited,
+    get_Rate_limit_budget,
+)
 
 
 class NotificationService:
@@ -11,7 +20,16 @@ class NotificationService:
     Later it can be extended to email / Slack, etc.
     """
 
-    def __init__(self, github_token: str, github_api_base: str = "https://api.github.com"):
+    TIMEOUT = 15
+
+    def __init__(
+        self,
+        github_token: str,
+        github_api_base: str = "https://api.github.com",
+        pool_size: int = 4,
+        rate_limit_reserve: int = 0,
+        rate_limit: Optional[Rate_limit_budget] = None,
+    ):
         """
         Initialize the NotificationService with GitHub API credentials.
 
@@ -22,6 +40,13 @@ class NotificationService:
             github_api_base (str): Base URL for GitHub API. Defaults to
                                   "https://api.github.com". Can be overridden for
                                   GitHub Enterprise instances.
+            pool_size (int): Keep-alive connections kept open to the API, should be
+                             at least the number of threads sending. Defaults to 4.
+            rate_limit_reserve (int): Requests of the rate limit left to other users
+                             of the token, if no rate_limit is given. Defaults to 0.
+            rate_limit (Optional[Rate_limit_budget]): The budget of the token shared
+                             with the other users of the token in this process.
+                             Defaults to a budget of this service only.
 
         Returns:
             None
@@ -29,6 +54,18 @@ class NotificationService:
 
         self.github_token = github_token
         self.github_api_base = github_api_base.rstrip("/")
+        # reuses connections (and their TLS sessions) instead of one handshake per status
+        self.session = requests.Session()
+        self.session.mount(
+            self.github_api_base + "/",
+            HTTPAdapter(pool_connections=1, pool_maxsize=pool_size),
+        )
+        # taken by every request, see post_github_status
+        self.rate_limit = rate_limit or Rate_limit_budget(reserve=rate_limit_reserve)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.github_token}",
+            "Accept": "application/vnd.github+json",
+        })
 
     def send_github_status(
         self,
@@ -58,7 +95,29 @@ class NotificationService:
             KeyError: If the task_result is missing required fields
 
         """
-        state = self._map_state(task_result.status) 
+        url, payload = self.github_status_request(task_result, context)
+        self.post_github_status(url, payload)
+
+    def github_status_request(
+        self,
+        task_result: TaskResult,
+        context: str = "basic-ci",
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the request that creates the commit status, without sending it.
+
+        Args:
+            task_result (TaskResult): Result object containing the CI run results.
+            context (str): Label that identifies the status check in GitHub UI.
+                          Defaults to "basic-ci".
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: The statuses URL of the commit and the JSON payload.
+
+        Raises:
+            ValueError: If the repository URL cannot be parsed or is not from GitHub
+        """
+        state = self._map_state(task_result.status)
 
         description = task_result.summary or f"CI finished with status: {task_result.status}"
         if len(description) > 140:
@@ -75,14 +134,36 @@ class NotificationService:
 
         owner, repo = self._parse_github_repo(task_result.repo_url)
         url = f"{self.github_api_base}/repos/{owner}/{repo}/statuses/{task_result.commit_sha}"
+        return url, payload
 
-        headers = {
-            "Authorization": f"Bearer {self.github_token}",
-            "Accept": "application/vnd.github+json",
-        }
+    def post_github_status(self, url: str, payload: Dict[str, Any]) -> requests.Response:
+        """
+        Send a request built by github_status_request over the pooled session.
+
+        The request is not sent while the rate limit budget is exhausted, and a
+        response rejected for the rate limit raises Rate_limited as well, so the
+        caller can send it again at retry_at.
 
-        resp = requests.post(url, json=payload, headers=headers, timeout=15)
+        Args:
+            url (str): The statuses URL of the commit.
+            payload (Dict[str, Any]): The JSON payload.
+
+        Returns:
+            requests.Response: The successful response.
+
+        Raises:
+            Rate_limited: If the rate limit does not allow the request now
+            requests.exceptions.RequestException: If the GitHub API request fails
+        """
+        wait = self.rate_limit.acquire()
+        if wait > 0:
+            raise Rate_limited(time.time() + wait, f"GitHub rate limit exhausted, retry in {wait:.0f}s")
+        resp = self.session.post(url, json=payload, timeout=self.TIMEOUT)
+        if self.rate_limit.update(resp.headers, resp.status_code):
+            retry_at = time.time() + self.rate_limit.wait()
+            raise Rate_limited(retry_at, f"GitHub rate limit hit ({resp.status_code})", response=resp)
         resp.raise_for_status()
+        return resp
 
     @staticmethod
     def _map_state(status: str) -> str:
@@ -146,4 +227,8 @@ def get_NotificationService(settings: Settings = get_settings())-> NotificationS
     :return: a new instance of Settings 
     :rtype: NotificationService
     """
-    return NotificationService(settings.GITHUB_TOKEN)
\ No newline at end of file
+    return NotificationService(
+        settings.GITHUB_TOKEN,
+        pool_size=max(1, settings.NOTIFICATION_WORKERS),
+        rate_limit=get_Rate_limit_budget(settings=settings),
+    )
\ No newline at end of file
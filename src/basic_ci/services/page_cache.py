@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, TypeVar
+
+from basic_ci.core.config import Settings, get_settings
+
+V = TypeVar("V")
+# response headers (ETag, Last-Modified, Cache-Control) and the rendered HTML
+Page = Tuple[Dict[str, str], bytes]
+
+
+class Page_cache:
+    """
+    Remembers what was sent for finished runs, which never change.
+
+    - the ETag of every recently requested finished run, so a conditional
+      request (If-None-Match) is answered with 304 without touching the disk
+    - the rendered HTML of the most viewed finished runs, so a repeated view
+      does not parse or render anything
+
+    Both are LRU maps keyed by run_id, a limit of 0 disables that part.
+    """
+
+    def __init__(self, max_pages: int = 64, max_etags: int = 4096) -> None:
+        """
+        Args:
+            max_pages (int): Maximum number of rendered pages. Defaults to 64.
+            max_etags (int): Maximum number of remembered ETags. Defaults to 4096.
+        """
+        self.max_pages = max_pages
+        self.max_etags = max_etags
+        self.hits = 0
+        self.not_modified = 0
+        self._pages: OrderedDict[str, Page] = OrderedDict()
+        self._etags: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, run_id: str) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The ETag of a finished run if it is known.
+        """
+        with self._lock:
+            etag = self._etags.get(run_id)
+            if etag is not None:
+                self._etags.move_to_end(run_id)
+            return etag
+
+    def page(self, run_id: str) -> Optional[Page]:
+        """
+        Returns:
+            Optional[Page]: The response headers and rendered HTML of a finished run if cached.
+        """
+        with self._lock:
+            page = self._pages.get(run_id)
+            if page is not None:
+                self._pages.move_to_end(run_id)
+                self.hits += 1
+            return page
+
+    def put(self, run_id: str, headers: Dict[str, str], body: bytes) -> None:
+        """
+        Remembers the ETag and the rendered page of a finished run.
+
+        Args:
+            run_id (str): The ID of the run.
+            headers (Dict[str, str]): The caching headers of the page, including the ETag.
+            body (bytes): The rendered HTML page.
+        """
+        with self._lock:
+            self._store(self._etags, run_id, headers["ETag"], self.max_etags)
+            self._store(self._pages, run_id, (headers, body), self.max_pages)
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    @staticmethod
+    def _store(entries: "OrderedDict[str, V]", key: str, value: V, limit: int) -> None:
+        if limit <= 0:
+            return
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Counters and current usage of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "not_modified": self.not_modified,
+                "pages": len(self._pages),
+                "etags": len(self._etags),
+                "max_pages": self.max_pages,
+                "max_etags": self.max_etags,
+            }
+
+
+_page_cache: Optional[Page_cache] = None
+
+
+def get_Page_cache(settings: Settings = get_settings()) -> Page_cache:
+    """
+    Factory for the Page_cache. The cache is shared by all requests so the
+    same instance is returned on every call.
+
+    :param settings: The settings holding the cache limits
+    :type settings: Settings
+    :return: the application wide Page_cache
+    :rtype: Page_cache
+    """
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = Page_cache(
+            max_pages=settings.PAGE_CACHE_MAX_PAGES,
+            max_etags=settings.PAGE_CACHE_MAX_ETAGS,
+        )
+    return _page_cache
@@ -1,4 +1,7 @@
 
+import hashlib
+from typing import Optional
+
 import yaml
 
 from basic_ci.core.config import Settings, get_settings
@@ -26,7 +29,8 @@ class Pipeline_Config_service:
             
         Raises:
             FileNotFoundError: If pipelin configuration file cannot be found.
-            ValueError: If pipeline configuration cannot be parsed.
+            ValueError: If pipeline configuration cannot be parsed or the stage
+                        dependencies are invalid (unknown stage, cycle).
         """
         try:
             with open(self.settings.PIPELINE_CONFIG_PATH, "r") as f:
@@ -37,11 +41,27 @@ class Pipeline_Config_service:
         try:
             config = PipelineConfig(
                 project=raw_data.get('project', 'default_project'),
-                stages=[Stage(**s) for s in raw_data.get('stages', [])]
+                stages=[Stage(**s) for s in raw_data.get('stages', [])],
+                max_parallel=raw_data.get('max_parallel', 1),
+                fail_fast=raw_data.get('fail_fast', False),
             )    
+            config.validate()
         except Exception as e:
             raise ValueError(f"Error parsing pipeline configuration: {e}") 
         return config
+
+    def config_hash(self) -> Optional[str]:
+        """
+        Hash of the pipeline configuration file, part of the build cache key.
+
+        Returns:
+            Optional[str]: The sha256 hex digest of the file, None if it does not exist.
+        """
+        try:
+            with open(self.settings.PIPELINE_CONFIG_PATH, "rb") as f:
+                return hashlib.file_digest(f, "sha256").hexdigest()
+        except FileNotFoundError:
+            return None
     
 
 def get_pipeline_config_service(settings: Settings = get_settings()) -> Pipeline_Config_service:
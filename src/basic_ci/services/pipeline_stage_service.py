@@ -1,64 +1,298 @@
+import dataclasses
+import hashlib
+import re
+import shlex
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 
 from basic_ci.core.config import Settings, get_settings
-from basic_ci.schemes.pipeline import Stage
+from basic_ci.schemes.pipeline import PipelineConfig, Stage
 from basic_ci.schemes.stage_result import Stage_result
 from basic_ci.services.pipeline_config_service import (
     Pipeline_Config_service,
     get_pipeline_config_service,
 )
 from basic_ci.services.ServiceCommand import ServiceCommand
+from basic_ci.services.stage_cache_service import Stage_cache, get_Stage_cache
+
+
+def stage_log_slug(stage_name: str) -> str:
+    """Filesystem safe form of a stage name, used in the stage log file names."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", stage_name).strip("_") or "stage"
+
+
+def stage_log_name(index: int, stage_name: str) -> str:
+    """
+    File name of a stage log, made unique and filesystem safe by prefixing
+    the position of the stage in the pipeline.
+    """
+    return f"{index:02d}_{stage_log_slug(stage_name)}.log"
 
 
 class Pipeline_stage_service:
-    def __init__(self,command_service:ServiceCommand,pipeline_config_service:Pipeline_Config_service = get_pipeline_config_service()):
+    def __init__(self,command_service:ServiceCommand,pipeline_config_service:Pipeline_Config_service = get_pipeline_config_service(),
+                 stage_cache: Optional[Stage_cache] = None):
         """
         Setup in order to be able to execute stages of pipeline
 
         Args:
             command_service (ServiceCommand): Object used to run commands.
             pipeline_config_service (Pipeline_Config_service): Object that hold pipeline configuration
+            stage_cache (Optional[Stage_cache]): Store of successful results of stages with
+                `inputs:`, None disables skipping stages with unchanged inputs.
         """
             
         self.command_service = command_service
         self.pipeline_config_service = pipeline_config_service
+        self.stage_cache = stage_cache
 
-    def run_stage(self,stage: Stage, path:str | Path)->Stage_result:
+    def run_stage(
+        self,
+        stage: Stage,
+        path: str | Path,
+        cancel_event: Optional[threading.Event] = None,
+        log_path: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Stage_result:
         """
         This runs a stage in the pipeline, which is a command.
         
         Args:
             stage(Stage): Holds information about commands to execute during this stage.
             path(str): Path of the directory where command is run.
+            cancel_event(Optional[threading.Event]): If set while the stage runs, the
+                command is killed and the stage is reported as skipped.
+            log_path(Optional[Path]): If given, the output is streamed into this file
+                and the Stage_result references it instead of holding the output.
+            env(Optional[Dict[str, str]]): Variables added to the environment of the command.
         Returns:
             (Stage_result): Information about the execution of this stage.
         
         """
-        result = self.command_service.run_command(stage.command.split(), path=Path(path))
+        options: Dict[str, Any] = {}
+        if cancel_event is not None:
+            options["cancel_event"] = cancel_event
+        if env:
+            options["env"] = env
+        if log_path is not None:
+            result = self.command_service.stream_command(
+                stage.command.split(), path=Path(path), log_path=log_path, **options
+            )
+        else:
+            result = self.command_service.run_command(
+                stage.command.split(), path=Path(path), **options
+            )
+        output = result.stdout + result.stderr
+        cancelled = (
+            cancel_event is not None and cancel_event.is_set() and result.returncode != 0
+        )
+        if cancelled:
+            output += "\nStage cancelled because another stage failed."
         return Stage_result(
             name=stage.stage,
             success=result.returncode == 0,
             command=stage.command,
-            output=result.stdout + result.stderr
+            output=output,
+            skipped=cancelled,
+            allow_failure=stage.allow_failure,
+            log_file=log_path.name if log_path is not None else None,
+            started_at=result.started_at,
+            finished_at=result.finished_at,
+            exit_code=result.returncode,
+            wall_time=result.wall_time,
+            user_time=result.user_time,
+            sys_time=result.sys_time,
+            max_rss_kb=result.max_rss_kb,
+        )
+
+    @staticmethod
+    def log_file_name(index: int, stage: Stage) -> str:
+        """File name of the log of the stage at position index, see stage_log_name."""
+        return stage_log_name(index, stage.stage)
+
+    @staticmethod
+    def _skipped_result(stage: Stage) -> Stage_result:
+        return Stage_result(
+            name=stage.stage,
+            success=False,
+            command=stage.command,
+            output="Stage skipped because an earlier stage failed.",
+            skipped=True,
+            allow_failure=stage.allow_failure,
         )
     
-    def run_stages(self,path:str | Path) -> List[Stage_result]:
+    def input_key(self, stage: Stage, path: str | Path) -> Optional[str]:
+        """
+        Hashes the command of a stage and the files matching its `inputs:` patterns.
+        The files are identified by their git blob IDs from the index of the checkout,
+        so nothing has to be read or hashed again.
+
+        Args:
+            stage (Stage): The stage.
+            path (str | Path): The checkout the stage runs in.
+
+        Returns:
+            Optional[str]: The cache key, None if the stage has no inputs or the
+            checkout is not a git repository.
+        """
+        if not stage.inputs:
+            return None
+        pathspecs = [shlex.quote(f":(glob){pattern}") for pattern in stage.inputs]
+        result = self.command_service.run_command(
+            ["git", "ls-files", "--stage", "--", *pathspecs], path=Path(path)
+        )
+        if result.returncode != 0:
+            return None
+        key = hashlib.sha256()
+        for part in (stage.command, "\0".join(stage.inputs), result.stdout):
+            key.update(part.encode("utf-8"))
+            key.update(b"\0")
+        return key.hexdigest()
+
+    def _cached_results(
+        self, config: PipelineConfig, path: str | Path, keys: Dict[str, str]
+    ) -> Dict[str, Stage_result]:
+        """
+        Finds the stages whose inputs already passed. A cached stage is only skipped
+        if every stage that needs it is skipped too, because a stage that runs may
+        depend on the side effects (installed packages, build output) of its needs.
+        """
+        if self.stage_cache is None:
+            return {}
+        cached: Dict[str, Stage_result] = {}
+        for stage in config.stages:
+            key = self.input_key(stage, path)
+            if key is None:
+                continue
+            keys[stage.stage] = key
+            stored = self.stage_cache.get(key)
+            if stored is not None and stored.success:
+                cached[stage.stage] = stored
+        dependencies = config.dependencies()
+        changed = True
+        while changed:
+            changed = False
+            for name, needs in dependencies.items():
+                if name in cached:
+                    continue
+                for need in needs:
+                    if need in cached:
+                        del cached[need]
+                        changed = True
+        return cached
+
+    @staticmethod
+    def _reused_result(stage: Stage, stored: Stage_result, log_path: Optional[Path]) -> Stage_result:
+        output = f"Inputs unchanged ({', '.join(stage.inputs or [])}), the stage passed before and was not run."
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            log_path.write_text(output + "\n")
+        now = datetime.now()
+        return dataclasses.replace(
+            stored,
+            name=stage.stage,
+            command=stage.command,
+            output=output if log_path is None else "",
+            skipped=False,
+            allow_failure=stage.allow_failure,
+            log_file=log_path.name if log_path is not None else None,
+            cached=True,
+            started_at=now,
+            finished_at=now,
+            wall_time=0.0,
+            user_time=0.0,
+            sys_time=0.0,
+            max_rss_kb=0,
+        )
+
+    def run_stages(
+        self, path: str | Path, log_folder: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+        on_progress: Optional[Callable[[List[Stage_result], int], None]] = None,
+    ) -> List[Stage_result]:
         """
         This gets the stages from the pipeline and runs them by calling .run_stage().
+
+        Stages are scheduled as a dependency graph: every stage whose `needs` are
+        finished is started, at most `max_parallel` of the pipeline at the same time.
+        Stages without `needs` wait for the previous stage, so a pipeline without
+        any `needs` runs in order exactly like before.
+        With `fail_fast` the first failing stage (that is not `allow_failure`) stops
+        the pipeline: stages not started yet are recorded as skipped and stages
+        still running are cancelled by killing their process groups.
+        Stages with `inputs:` whose input files already passed are not run, their
+        cached result is reported instead (see _cached_results).
         
         Args:
             path(str): The path of the directory.
+            log_folder(Optional[Path]): Folder the stage outputs are streamed to, one
+                log file per stage. If None the output is kept in the Stage_result.
+            env(Optional[Dict[str, str]]): Variables added to the environment of every stage.
+            on_progress(Optional[Callable[[List[Stage_result], int], None]]): Called with
+                the results so far and the number of stages whenever stages finished.
         
         Returns:
-            List of stage_results: Information from execution of each stage.
+            List of stage_results: Information from execution of each stage,
+            in the order the stages are defined in the pipeline.
         """
-        stages = self.pipeline_config_service.load_pipeline_config().stages
-        results = []
-        for stage in stages:
-            result = self.run_stage(stage, path=path)
-            results.append(result)
-        return results
+        config = self.pipeline_config_service.load_pipeline_config()
+        dependencies = config.dependencies()
+        pending = {stage.stage: stage for stage in config.stages}
+        log_paths: Dict[str, Optional[Path]] = {
+            stage.stage: log_folder / self.log_file_name(i, stage) if log_folder else None
+            for i, stage in enumerate(config.stages)
+        }
+        results: Dict[str, Stage_result] = {}
+        running: Dict[Future[Stage_result], str] = {}
+        keys: Dict[str, str] = {}
+        cached = self._cached_results(config, path, keys)
+        cancel_event = threading.Event() if config.fail_fast else None
+
+        with ThreadPoolExecutor(max_workers=config.max_parallel) as pool:
+            while pending or running:
+                if cancel_event is not None and cancel_event.is_set():
+                    for name in list(pending):
+                        results[name] = self._skipped_result(pending.pop(name))
+                ready = [
+                    name for name in pending
+                    if all(need in results for need in dependencies[name])
+                ]
+                reused = [name for name in ready if name in cached]
+                for name in reused:
+                    results[name] = self._reused_result(
+                        pending.pop(name), cached[name], log_paths[name]
+                    )
+                if reused:
+                    if on_progress is not None:
+                        on_progress(list(results.values()), len(config.stages))
+                    continue
+                for name in ready[: config.max_parallel - len(running)]:
+                    stage = pending.pop(name)
+                    future = pool.submit(
+                        self.run_stage, stage, path, cancel_event, log_paths[name], env
+                    )
+                    running[future] = name
+                if not running:
+                    if pending:
+                        raise ValueError(f"Stages can never run: {', '.join(pending)}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    name = running.pop(future)
+                    results[name] = result
+                    if self.stage_cache is not None and name in keys and result.success:
+                        self.stage_cache.put(keys[name], result)
+                    if cancel_event is not None and result.is_failure():
+                        cancel_event.set()
+                if on_progress is not None:
+                    on_progress(list(results.values()), len(config.stages))
+
+        return [results[stage.stage] for stage in config.stages]
 
 
 def get_Pipeline_stage_service(settings: Settings = get_settings()) -> Pipeline_stage_service:
@@ -69,4 +303,6 @@ def get_Pipeline_stage_service(settings: Settings = get_settings()) -> Pipeline_
     """
     command_service = ServiceCommand()
     pipeline_config_service = get_pipeline_config_service(settings = settings)
-    return Pipeline_stage_service(command_service, pipeline_config_service)
\ No newline at end of file
+    return Pipeline_stage_service(
+        command_service, pipeline_config_service, stage_cache=get_Stage_cache(settings=settings)
+    )
\ No newline at end of file
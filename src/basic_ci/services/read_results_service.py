@@ -1,44 +1,173 @@
-import json
+import hashlib
+import os
+from dataclasses import replace
 from pathlib import Path
+from typing import Iterator, Optional, Tuple
 
 from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.run_summary import Run_page
+from basic_ci.schemes.task_result_codec import decode_task_result
 from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.pipeline_stage_service import stage_log_slug
+from basic_ci.services.result_save_service import LOG_FOLDER, SUMMARY_FILE
+from basic_ci.services.run_index_service import (
+    Run_index_service,
+    get_Run_index_service,
+)
+from basic_ci.services.stage_log_store import Stage_log_store, get_Stage_log_store
+from basic_ci.services.task_result_cache import (
+    Task_result_cache,
+    get_Task_result_cache,
+)
 
 
 class Read_results_service:
-    def __init__(self, settings: Settings = get_settings()) -> None:
+    def __init__(
+        self,
+        settings: Settings = get_settings(),
+        run_index: Optional[Run_index_service] = None,
+        log_store: Optional[Stage_log_store] = None,
+        cache: Optional[Task_result_cache] = None,
+    ) -> None:
         self.settings = settings
+        self.run_index = run_index or get_Run_index_service(settings=settings)
+        self.log_store = log_store or get_Stage_log_store()
+        # a private cache unless the shared one is passed, see get_Read_results_service
+        self.cache = cache or Task_result_cache(
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+            max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+        )
 
-    def get_task_result(self, run_id: str) -> TaskResult:
+    def get_task_result(self, run_id: str, with_logs: bool = False) -> TaskResult:
         """
-        Reads the results of a given run from the file system
+        Reads the results of a given run from the file system.
+        Only the small summary.json is parsed, the stage logs are loaded
+        when they are asked for. Parsed summaries are kept in the shared
+        Task_result_cache as long as the file does not change.
         Args:
             run_id (str): The ID of the run to read results for
+            with_logs (bool): If True the output of every stage is read from its
+                log file. Defaults to False.
         Returns:
-            TaskResult: The results of the run as a TaskResult object
+            TaskResult: The results of the run as a TaskResult object. Without logs
+            it may be shared with other requests and must not be modified.
         """
-        task_result_path = Path(self.settings.SAVE_FOLDER) / run_id / "taskResult.json"
-  
-        task_result_dict = json.load(task_result_path.open())
-        return TaskResult(**task_result_dict)
-    
-    def get_all_runs(self) -> list[TaskResult]:
+        task_result, _ = self.get_task_result_and_etag(run_id)
+        if with_logs:
+            task_result = replace(
+                task_result,
+                stages=[
+                    replace(stage, output=self.read_stage_log(run_id, stage.log_file) + stage.output)
+                    if stage.log_file else stage
+                    for stage in task_result.stages
+                ],
+            )
+        return task_result
+
+    def get_task_result_and_etag(self, run_id: str) -> Tuple[TaskResult, str]:
+        """
+        Reads the results of a given run, without stage logs, together with a
+        strong ETag derived from the content of its summary.
+        Args:
+            run_id (str): The ID of the run to read results for
+        Returns:
+            Tuple[TaskResult, str]: The (shared, do not modify) results and the quoted ETag
+        """
+        task_result_path = Path(self.settings.SAVE_FOLDER) / run_id / SUMMARY_FILE
+
+        with task_result_path.open("rb") as f:
+            stat = os.fstat(f.fileno())
+            version = (stat.st_mtime_ns, stat.st_size)
+            cached = self.cache.get(run_id, version)
+            if cached is not None:
+                return cached
+            data = f.read()
+        task_result = decode_task_result(data)
+        etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+        self.cache.put(run_id, version, task_result, etag)
+        return task_result, etag
+
+    def read_stage_log(self, run_id: str, log_file: str) -> str:
+        """
+        Reads the output of a stage, either the compressed log of a saved run
+        or the plain log a stage is still streaming to.
+        Args:
+            run_id (str): The ID of the run
+            log_file (str): File name of the log inside the run's logs folder
+        Returns:
+            str: The log content, empty if the log does not exist
+        """
+        log_path = Path(self.settings.SAVE_FOLDER) / run_id / LOG_FOLDER / Path(log_file).name
+        if not log_path.exists():
+            return ""
+        return b"".join(self.log_store.iter_range(log_path)).decode("utf-8", errors="replace")
+
+    def stage_log_path(self, run_id: str, stage_name: str) -> Optional[Path]:
+        """
+        Finds the log of a stage: the compressed log of a saved run, or the plain
+        log a stage of a running run is streaming to.
+        Args:
+            run_id (str): The ID of the run
+            stage_name (str): Name of the stage as defined in the pipeline
+        Returns:
+            Optional[Path]: Path of the log, None if the stage of a running run
+            has not started yet
+        Raises:
+            FileNotFoundError: If the run does not exist, or it is finished and
+                has no log for the stage
+        """
+        task_result = self.get_task_result(run_id)
+        log_folder = Path(self.settings.SAVE_FOLDER) / run_id / LOG_FOLDER
+        for stage in task_result.stages:
+            if stage.name == stage_name and stage.log_file:
+                return log_folder / Path(stage.log_file).name
+        if task_result.status != "running":
+            raise FileNotFoundError(f"Run {run_id} has no log for stage {stage_name}")
+        streaming = sorted(log_folder.glob(f"[0-9][0-9]_{stage_log_slug(stage_name)}.log"))
+        return streaming[0] if streaming else None
+
+    def get_runs(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        branch: Optional[str] = None,
+        status: Optional[str] = None,
+        commit_sha: Optional[str] = None,
+    ) -> Run_page:
+        """
+        Reads one page of run summaries from the run index
+        Args:
+            limit (int): Maximum number of runs on the page
+            cursor (Optional[str]): Cursor of the page, None for the first page
+            branch (Optional[str]): Only runs of this branch
+            status (Optional[str]): Only runs with this status
+            commit_sha (Optional[str]): Only runs whose commit SHA starts with this prefix
+        Returns:
+            Run_page: The run summaries, newest run first, and the next page cursor
+        Raises:
+            ValueError: If the cursor or commit SHA prefix is malformed
+        """
+        return self.run_index.list_runs(
+            limit=limit, cursor=cursor, branch=branch, status=status, commit_sha=commit_sha
+        )
+
+    def scan_saved_runs(self) -> Iterator[TaskResult]:
         """
-        Reads the results of all runs from the file system
+        Reads the results of all runs directly from the result folders,
+        used to (re)build the run index.
         Returns:
-            list[TaskResult]: A list of TaskResult objects for all runs
+            Iterator[TaskResult]: The saved runs, without stage logs
         """
-        runs: list[TaskResult] = []
         save_folder_path = Path(self.settings.SAVE_FOLDER)
         if not save_folder_path.exists():
-            return runs
+            return
         
         for run_dir in save_folder_path.iterdir():
             if run_dir.is_dir():
-                task_result_path = run_dir / "taskResult.json"
-                if task_result_path.exists():
-                    runs.append(self.get_task_result(run_dir.name))
-        return runs
+                summary_path = run_dir / SUMMARY_FILE
+                if summary_path.exists():
+                    # read directly, a reindex should not flush the cache
+                    yield decode_task_result(summary_path.read_bytes())
     
 
 def get_Read_results_service(settings: Settings = get_settings()) -> Read_results_service:
@@ -49,5 +178,5 @@ def get_Read_results_service(settings: Settings = get_settings()) -> Read_result
     Returns:
         Read_results_service: An instance of the Read_results_service
     """
-    return Read_results_service(settings=settings)
+    return Read_results_service(settings=settings, cache=get_Task_result_cache(settings=settings))
 
@@ -1,23 +1,67 @@
-
-
-import json
-from dataclasses import asdict
+import os
+import tempfile
 from pathlib import Path
+from typing import Iterator, Optional
 
 from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.task_result_codec import (
+    decode_task_result,
+    encode_json,
+    task_result_to_dict,
+)
 from basic_ci.schemes.TaskResult import TaskResult
 from basic_ci.services.file_service import FileService, get_FileService
+from basic_ci.services.pipeline_stage_service import stage_log_name
+from basic_ci.services.run_index_service import (
+    Run_index_service,
+    get_Run_index_service,
+)
+from basic_ci.services.stage_log_store import (
+    COMPRESSED_SUFFIX,
+    Stage_log_store,
+    get_Stage_log_store,
+)
+
+SUMMARY_FILE = "summary.json"
+LEGACY_RESULT_FILE = "taskResult.json"
+LOG_FOLDER = "logs"
 
 
 class Results_save_service:
-    def __init__(self,file_service:FileService, settings:Settings = get_settings()):
+    """
+    Stores the result of a run in SAVE_FOLDER/<run_id>:
+
+    - summary.json: compact run metadata, the stages without their output
+    - logs/<NN_stage>.log.gz: the gzip compressed output of every stage, with
+      its block index in logs/<NN_stage>.log.gz.idx (see Stage_log_store)
+
+    Reading the metadata of a run (overview, reindexing) therefore never has
+    to parse the stage output.
+    """
+
+    def __init__(
+        self,
+        file_service: FileService,
+        settings: Settings = get_settings(),
+        run_index: Optional[Run_index_service] = None,
+        log_store: Optional[Stage_log_store] = None,
+    ):
         self.settings = settings
         self.file_service = file_service
         self.save_folder_path = Path(settings.SAVE_FOLDER)
-    
+        self.run_index = run_index
+        self.log_store = log_store or get_Stage_log_store()
+
     def save_task_result(self,task_result:TaskResult)-> None:
         """
-        Saves the results of a Pipeline run
+        Saves the results of a Pipeline run.
+        The output of every stage (the streamed log file followed by the output
+        kept in the Stage_result) is compressed into the run's logs folder and the
+        stage references it through log_file, then the summary is written.
+        Files are written to a temporary file first and then renamed, so a
+        reader never sees a partially written result of a concurrent run.
+        Afterwards the summary row of the run is updated in the run index.
 
         Args:
             task_result (TaskResult): the result of the task
@@ -25,15 +69,86 @@ class Results_save_service:
             None
         """
         task_save_path=self.save_folder_path / task_result.run_id
-        
+
         self.file_service.create_folder(task_save_path)
 
-        task_result_save_path = task_save_path / "taskResult.json"
-        task_dict = asdict(task_result)
-        
-        with open(task_result_save_path,"w") as f:
-            json.dump(task_dict,f,indent=2,default=str)
+        task_dict = task_result_to_dict(task_result, with_output=False)
+        for index, (stage, stage_dict) in enumerate(
+            zip(task_result.stages, task_dict["stages"])
+        ):
+            stage_dict["log_file"] = self._compress_stage_log(
+                task_save_path / LOG_FOLDER, index, stage
+            )
+
+        self._write_atomic(task_save_path / SUMMARY_FILE, encode_json(task_dict))
+
+        if self.run_index is not None:
+            self.run_index.upsert(task_result)
+
+    def migrate_legacy_run(self, run_folder: Path) -> bool:
+        """
+        Converts a run saved as a single taskResult.json (with the full output of
+        every stage) into summary.json plus compressed stage logs.
+
+        Args:
+            run_folder (Path): The result folder of the run
+        Returns:
+            bool: True if the run was migrated, False if it has no taskResult.json
+        """
+        legacy_path = run_folder / LEGACY_RESULT_FILE
+        if not legacy_path.exists():
+            return False
+
+        task_result = decode_task_result(legacy_path.read_bytes())
+        task_result.run_id = run_folder.name
+        self.save_task_result(task_result)
+        legacy_path.unlink()
+        return True
+
+    def _compress_stage_log(
+        self, log_folder: Path, index: int, stage: Stage_result
+    ) -> Optional[str]:
+        """
+        Writes the output of a stage to <log_folder>/<log name>.gz and removes the
+        uncompressed streamed log.
+
+        Returns:
+            Optional[str]: File name of the compressed log, None if the stage has no output.
+        """
+        log_name = Path(stage.log_file).name if stage.log_file else stage_log_name(index, stage.name)
+        if log_name.endswith(COMPRESSED_SUFFIX):
+            # already stored, e.g. a result that is saved a second time
+            return log_name
+        streamed_path = log_folder / log_name
+        if not streamed_path.exists() and not stage.output:
+            return None
+
+        self.file_service.create_folder(log_folder)
+        compressed_path = log_folder / (log_name + COMPRESSED_SUFFIX)
+        self.log_store.write_compressed(
+            compressed_path, self._stage_output(streamed_path, stage.output)
+        )
+        streamed_path.unlink(missing_ok=True)
+        return compressed_path.name
+
+    def _stage_output(self, streamed_path: Path, output: str) -> Iterator[bytes]:
+        """The streamed log of a stage followed by the output kept in its Stage_result."""
+        if streamed_path.exists():
+            with streamed_path.open("rb") as streamed:
+                while chunk := streamed.read(self.log_store.CHUNK_SIZE):
+                    yield chunk
+        yield output.encode("utf-8")
 
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
 
 def get_Results_save_service(settings: Settings = get_settings())-> Results_save_service:
@@ -45,4 +160,5 @@ def get_Results_save_service(settings: Settings = get_settings())-> Results_save
         Results_save_service: An instance of the Results_save_service
     """
     file_service = get_FileService()
-    return Results_save_service(file_service=file_service,settings=settings)
\ No newline at end of file
+    run_index = get_Run_index_service(settings=settings)
+    return Results_save_service(file_service=file_service,settings=settings,run_index=run_index)
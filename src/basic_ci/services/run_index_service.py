@@ -0,0 +1,276 @@
+import base64
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.run_summary import Run_page, Run_summary
+from basic_ci.schemes.TaskResult import TaskResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    repo_url TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL DEFAULT '',
+    finished_at TEXT,
+    duration REAL,
+    summary TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at DESC, run_id DESC);
+CREATE INDEX IF NOT EXISTS runs_branch ON runs (branch, started_at DESC, run_id DESC);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (status, started_at DESC, run_id DESC);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_sha);
+CREATE TABLE IF NOT EXISTS build_cache (
+    tree_id TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    PRIMARY KEY (tree_id, config_hash)
+);
+"""
+
+_COLUMNS = (
+    "run_id, repo_url, branch, commit_sha, status, started_at, finished_at, "
+    "duration, summary"
+)
+
+
+class Run_index_service:
+    """
+    SQLite index with one summary row per run.
+
+    Listing runs is served from this index instead of opening every saved
+    summary.json. The index can always be rebuilt from the result folders.
+    Listings use keyset pagination on (started_at, run_id), so every page is a
+    single index range scan no matter how many runs are stored.
+    """
+    MAX_PAGE_SIZE = 500
+
+    def __init__(self, index_path: str | Path) -> None:
+        """
+        Initialize the index. The database file is created on first use.
+
+        Args:
+            index_path (Union[str, Path]): Path of the SQLite database file.
+        """
+        self.index_path = Path(index_path)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        if not self._initialized:
+            # WAL lets the web server read while a worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def upsert(self, task_result: TaskResult) -> None:
+        """
+        Inserts or updates the summary row of a run.
+
+        Args:
+            task_result (TaskResult): The run to index.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO runs ({_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._to_row(task_result),
+            )
+
+    def remember_build(self, tree_id: str, config_hash: str, run_id: str) -> None:
+        """
+        Records a successful run as the build of a tree with a pipeline configuration.
+
+        Args:
+            tree_id (str): The git tree the run built.
+            config_hash (str): Hash of the pipeline configuration it ran with.
+            run_id (str): The successful run.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO build_cache (tree_id, config_hash, run_id) "
+                "VALUES (?, ?, ?)",
+                (tree_id, config_hash, run_id),
+            )
+
+    def find_build(self, tree_id: str, config_hash: str) -> Optional[str]:
+        """
+        Looks up a successful run of the same tree and pipeline configuration.
+
+        Args:
+            tree_id (str): The git tree to build.
+            config_hash (str): Hash of the pipeline configuration.
+
+        Returns:
+            Optional[str]: The run_id of the successful run, None if there is none
+            (or its run is no longer in the index).
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT runs.run_id FROM build_cache "
+                "JOIN runs ON runs.run_id = build_cache.run_id "
+                "WHERE build_cache.tree_id = ? AND build_cache.config_hash = ? "
+                "AND runs.status = 'success'",
+                (tree_id, config_hash),
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_runs(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        branch: Optional[str] = None,
+        status: Optional[str] = None,
+        commit_sha: Optional[str] = None,
+    ) -> Run_page:
+        """
+        Returns one page of runs, newest first.
+
+        Args:
+            limit (int): Maximum number of runs on the page (capped at MAX_PAGE_SIZE).
+            cursor (Optional[str]): next_cursor of the previous page, None for the first page.
+            branch (Optional[str]): Only runs of this branch.
+            status (Optional[str]): Only runs with this status.
+            commit_sha (Optional[str]): Only runs whose commit SHA starts with this prefix.
+
+        Returns:
+            Run_page: The runs and the cursor of the next page.
+
+        Raises:
+            ValueError: If the cursor or the commit SHA prefix is malformed.
+        """
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        conditions: List[str] = []
+        params: List[str | int] = []
+        if cursor:
+            conditions.append("(started_at, run_id) < (?, ?)")
+            params.extend(self.decode_cursor(cursor))
+        if branch:
+            conditions.append("branch = ?")
+            params.append(branch)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if commit_sha:
+            if not re.fullmatch(r"[0-9a-fA-F]{1,40}", commit_sha):
+                raise ValueError(f"Invalid commit SHA prefix: {commit_sha}")
+            # GLOB with a constant prefix is answered from the commit_sha index
+            conditions.append("commit_sha GLOB ?")
+            params.append(commit_sha.lower() + "*")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM runs {where} "
+                "ORDER BY started_at DESC, run_id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+
+        runs = [self._from_row(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self.encode_cursor(rows[limit - 1][5], rows[limit - 1][0])
+        return Run_page(runs=runs, next_cursor=next_cursor)
+
+    @staticmethod
+    def encode_cursor(started_at: str, run_id: str) -> str:
+        """Encodes the position after the run (started_at, run_id) as an opaque cursor."""
+        raw = f"{started_at}|{run_id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[str, str]:
+        """
+        Raises:
+            ValueError: If the cursor was not created by encode_cursor.
+        """
+        try:
+            started_at, run_id = (
+                base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+            )
+        except (ValueError, UnicodeError):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return started_at, run_id
+
+    def rebuild(self, task_results: Iterable[TaskResult]) -> int:
+        """
+        Replaces the whole index with the given runs.
+
+        Args:
+            task_results (Iterable[TaskResult]): All saved runs.
+
+        Returns:
+            int: Number of indexed runs.
+        """
+        rows = [self._to_row(task_result) for task_result in task_results]
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM runs")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO runs ({_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    @staticmethod
+    def _to_row(task_result: TaskResult) -> tuple:
+        started_at = _parse_datetime(task_result.started_at)
+        finished_at = _parse_datetime(task_result.finished_at)
+        duration = None
+        if started_at and finished_at:
+            duration = (finished_at - started_at).total_seconds()
+        return (
+            task_result.run_id,
+            task_result.repo_url,
+            task_result.branch,
+            task_result.commit_sha,
+            task_result.status,
+            started_at.isoformat(sep=" ") if started_at else "",
+            finished_at.isoformat(sep=" ") if finished_at else None,
+            duration,
+            task_result.summary,
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Run_summary:
+        return Run_summary(
+            run_id=row[0],
+            repo_url=row[1],
+            branch=row[2],
+            commit_sha=row[3],
+            status=row[4],
+            started_at=_parse_datetime(row[5]),
+            finished_at=_parse_datetime(row[6]),
+            duration=row[7],
+            summary=row[8],
+        )
+
+
+def _parse_datetime(value: Optional[datetime | str]) -> Optional[datetime]:
+    """Accepts datetimes and the ISO strings results loaded from json contain."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def get_Run_index_service(settings: Settings = get_settings()) -> Run_index_service:
+    """
+    Factory for the Run index service
+    Args:
+        settings (Settings, optional): The settings to use. Defaults to get_settings().
+    Returns:
+        Run_index_service: An instance of the Run_index_service
+    """
+    index_path = settings.RUN_INDEX_PATH or Path(settings.SAVE_FOLDER) / "index.sqlite3"
+    return Run_index_service(index_path)
@@ -0,0 +1,120 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Optional
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.task_result_codec import (
+    stage_result_from_dict,
+    stage_result_to_dict,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stage_results_last_used ON stage_results (last_used);
+"""
+
+
+class Stage_cache:
+    """
+    Persistent store of successful Stage_results keyed by the hash of the
+    stage's command and input files.
+
+    Only the result without its output is stored. Every lookup refreshes the
+    entry, once more than max_entries are stored the least recently used ones
+    are evicted.
+    """
+
+    def __init__(self, cache_path: str | Path, max_entries: int = 1024) -> None:
+        """
+        Initialize the cache. The database file is created on first use.
+
+        Args:
+            cache_path (Union[str, Path]): Path of the SQLite database file.
+            max_entries (int): Maximum number of stored results. Defaults to 1024.
+        """
+        self.cache_path = Path(cache_path)
+        self.max_entries = max_entries
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.cache_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[Stage_result]:
+        """
+        Looks up the successful result of a stage with the same inputs.
+
+        Args:
+            key (str): The input hash of the stage.
+
+        Returns:
+            Optional[Stage_result]: The stored result (without output), None if unknown.
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT result FROM stage_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE stage_results SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return stage_result_from_dict(json.loads(row[0]))
+
+    def put(self, key: str, stage_result: Stage_result) -> None:
+        """
+        Stores the result of a stage that succeeded and evicts the least recently
+        used results beyond max_entries.
+
+        Args:
+            key (str): The input hash of the stage.
+            stage_result (Stage_result): The successful result.
+        """
+        result = json.dumps(stage_result_to_dict(stage_result, with_output=False))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stage_results (key, result, last_used) VALUES (?, ?, ?)",
+                (key, result, time.time()),
+            )
+            conn.execute(
+                "DELETE FROM stage_results WHERE key NOT IN "
+                "(SELECT key FROM stage_results ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Current usage of the cache.
+        """
+        with closing(self._connect()) as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM stage_results").fetchone()
+        return {"entries": entries, "max_entries": self.max_entries}
+
+
+def get_Stage_cache(settings: Settings = get_settings()) -> Optional[Stage_cache]:
+    """
+    Factory for the Stage_cache
+    Args:
+        settings (Settings, optional): The settings to use. Defaults to get_settings().
+    Returns:
+        Optional[Stage_cache]: The cache, None if STAGE_CACHE_MAX_ENTRIES disables it
+    """
+    if settings.STAGE_CACHE_MAX_ENTRIES <= 0:
+        return None
+    cache_path = settings.STAGE_CACHE_PATH or Path(settings.SAVE_FOLDER) / "stage_cache.sqlite3"
+    return Stage_cache(cache_path, max_entries=settings.STAGE_CACHE_MAX_ENTRIES)
@@ -0,0 +1,244 @@
+import bisect
+import gzip
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from basic_ci.schemes.log_page import Log_index, Log_page
+
+COMPRESSED_SUFFIX = ".gz"
+INDEX_SUFFIX = ".idx"
+
+
+class Stage_log_store:
+    """
+    Reads and writes stage logs so that large logs can be accessed in parts.
+
+    A saved log is a sequence of independently compressed gzip members of about
+    BLOCK_SIZE bytes, each starting at a line boundary (so the file is still a
+    normal gzip file), plus a small Log_index next to it. A byte range or a
+    window of lines is read by decompressing only the blocks it falls into.
+    Output without line breaks (progress bars, minified or binary output) is cut
+    into blocks of BLOCK_SIZE, so writing never holds more than about a block in
+    memory; such a continuation block has the same first line as the block
+    before it and is never used as the start of a line window.
+    Plain logs of stages that are still running are read directly.
+    """
+    BLOCK_SIZE = 1024 * 1024
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, compress_level: int = 6) -> None:
+        """
+        Args:
+            compress_level (int): gzip compression level of the blocks. Defaults to 6.
+        """
+        self.compress_level = compress_level
+
+    def write_compressed(self, path: Path, chunks: Iterable[bytes]) -> Log_index:
+        """
+        Writes a compressed log and its index. Both files are written to
+        temporary files first and then renamed.
+
+        Args:
+            path (Path): Path of the compressed log, the index is written to path + ".idx".
+            chunks (Iterable[bytes]): The content of the log.
+
+        Returns:
+            Log_index: The index of the written log.
+        """
+        log_index = Log_index(size=0, lines=0)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+
+                def write_block(data: bytes | bytearray) -> None:
+                    log_index.blocks.append((log_index.size, out.tell(), log_index.lines))
+                    out.write(gzip.compress(data, compresslevel=self.compress_level, mtime=0))
+                    log_index.size += len(data)
+                    log_index.lines += data.count(b"\n")
+
+                buffer = bytearray()
+                last_byte = b"\n"
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    buffer += chunk
+                    last_byte = chunk[-1:]
+                    while len(buffer) >= self.BLOCK_SIZE:
+                        # end the block at the last line break inside it, or at the
+                        # first one after it, without any the line is cut mid-way
+                        cut = buffer.rfind(b"\n", 0, self.BLOCK_SIZE) + 1
+                        cut = cut or buffer.find(b"\n", self.BLOCK_SIZE) + 1
+                        cut = cut or self.BLOCK_SIZE
+                        write_block(buffer[:cut])
+                        del buffer[:cut]
+                if buffer or not log_index.blocks:
+                    write_block(buffer)
+                if last_byte != b"\n":
+                    log_index.lines += 1
+            self._write_index(path, log_index)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return log_index
+
+    def index(self, path: Path) -> Log_index:
+        """
+        Returns the index of a log. Logs without a stored index (plain logs that are
+        still written, compressed logs saved before indexes existed) are scanned
+        and treated as a single block.
+
+        Args:
+            path (Path): Path of the log.
+
+        Returns:
+            Log_index: The index of the log.
+        """
+        index_path = path.with_name(path.name + INDEX_SUFFIX)
+        if path.suffix == COMPRESSED_SUFFIX and index_path.exists():
+            data = json.loads(index_path.read_text())
+            return Log_index(
+                size=data["size"],
+                lines=data["lines"],
+                blocks=[(block[0], block[1], block[2]) for block in data["blocks"]],
+            )
+
+        size = lines = 0
+        last_byte = b"\n"
+        with self._open_block(path, (0, 0, 0)) as f:
+            while chunk := f.read(self.CHUNK_SIZE):
+                size += len(chunk)
+                lines += chunk.count(b"\n")
+                last_byte = chunk[-1:]
+        if last_byte != b"\n":
+            lines += 1
+        return Log_index(size=size, lines=lines, blocks=[(0, 0, 0)])
+
+    def iter_range(
+        self, path: Path, start: int = 0, end: Optional[int] = None,
+        log_index: Optional[Log_index] = None,
+    ) -> Iterator[bytes]:
+        """
+        Reads the bytes [start, end) of the uncompressed log.
+
+        Args:
+            path (Path): Path of the log.
+            start (int): First byte. Defaults to 0.
+            end (Optional[int]): Byte after the last byte, None for the end of the log.
+            log_index (Optional[Log_index]): The index of the log if already loaded.
+
+        Returns:
+            Iterator[bytes]: The content in chunks of at most CHUNK_SIZE bytes.
+        """
+        log_index = log_index or self.index(path)
+        end = log_index.size if end is None else min(end, log_index.size)
+        if start >= end:
+            return
+        block = self._find_block(log_index.blocks, start, 0)
+        with self._open_block(path, block) as f:
+            self._skip(f, start - block[0])
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def read_lines(
+        self, path: Path, offset: Optional[int], limit: int,
+        log_index: Optional[Log_index] = None,
+    ) -> Log_page:
+        """
+        Reads a window of lines of the log.
+
+        Args:
+            path (Path): Path of the log.
+            offset (Optional[int]): Number of the first line (0 based), None for
+                the last `limit` lines of the log.
+            limit (int): Maximum number of lines.
+            log_index (Optional[Log_index]): The index of the log if already loaded.
+
+        Returns:
+            Log_page: The lines without their line breaks.
+        """
+        log_index = log_index or self.index(path)
+        if offset is None:
+            offset = max(0, log_index.lines - limit)
+        lines: List[str] = []
+        if offset < log_index.lines and limit > 0:
+            block = self._find_block(log_index.blocks, offset, 2)
+            with self._open_block(path, block) as f:
+                for number, raw in enumerate(f, start=block[2]):
+                    if number < offset:
+                        continue
+                    lines.append(raw.rstrip(b"\n").decode("utf-8", errors="replace"))
+                    if len(lines) == limit:
+                        break
+        return Log_page(
+            offset=offset, lines=lines, total_lines=log_index.lines, size=log_index.size
+        )
+
+    @staticmethod
+    def _find_block(
+        blocks: List[Tuple[int, int, int]], position: int, field: int
+    ) -> Tuple[int, int, int]:
+        """
+        The last block whose field (0: byte offset, 2: line number) is <= position.
+        For line numbers it is the first of the blocks with that number, the others
+        continue a line that did not fit into one block.
+        """
+        keys = [block[field] for block in blocks]
+        found = max(0, bisect.bisect_right(keys, position) - 1)
+        if field == 2:
+            found = bisect.bisect_left(keys, keys[found])
+        return blocks[found]
+
+    @contextmanager
+    def _open_block(self, path: Path, block: Tuple[int, int, int]) -> Iterator[BinaryIO]:
+        """Opens the log positioned at the start of a block, decompressing if needed."""
+        with open(path, "rb") as raw:
+            if path.suffix == COMPRESSED_SUFFIX:
+                raw.seek(block[1])
+                with gzip.GzipFile(fileobj=raw, mode="rb") as decompressed:
+                    yield decompressed  # type: ignore[misc]
+            else:
+                raw.seek(block[0])
+                yield raw
+
+    def _skip(self, f: BinaryIO, count: int) -> None:
+        while count > 0:
+            skipped = len(f.read(min(self.CHUNK_SIZE, count)))
+            if not skipped:
+                return
+            count -= skipped
+
+    @staticmethod
+    def _write_index(path: Path, log_index: Log_index) -> None:
+        index_path = path.with_name(path.name + INDEX_SUFFIX)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {"size": log_index.size, "lines": log_index.lines, "blocks": log_index.blocks},
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def get_Stage_log_store() -> Stage_log_store:
+    """
+    Factory for the Stage_log_store
+
+    :return: Stage_log_store instance
+    :rtype: Stage_log_store
+    """
+    return Stage_log_store()
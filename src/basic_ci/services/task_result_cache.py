@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.schemes.TaskResult import TaskResult
+
+# (st_mtime_ns, st_size) of the file a TaskResult was parsed from
+File_version = Tuple[int, int]
+
+
+@dataclass
+class _Entry:
+    version: File_version
+    task_result: TaskResult
+    etag: str
+    size: int
+
+
+class Task_result_cache:
+    """
+    Bounded LRU cache of parsed TaskResults keyed by run_id.
+
+    An entry is only used while the summary file it was parsed from still has
+    the same mtime and size, so a run that is saved again (a running run that
+    finishes) is parsed again. The size of an entry is estimated by the size of
+    that file. Entries are evicted least recently used first once either
+    max_entries or max_bytes is exceeded, a limit of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        Args:
+            max_entries (int): Maximum number of cached runs. Defaults to 256.
+            max_bytes (int): Maximum total size of the cached runs. Defaults to 16 MiB.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, run_id: str, version: File_version) -> Optional[Tuple[TaskResult, str]]:
+        """
+        Returns the cached TaskResult of a run if it was parsed from the same
+        version of the file, counting a hit or a miss.
+
+        Args:
+            run_id (str): The ID of the run.
+            version (File_version): mtime and size of the summary file now.
+
+        Returns:
+            Optional[Tuple[TaskResult, str]]: The cached result (shared, do not modify)
+            and the ETag of the summary file, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(run_id)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(run_id)
+            self.hits += 1
+            return entry.task_result, entry.etag
+
+    def put(
+        self, run_id: str, version: File_version, task_result: TaskResult, etag: str
+    ) -> None:
+        """
+        Caches the TaskResult parsed from the given version of the summary file.
+
+        Args:
+            run_id (str): The ID of the run.
+            version (File_version): mtime and size of the parsed summary file.
+            task_result (TaskResult): The parsed result.
+            etag (str): ETag of the content of the summary file.
+        """
+        size = version[1]
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            old = self._entries.pop(run_id, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[run_id] = _Entry(version, task_result, etag, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Counters and current usage of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_task_result_cache: Optional[Task_result_cache] = None
+
+
+def get_Task_result_cache(settings: Settings = get_settings()) -> Task_result_cache:
+    """
+    Factory for the Task_result_cache. The cache is shared by all
+    Read_results_service instances so the same instance is returned on every call.
+
+    :param settings: The settings holding the cache limits
+    :type settings: Settings
+    :return: the application wide Task_result_cache
+    :rtype: Task_result_cache
+    """
+    global _task_result_cache
+    if _task_result_cache is None:
+        _task_result_cache = Task_result_cache(
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+            max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+        )
+    return _task_result_cache
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from fastapi import Depends
 
 from basic_ci.core.config import Settings, get_settings
@@ -40,7 +42,8 @@ class TaskService:
             payload (Push_payload): Validated Push_payload object from GitHub webhook
 
         Returns:
-            Task: Task object containing run_id, repo_url, branch, and commit_sha
+            Task: Task object containing run_id, repo_url, branch, commit_sha and,
+                  if the payload has a head commit, its tree_id
 
         Raises:
             ValueError: If the payload is missing required fields or contains
@@ -58,8 +61,22 @@ class TaskService:
             repo_url=repo_url,
             branch=branch,
             commit_sha=commit_sha,
+            tree_id=payload.head_commit.tree_id if payload.head_commit else None,
         )
     
+    def report_queued(self, task: Task, queued_at: Optional[float] = None) -> None:
+        """
+        Tells GitHub that the task waits to be run (a pending commit status).
+
+        Args:
+            task (Task): The task that was queued.
+            queued_at (Optional[float]): Unix time the task was queued, defaults to now.
+
+        Returns:
+            None
+        """
+        self.task_runner.report_queued(task, queued_at)
+
     def run_task(self, push_payload: Push_payload) -> TaskResult:
         """
         Runs the actual task.
@@ -0,0 +1,192 @@
+import logging
+import queue
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from git import GitCommandError, InvalidGitRepositoryError, NoSuchPathError, Repo
+
+from basic_ci.core.config import Settings, get_settings
+from basic_ci.services.gitclone_service import GitcloneService, get_GitCloneService
+
+logger = logging.getLogger(__name__)
+
+
+class Workspace_pool:
+    """
+    A fixed number of checkouts that are reused by the runs instead of creating,
+    cloning and deleting a workspace per run.
+
+    A run leases a free workspace (waiting if all are in use), resets it to its
+    commit and returns it afterwards. A workspace is cloned again if it is empty,
+    fails the health check, cannot be reset or has been used max_uses times.
+    Untracked paths matching keep_paths (e.g. ".venv", ".mypy_cache") survive the
+    reset, so later runs start with warm tool caches.
+
+    Health checks:
+    - "none": the workspace only has to contain a .git folder
+    - "status": `git status` has to succeed (catches a broken index or HEAD)
+    - "fsck": additionally `git fsck --connectivity-only` (slow on large repositories)
+
+    The pool is shared by the workers of one process, the folder must not be
+    used by several server processes at the same time.
+    """
+    HEALTH_CHECKS = ("none", "status", "fsck")
+
+    def __init__(
+        self,
+        folder: str | Path,
+        size: int,
+        git_service: GitcloneService,
+        keep_paths: Optional[List[str]] = None,
+        health_check: str = "status",
+        max_uses: int = 50,
+    ) -> None:
+        """
+        Args:
+            folder (Union[str, Path]): Folder holding the workspaces.
+            size (int): Number of workspaces.
+            git_service (GitcloneService): Clones and resets the workspaces.
+            keep_paths (Optional[List[str]]): Untracked paths kept between runs.
+            health_check (str): One of HEALTH_CHECKS. Defaults to "status".
+            max_uses (int): Runs after which a workspace is cloned again, 0 for never.
+
+        Raises:
+            ValueError: If size is not positive or the health check is unknown.
+        """
+        if size < 1:
+            raise ValueError("A workspace pool needs at least one workspace")
+        if health_check not in self.HEALTH_CHECKS:
+            raise ValueError(f"Unknown workspace health check: {health_check}")
+        self.folder = Path(folder).resolve()
+        self.size = size
+        self.git_service = git_service
+        self.keep_paths = keep_paths or []
+        self.health_check = health_check
+        self.max_uses = max_uses
+        self.reused = 0
+        self.cloned = 0
+        self._uses: Dict[Path, int] = {}
+        self._free: queue.Queue[Path] = queue.Queue()
+        for i in range(size):
+            self._free.put(self.folder / f"workspace-{i}")
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Path:
+        """
+        Leases a workspace, waiting until one is free.
+
+        Returns:
+            Path: The workspace, it has to be passed to release() after the run.
+        """
+        return self._free.get()
+
+    def release(self, workspace: Path) -> None:
+        """
+        Returns a leased workspace to the pool.
+
+        Args:
+            workspace (Path): A workspace returned by acquire().
+        """
+        self._free.put(workspace)
+
+    def checkout(self, workspace: Path, commit_sha: str) -> bool:
+        """
+        Prepares a leased workspace for a run of the commit, by resetting the
+        existing checkout or, if it cannot be reused, by cloning again.
+
+        Args:
+            workspace (Path): A workspace returned by acquire().
+            commit_sha (str): The commit to check out.
+
+        Returns:
+            bool: True if the existing checkout was reused.
+
+        Raises:
+            git.exc.GitCommandError: If cloning fails, the workspace is left empty.
+        """
+        uses = self._uses.get(workspace, 0)
+        if (self.max_uses <= 0 or uses < self.max_uses) and self._healthy(workspace):
+            try:
+                self.git_service.reset_checkout(commit_sha, str(workspace), self.keep_paths)
+                with self._lock:
+                    self._uses[workspace] = uses + 1
+                    self.reused += 1
+                return True
+            except GitCommandError:
+                logger.warning("Resetting %s failed, cloning it again", workspace, exc_info=True)
+
+        self._wipe(workspace)
+        try:
+            self.git_service.clone_repo(commit_sha, str(workspace))
+        except BaseException:
+            self._wipe(workspace)
+            raise
+        with self._lock:
+            self._uses[workspace] = 1
+            self.cloned += 1
+        return False
+
+    def _healthy(self, workspace: Path) -> bool:
+        if not (workspace / ".git").exists():
+            return False
+        if self.health_check == "none":
+            return True
+        try:
+            repo = Repo(workspace)
+            repo.git.status("--porcelain")
+            if self.health_check == "fsck":
+                repo.git.fsck("--connectivity-only", "--no-dangling")
+        except (GitCommandError, InvalidGitRepositoryError, NoSuchPathError):
+            logger.warning("Workspace %s failed the health check", workspace, exc_info=True)
+            return False
+        return True
+
+    def _wipe(self, workspace: Path) -> None:
+        shutil.rmtree(workspace, ignore_errors=True)
+        with self._lock:
+            self._uses.pop(workspace, None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Size, free workspaces and how often checkouts were reused or cloned.
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "free": self._free.qsize(),
+                "reused": self.reused,
+                "cloned": self.cloned,
+            }
+
+
+_workspace_pool: Optional[Workspace_pool] = None
+_workspace_pool_guard = threading.Lock()
+
+
+def get_Workspace_pool(settings: Settings = get_settings()) -> Optional[Workspace_pool]:
+    """
+    Factory for the Workspace_pool. The pool is shared by all TaskRunners so the
+    same instance is returned on every call.
+
+    :param settings: The settings holding the pool configuration
+    :type settings: Settings
+    :return: the application wide Workspace_pool, None if WORKSPACE_POOL_SIZE is 0
+    :rtype: Optional[Workspace_pool]
+    """
+    global _workspace_pool
+    if settings.WORKSPACE_POOL_SIZE <= 0:
+        return None
+    with _workspace_pool_guard:
+        if _workspace_pool is None:
+            _workspace_pool = Workspace_pool(
+                settings.WORKSPACE_POOL_FOLDER,
+                size=settings.WORKSPACE_POOL_SIZE,
+                git_service=get_GitCloneService(settings=settings),
+                keep_paths=settings.WORKSPACE_KEEP_PATHS,
+                health_check=settings.WORKSPACE_HEALTH_CHECK,
+                max_uses=settings.WORKSPACE_MAX_USES,
+            )
+    return _workspace_pool
@@ -0,0 +1,162 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from basic_ci.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# run ids are 24 lowercase hex characters, see UIDService.generate_run_id
+RUN_FOLDER_PATTERN = re.compile(r"[0-9a-f]{24}")
+
+
+class Workspace_reaper:
+    """
+    Deletes workspaces in the background so a run does not wait for it.
+
+    A discarded workspace is renamed into the trash folder, which is atomic and
+    immediate on the same filesystem, and then removed by a small thread pool,
+    so at most `workers` folders are deleted at the same time. Whatever is left
+    in the trash folder (the server stopped while deleting) and the workspaces
+    of runs that crashed are removed by sweep() at startup.
+    """
+
+    def __init__(self, trash_folder: str | Path, workers: int = 2) -> None:
+        """
+        Args:
+            trash_folder (Union[str, Path]): Folder the discarded workspaces are moved
+                to, it should be on the filesystem of the workspaces.
+            workers (int): Folders deleted at the same time, 0 deletes synchronously.
+                Defaults to 2.
+        """
+        self.trash_folder = Path(trash_folder)
+        self.workers = workers
+        self.deleted = 0
+        self._pending: Set[Future[None]] = set()
+        self._lock = threading.Lock()
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="workspace-reaper")
+            if workers > 0 else None
+        )
+
+    def discard(self, path: str | Path) -> None:
+        """
+        Moves a workspace into the trash folder and schedules its deletion.
+        If it cannot be renamed (e.g. another filesystem) it is deleted where it is.
+
+        Args:
+            path (Union[str, Path]): The workspace, nothing happens if it does not exist.
+        """
+        path = Path(path)
+        if not path.exists():
+            return
+        target = self.trash_folder / f"{path.name}-{uuid.uuid4().hex[:8]}"
+        try:
+            self.trash_folder.mkdir(parents=True, exist_ok=True)
+            os.rename(path, target)
+        except OSError:
+            target = path
+        self._delete(target)
+
+    def sweep(self, temp_folder: str | Path, save_folder: str | Path) -> int:
+        """
+        Schedules the deletion of everything in the trash folder and of the
+        workspaces crashed runs left in the temp folder. A folder there is only
+        considered a workspace if it is named like a run id and that run has
+        results in the save folder. Call it before runs are started.
+
+        Args:
+            temp_folder (Union[str, Path]): Folder the workspaces are created in.
+            save_folder (Union[str, Path]): Folder of the run results.
+
+        Returns:
+            int: Number of folders scheduled for deletion.
+        """
+        count = 0
+        if self.trash_folder.is_dir():
+            for path in self.trash_folder.iterdir():
+                self._delete(path)
+                count += 1
+        for path in Path(temp_folder).iterdir():
+            if (
+                RUN_FOLDER_PATTERN.fullmatch(path.name)
+                and path.is_dir()
+                and not path.is_symlink()
+                and (Path(save_folder) / path.name).is_dir()
+            ):
+                self.discard(path)
+                count += 1
+        return count
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits until the scheduled deletions are done.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most. Defaults to None (no limit).
+        """
+        with self._lock:
+            pending = set(self._pending)
+        wait(pending, timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Folders waiting to be deleted and folders deleted so far.
+        """
+        with self._lock:
+            return {"pending": len(self._pending), "deleted": self.deleted}
+
+    def _delete(self, path: Path) -> None:
+        if self._executor is None:
+            self._remove(path)
+            return
+        future = self._executor.submit(self._remove, path)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: "Future[None]") -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def _remove(self, path: Path) -> None:
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+        except OSError:
+            logger.warning("Deleting %s failed", path, exc_info=True)
+            return
+        with self._lock:
+            self.deleted += 1
+
+
+_workspace_reaper: Optional[Workspace_reaper] = None
+_workspace_reaper_guard = threading.Lock()
+
+
+def get_Workspace_reaper(settings: Settings = get_settings()) -> Workspace_reaper:
+    """
+    Factory for the Workspace_reaper. The reaper is shared by all TaskRunners so
+    the same instance is returned on every call.
+
+    :param settings: The settings holding the trash folder and number of workers
+    :type settings: Settings
+    :return: the application wide Workspace_reaper
+    :rtype: Workspace_reaper
+    """
+    global _workspace_reaper
+    with _workspace_reaper_guard:
+        if _workspace_reaper is None:
+            trash_folder = settings.WORKSPACE_TRASH_FOLDER or Path(tempfile.gettempdir()) / ".basic_ci_trash"
+            _workspace_reaper = Workspace_reaper(trash_folder, workers=settings.WORKSPACE_REAPER_WORKERS)
+    return _workspace_reaper
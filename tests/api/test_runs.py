@@ -1,22 +1,235 @@
+import gzip
+from datetime import datetime
 from unittest.mock import Mock, patch
 
+from fastapi.testclient import TestClient
+
 from basic_ci.api.run_information import run_details_page
+from basic_ci.core.config import Settings
+from basic_ci.main import app
+from basic_ci.schemes.run_summary import Run_page, Run_summary
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.file_service import FileService
+from basic_ci.services.page_cache import Page_cache, get_Page_cache
+from basic_ci.services.read_results_service import (
+    Read_results_service,
+    get_Read_results_service,
+)
+from basic_ci.services.result_save_service import Results_save_service
+from basic_ci.services.run_index_service import Run_index_service
+from basic_ci.services.stage_log_store import Stage_log_store
+
+client = TestClient(app)
 
 
 def test_run_details_page_success():
     """Test successful retrieval and rendering of run details."""
     mock_request = Mock()
+    mock_request.headers = {}
     run_id = "test-run-123"
-    mock_task_result = Mock()
+    mock_task_result = Mock(finished_at=None, started_at=None)
+    mock_task_result.is_finished.return_value = False
     mock_db = Mock()
-    mock_db.get_task_result.return_value = mock_task_result
+    mock_db.get_task_result_and_etag.return_value = (mock_task_result, '"etag"')
     
     with patch('basic_ci.api.run_information.templates') as mock_templates:
-        run_details_page(mock_request, run_id, mock_db)
+        run_details_page(mock_request, run_id, mock_db, Page_cache())
         
         # Assert
-        mock_db.get_task_result.assert_called_once_with(run_id)
+        mock_db.get_task_result_and_etag.assert_called_once_with(run_id)
         mock_templates.TemplateResponse.assert_called_once_with(
             "run_details.html",
-            {"request": mock_request, "run": mock_task_result}
-        )
\ No newline at end of file
+            {"request": mock_request, "run": mock_task_result},
+            headers={"ETag": '"etag"', "Cache-Control": "no-cache"},
+        )
+
+
+def _details_db(tmp_path, status: str) -> Read_results_service:
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    Results_save_service(file_service=FileService(), settings=settings).save_task_result(
+        TaskResult(
+            run_id="r1", repo_url="u", branch="main", commit_sha="abc", status=status,
+            started_at=datetime(2026, 1, 1, 12, 0, 0),
+        )
+    )
+    return Read_results_service(settings=settings, run_index=Mock())
+
+
+def test_finished_run_page_is_cached_and_answers_304(tmp_path):
+    """
+    A finished run is sent with a strong ETag and as immutable, its rendered page is cached
+    and a matching If-None-Match is answered with 304 without reading the run again.
+    """
+    db = _details_db(tmp_path, "success")
+    page_cache = Page_cache()
+    app.dependency_overrides[get_Read_results_service] = lambda: db
+    app.dependency_overrides[get_Page_cache] = lambda: page_cache
+    try:
+        first = client.get("/runs/r1")
+        (tmp_path / "r1" / "summary.json").unlink()
+        second = client.get("/runs/r1")
+        not_modified = client.get("/runs/r1", headers={"If-None-Match": first.headers["etag"]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert first.headers["etag"].startswith('"')
+    assert "last-modified" in first.headers
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert not_modified.status_code == 304
+    assert page_cache.stats()["hits"] == 1
+    assert page_cache.stats()["not_modified"] == 1
+
+
+def test_running_run_page_is_revalidated(tmp_path):
+    """
+    A running run is not cached: every view revalidates its ETag, which changes with the run.
+    """
+    db = _details_db(tmp_path, "running")
+    page_cache = Page_cache()
+    app.dependency_overrides[get_Read_results_service] = lambda: db
+    app.dependency_overrides[get_Page_cache] = lambda: page_cache
+    try:
+        first = client.get("/runs/r1")
+        unchanged = client.get("/runs/r1", headers={"If-None-Match": first.headers["etag"]})
+        missing = client.get("/runs/unknown")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first.headers["cache-control"] == "no-cache"
+    assert unchanged.status_code == 304
+    assert page_cache.stats()["pages"] == 0
+    assert missing.status_code == 404
+
+
+def test_runs_json_passes_filters_and_returns_cursor():
+    """The JSON listing forwards limit, cursor and filters and returns the next cursor."""
+    mock_db = Mock()
+    mock_db.get_runs.return_value = Run_page(
+        runs=[Run_summary(run_id="r1", repo_url="u", branch="dev", commit_sha="abc", status="success")],
+        next_cursor="next",
+    )
+    app.dependency_overrides[get_Read_results_service] = lambda: mock_db
+    try:
+        response = client.get("/api/runs?limit=1&branch=dev&status=success&commit_sha=ab&cursor=c")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "next"
+    assert response.json()["runs"][0]["run_id"] == "r1"
+    mock_db.get_runs.assert_called_once_with(
+        limit=1, cursor="c", branch="dev", status="success", commit_sha="ab"
+    )
+
+
+def test_runs_json_ignores_empty_filter_fields(tmp_path):
+    """The filter form of the runs page submits empty fields for the filters that are not set."""
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    run_index = Run_index_service(tmp_path / "index.sqlite3")
+    run_index.upsert(TaskResult(
+        run_id="r1", repo_url="u", branch="main", commit_sha="abc", status="success",
+        started_at=datetime(2026, 1, 1, 12, 0, 0),
+    ))
+    db = Read_results_service(settings=settings, run_index=run_index)
+    app.dependency_overrides[get_Read_results_service] = lambda: db
+    try:
+        response = client.get("/api/runs?branch=&status=&commit_sha=&limit=50")
+        page = client.get("/runs?branch=&status=&commit_sha=&cursor=")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [run["run_id"] for run in response.json()["runs"]] == ["r1"]
+    assert page.status_code == 200
+
+
+def test_runs_page_invalid_cursor_returns_400():
+    """A malformed cursor is reported as a bad request."""
+    mock_db = Mock()
+    mock_db.get_runs.side_effect = ValueError("Invalid cursor")
+    app.dependency_overrides[get_Read_results_service] = lambda: mock_db
+    try:
+        response = client.get("/runs?cursor=broken")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 400
+
+
+def test_stage_log_stream_resumes_at_last_event_id(tmp_path):
+    """The log stream is sent as Server-Sent Events starting at the Last-Event-ID offset."""
+    log_path = tmp_path / "00_setup.log.gz"
+    log_path.write_bytes(gzip.compress(b"hello\nworld\n"))
+    mock_db = Mock()
+    mock_db.stage_log_path.return_value = log_path
+    app.dependency_overrides[get_Read_results_service] = lambda: mock_db
+    try:
+        response = client.get("/runs/r1/stages/setup/log/stream", headers={"Last-Event-ID": "6"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("id: 12\ndata: world\ndata: \n\n")
+    mock_db.stage_log_path.assert_called_once_with("r1", "setup")
+
+
+def test_stage_log_stream_unknown_run_returns_404():
+    """A run (or finished stage) without a log is reported as not found."""
+    mock_db = Mock()
+    mock_db.stage_log_path.side_effect = FileNotFoundError("no run")
+    app.dependency_overrides[get_Read_results_service] = lambda: mock_db
+    try:
+        response = client.get("/runs/missing/stages/setup/log/stream")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 404
+
+
+def _log_db(tmp_path) -> Mock:
+    log_path = tmp_path / "00_setup.log.gz"
+    store = Stage_log_store()
+    store.write_compressed(log_path, [b"one\ntwo\nthree\n"])
+    mock_db = Mock()
+    mock_db.stage_log_path.return_value = log_path
+    mock_db.log_store = store
+    return mock_db
+
+
+def test_stage_log_supports_byte_ranges(tmp_path):
+    """The stage log is served as plain text and honours a single byte range."""
+    app.dependency_overrides[get_Read_results_service] = lambda: _log_db(tmp_path)
+    try:
+        full = client.get("/runs/r1/stages/setup/log")
+        partial = client.get("/runs/r1/stages/setup/log", headers={"Range": "bytes=4-6"})
+        suffix = client.get("/runs/r1/stages/setup/log", headers={"Range": "bytes=-6"})
+        outside = client.get("/runs/r1/stages/setup/log", headers={"Range": "bytes=100-"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert full.status_code == 200
+    assert full.text == "one\ntwo\nthree\n"
+    assert full.headers["accept-ranges"] == "bytes"
+    assert partial.status_code == 206
+    assert partial.text == "two"
+    assert partial.headers["content-range"] == "bytes 4-6/14"
+    assert suffix.text == "three\n"
+    assert outside.status_code == 416
+    assert outside.headers["content-range"] == "bytes */14"
+
+
+def test_stage_log_line_paging(tmp_path):
+    """With limit a window of lines is returned, the last lines if no offset is given."""
+    app.dependency_overrides[get_Read_results_service] = lambda: _log_db(tmp_path)
+    try:
+        tail = client.get("/runs/r1/stages/setup/log?limit=2").json()
+        window = client.get("/runs/r1/stages/setup/log?offset=0&limit=1").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert tail == {"offset": 1, "lines": ["two", "three"], "total_lines": 3, "size": 14}
+    assert window["lines"] == ["one"]
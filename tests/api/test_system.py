@@ -20,4 +20,12 @@ def test_get_version():
     assert response.status_code == 200, "/version should return code 200"
     json_response = response.json()
     assert "version" in json_response, "/version response should contain 'version' key"
-    assert isinstance(json_response["version"], str), "/version value should be a string"
\ No newline at end of file
+    assert isinstance(json_response["version"], str), "/version value should be a string"
+def test_get_metrics():
+    """
+    /metrics reports the counters of the run result cache
+    """
+    response = client.get("/metrics")
+    assert response.status_code == 200, "/metrics should return code 200"
+    assert {"hits", "misses", "entries", "bytes"} <= set(response.json()["result_cache"])
+    assert {"limit", "remaining", "wait", "throttled"} <= set(response.json()["github_rate_limit"])
@@ -6,6 +6,7 @@ import pytest
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
+from basic_ci.core.run_queue import get_RunQueue
 from basic_ci.core.signature import get_signature_verifier
 from basic_ci.main import app
 from basic_ci.services.task_service import get_TaskService
@@ -41,21 +42,15 @@ def test_handle_webhook_invalid_signature():
     assert response.status_code == 403
 
 def test_handle_valid_webhook_with_valid_signature():
-    """A valid signature should allow the webhook to be processed."""
+    """A valid signature should queue the run and answer 202 with its run id."""
     mock_verifier = MagicMock()
     mock_service = MagicMock()
-    
-    # Return a dictionary that satisfies the TaskResult Pydantic model
-    mock_service.run_task.return_value = {
-        "run_id": "test-123",
-        "repo_url": "https://github.com/user/repo",
-        "branch": "main",
-        "commit_sha": "abc12345",
-        "status": "success"
-    }
+    mock_queue = MagicMock()
+    mock_service.create_task.return_value.run_id = "test-123"
 
     app.dependency_overrides[get_signature_verifier] = lambda: mock_verifier
     app.dependency_overrides[get_TaskService] = lambda: mock_service
+    app.dependency_overrides[get_RunQueue] = lambda: mock_queue
 
     payload = load_json("webhook.json")
     
@@ -65,7 +60,33 @@ def test_handle_valid_webhook_with_valid_signature():
         headers={"X-Hub-Signature-256": "sha256=valid_signature"},
     )
 
-    assert response.status_code == 200
+    assert response.status_code == 202
+    assert response.json() == {"run_id": "test-123", "status": "queued"}
+    mock_queue.enqueue.assert_called_once_with(mock_service.create_task.return_value)
+    task, queued_at = mock_service.report_queued.call_args.args
+    assert task is mock_service.create_task.return_value
+    assert isinstance(queued_at, float)
+    mock_service.run_task.assert_not_called()
+
+def test_run_is_queued_before_the_pending_status():
+    """The run is queued first, so a failing pending status cannot keep the push from running."""
+    order = MagicMock()
+    order.task_service.create_task.return_value.run_id = "test-123"
+
+    app.dependency_overrides[get_signature_verifier] = lambda: MagicMock()
+    app.dependency_overrides[get_TaskService] = lambda: order.task_service
+    app.dependency_overrides[get_RunQueue] = lambda: order.run_queue
+
+    response = client.post(
+        "/webhook",
+        json=load_json("webhook.json"),
+        headers={"X-Hub-Signature-256": "sha256=valid_signature"},
+    )
+
+    assert response.status_code == 202
+    calls = [name for name, _, _ in order.mock_calls if name in ("run_queue.enqueue", "task_service.report_queued")]
+    assert calls == ["run_queue.enqueue", "task_service.report_queued"]
+
 
 def test_handle_webhook_invalid_payload():
     """An invalid payload should return 422 Unprocessable Entity."""
@@ -0,0 +1,78 @@
+import threading
+from unittest.mock import MagicMock
+
+from basic_ci.core.run_queue import RunQueue
+from basic_ci.schemes.task import Task
+
+
+def _task(run_id: str) -> Task:
+    return Task(run_id=run_id, repo_url="https://github.com/owner/repo", branch="main", commit_sha="abc")
+
+
+def test_enqueue_does_not_run_task_until_started():
+    """
+    Enqueuing only stores the task, the runner is called by the workers.
+    """
+    runner = MagicMock()
+    run_queue = RunQueue(task_runner_factory=lambda: runner, workers=1)
+
+    run_queue.enqueue(_task("a"))
+
+    assert run_queue.pending() == 1
+    runner.run_task.assert_not_called()
+
+
+def test_workers_drain_queue():
+    """
+    All queued tasks are run once the workers are started and stop waits for them.
+    """
+    runner = MagicMock()
+    run_queue = RunQueue(task_runner_factory=lambda: runner, workers=2)
+    for run_id in ["a", "b", "c"]:
+        run_queue.enqueue(_task(run_id))
+
+    run_queue.start()
+    run_queue.stop(timeout=5)
+
+    assert runner.run_task.call_count == 3
+    assert {c.args[0].run_id for c in runner.run_task.call_args_list} == {"a", "b", "c"}
+
+
+def test_failing_task_does_not_kill_worker():
+    """
+    An exception raised by one run is logged and the worker continues with the next task.
+    """
+    runner = MagicMock()
+    runner.run_task.side_effect = [RuntimeError("clone failed"), None]
+    run_queue = RunQueue(task_runner_factory=lambda: runner, workers=1)
+
+    run_queue.start()
+    run_queue.enqueue(_task("bad"))
+    run_queue.enqueue(_task("good"))
+    run_queue.stop(timeout=5)
+
+    assert runner.run_task.call_count == 2
+
+
+def test_workers_run_concurrently_with_own_runner():
+    """
+    With two workers two runs execute at the same time, each on its own TaskRunner.
+    """
+    barrier = threading.Barrier(2, timeout=5)
+    runners = []
+
+    def factory():
+        runner = MagicMock()
+        runner.run_task.side_effect = lambda task: barrier.wait()
+        runners.append(runner)
+        return runner
+
+    run_queue = RunQueue(task_runner_factory=factory, workers=2)
+    run_queue.enqueue(_task("a"))
+    run_queue.enqueue(_task("b"))
+    run_queue.start()
+    run_queue.stop(timeout=5)
+
+    assert len(runners) == 2
+    assert not barrier.broken
+    assert [r.run_task.call_count for r in runners] == [1, 1]
@@ -0,0 +1,286 @@
+import sqlite3
+from pathlib import Path
+from typing import Optional
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import requests
+
+from basic_ci.core.config import Settings
+from basic_ci.core.TaskRunner import TaskRunner
+from basic_ci.schemes.task import Task
+
+
+def _task_runner(
+    build_cache: Optional[Mock], dependency_cache: Optional[Mock] = None, workspace_pool: Optional[Mock] = None
+) -> TaskRunner:
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", RESULTS_URL_TEMPLATE="http://ci/runs/{run_id}")
+    pipeline_stage_service = Mock()
+    pipeline_stage_service.pipeline_config_service.config_hash.return_value = "config"
+    return TaskRunner(
+        file_service=Mock(),
+        service_command=Mock(),
+        notification_service=Mock(),
+        git_service=Mock(),
+        pipeline_stage_service=pipeline_stage_service,
+        result_saver=Mock(),
+        settings=settings,
+        build_cache=build_cache,
+        dependency_cache=dependency_cache,
+        workspace_pool=workspace_pool,
+    )
+
+
+def test_identical_tree_reuses_successful_result():
+    """
+    With a successful build of the same tree the run is finished without cloning
+    or running stages and the GitHub status links to the original run.
+    """
+    build_cache = Mock()
+    build_cache.find_build.return_value = "original"
+    runner = _task_runner(build_cache)
+
+    result = runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc", tree_id="tree"))
+
+    build_cache.find_build.assert_called_once_with("tree", "config")
+    runner.git_service.clone_repo.assert_not_called()
+    runner.pipeline_stage_service.run_stages.assert_not_called()
+    assert result.status == "success"
+    assert result.reused_from == "original"
+    assert result.details_url == "http://ci/runs/original"
+    runner.result_saver.save_task_result.assert_called_once_with(result)
+    runner.notification_service.send_github_status.assert_called_once_with(result)
+
+
+def test_successful_run_is_remembered_in_build_cache():
+    """
+    Without a cached build the pipeline runs and a success is remembered for its tree.
+    """
+    build_cache = Mock()
+    build_cache.find_build.return_value = None
+    runner = _task_runner(build_cache)
+    stage = Mock()
+    stage.is_failure.return_value = False
+    runner.pipeline_stage_service.run_stages.return_value = [stage]
+
+    result = runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc", tree_id="tree"))
+
+    assert result.status == "success"
+    runner.git_service.clone_repo.assert_called_once()
+    build_cache.remember_build.assert_called_once_with("tree", "config", "new")
+
+
+def test_task_without_tree_id_skips_build_cache():
+    """
+    Tasks of pushes without a head commit have no tree and always run the pipeline.
+    """
+    build_cache = Mock()
+    runner = _task_runner(build_cache)
+    stage = Mock()
+    stage.is_failure.return_value = False
+    runner.pipeline_stage_service.run_stages.return_value = [stage]
+
+    runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    build_cache.find_build.assert_not_called()
+    build_cache.remember_build.assert_not_called()
+    runner.git_service.clone_repo.assert_called_once()
+
+
+def test_dependency_cache_is_exported_to_stages_and_saved_after_success():
+    """
+    The stages get the package cache in their environment, the venv of a successful
+    run is snapshotted for its lock file hash.
+    """
+    dependency_cache = MagicMock()
+    dependency_cache.environment.return_value = {"UV_CACHE_DIR": "/cache/packages"}
+    dependency_cache.key.return_value = "lock-hash"
+    runner = _task_runner(None, dependency_cache)
+    stage = Mock()
+    stage.is_failure.return_value = False
+    runner.pipeline_stage_service.run_stages.return_value = [stage]
+
+    result = runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    workspace = runner.file_service.create_folder.return_value
+    dependency_cache.restore_venv.assert_called_once_with(workspace, "lock-hash")
+    assert runner.pipeline_stage_service.run_stages.call_args.kwargs["env"] == {"UV_CACHE_DIR": "/cache/packages"}
+    dependency_cache.save_venv.assert_called_once_with(workspace, "lock-hash")
+    assert "dependencies" in result.phase_timings
+
+
+def test_dependency_cache_is_evicted_after_failed_run():
+    """
+    The dependency cache is kept within its size after every run, not only after
+    a successful one that snapshotted its venv.
+    """
+    dependency_cache = MagicMock()
+    dependency_cache.key.return_value = "lock-hash"
+    runner = _task_runner(None, dependency_cache)
+    stage = Mock()
+    stage.is_failure.return_value = True
+    runner.pipeline_stage_service.run_stages.return_value = [stage]
+
+    result = runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    assert result.status == "failure"
+    dependency_cache.save_venv.assert_not_called()
+    dependency_cache.evict.assert_called_once_with()
+
+
+def test_pooled_workspace_is_returned_even_if_stages_raise():
+    """
+    With a workspace pool the run leases a workspace instead of creating and deleting one,
+    and always returns it.
+    """
+    workspace_pool = Mock()
+    workspace_pool.acquire.return_value = Path("/pool/workspace-0")
+    runner = _task_runner(None, workspace_pool=workspace_pool)
+    runner.pipeline_stage_service.run_stages.side_effect = OSError("disk full")
+
+    with pytest.raises(OSError):
+        runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    workspace_pool.checkout.assert_called_once_with(Path("/pool/workspace-0"), "abc")
+    workspace_pool.release.assert_called_once_with(Path("/pool/workspace-0"))
+    error_result = runner.result_saver.save_task_result.call_args.args[0]
+    assert error_result.status == "error"
+    assert error_result.finished_at is not None
+    assert "disk full" in error_result.summary
+    runner.file_service.create_folder.assert_not_called()
+    runner.git_service.clone_repo.assert_not_called()
+
+
+def test_fresh_workspace_is_handed_to_the_reaper():
+    """
+    With a reaper the workspace is discarded in the background instead of deleted in the run.
+    """
+    workspace_reaper = Mock()
+    runner = _task_runner(None)
+    runner.workspace_reaper = workspace_reaper
+    stage = Mock()
+    stage.is_failure.return_value = False
+    runner.pipeline_stage_service.run_stages.return_value = [stage]
+
+    runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    workspace_reaper.discard.assert_called_once_with(runner.file_service.create_folder.return_value)
+    runner.file_service.delete_folder.assert_not_called()
+
+
+def test_status_goes_through_outbox_and_errors_do_not_fail_run():
+    """
+    With an outbox the status is only enqueued; without one a failing GitHub
+    request is logged and the run keeps its result.
+    """
+    runner = _task_runner(None)
+    runner.notification_outbox = Mock()
+    stage = Mock()
+    stage.is_failure.return_value = False
+    runner.pipeline_stage_service.run_stages.return_value = [stage]
+
+    result = runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    runner.notification_outbox.enqueue.assert_called_once_with(result, created_at=None)
+    runner.notification_service.send_github_status.assert_not_called()
+
+    runner.notification_outbox = None
+    runner.notification_service.send_github_status.side_effect = requests.Timeout("GitHub stalled")
+    result = runner.run_task(Task("next", "https://github.com/owner/repo", "main", "abc"))
+
+    assert result.status == "success"
+
+
+def test_pending_statuses_report_queue_and_stage_progress():
+    """
+    With an outbox a queued task and, if enabled, every finished stage is reported
+    as a pending status before the final one.
+    """
+    runner = _task_runner(None)
+    runner.notification_outbox = Mock()
+    runner.settings.NOTIFICATION_STAGE_PROGRESS = True
+    passed, failed = Mock(success=True), Mock(success=False)
+    passed.name, failed.name = "lint", "test"
+    failed.is_failure.return_value = True
+    passed.is_failure.return_value = False
+
+    def run_stages(*args, on_progress, **kwargs):
+        on_progress([passed], 2)
+        on_progress([passed, failed], 2)
+        return [passed, failed]
+
+    runner.pipeline_stage_service.run_stages.side_effect = run_stages
+    task = Task("new", "https://github.com/owner/repo", "main", "abc")
+    runner.report_queued(task)
+    runner.run_task(task)
+
+    statuses = [call.args[0] for call in runner.notification_outbox.enqueue.call_args_list]
+    assert [(status.status, status.summary) for status in statuses] == [
+        ("pending", "queued"),
+        ("pending", "1/2 stages passed"),
+        ("pending", "1/2 stages passed, test failed"),
+        ("failure", " Stage test failed"),
+    ]
+    assert statuses[0].details_url == "http://ci/runs/new"
+
+
+def test_aborted_run_reports_error_status_after_pending():
+    """
+    A run whose clone raises ends its pending "queued" status with an error status.
+    """
+    runner = _task_runner(None)
+    runner.notification_outbox = Mock()
+    runner.git_service.clone_repo.side_effect = OSError("repository not found")
+    task = Task("new", "https://github.com/owner/repo", "main", "abc")
+
+    runner.report_queued(task)
+    with pytest.raises(OSError):
+        runner.run_task(task)
+
+    statuses = [call.args[0] for call in runner.notification_outbox.enqueue.call_args_list]
+    assert [status.status for status in statuses] == ["pending", "error"]
+    assert "repository not found" in statuses[1].summary
+
+
+def test_pooled_workspace_is_returned_if_restoring_the_venv_fails():
+    """
+    Errors of the dependency cache do not leak the leased workspace either.
+    """
+    workspace_pool = Mock()
+    workspace_pool.acquire.return_value = Path("/pool/workspace-0")
+    dependency_cache = MagicMock()
+    dependency_cache.restore_venv.side_effect = OSError("No space left on device")
+    runner = _task_runner(None, dependency_cache, workspace_pool)
+
+    with pytest.raises(OSError):
+        runner.run_task(Task("new", "https://github.com/owner/repo", "main", "abc"))
+
+    workspace_pool.release.assert_called_once_with(Path("/pool/workspace-0"))
+    runner.pipeline_stage_service.run_stages.assert_not_called()
+    assert runner.result_saver.save_task_result.call_args.args[0].status == "error"
+
+
+def test_outbox_errors_do_not_stop_queueing_or_running():
+    """
+    A failing outbox (e.g. a locked database) neither raises from report_queued
+    nor aborts the pipeline from the progress callback.
+    """
+    runner = _task_runner(None)
+    runner.notification_outbox = Mock()
+    runner.notification_outbox.enqueue.side_effect = sqlite3.OperationalError("database is locked")
+    runner.settings.NOTIFICATION_STAGE_PROGRESS = True
+    stage = Mock(success=True)
+    stage.is_failure.return_value = False
+
+    def run_stages(*args, on_progress, **kwargs):
+        on_progress([stage], 1)
+        return [stage]
+
+    runner.pipeline_stage_service.run_stages.side_effect = run_stages
+    task = Task("new", "https://github.com/owner/repo", "main", "abc")
+
+    runner.report_queued(task)
+    result = runner.run_task(task)
+
+    assert result.status == "success"
+    assert runner.notification_outbox.enqueue.call_count == 3
@@ -0,0 +1,79 @@
+import json
+from dataclasses import asdict
+from datetime import datetime
+
+import pytest
+
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.task_result_codec import (
+    decode_task_result,
+    encode_task_result,
+)
+from basic_ci.schemes.TaskResult import TaskResult
+
+
+def _task_result() -> TaskResult:
+    return TaskResult(
+        run_id="run-1",
+        repo_url="https://github.com/owner/repo",
+        branch="main",
+        commit_sha="abc123",
+        status="failure",
+        started_at=datetime(2026, 1, 1, 12, 0, 0),
+        finished_at=datetime(2026, 1, 1, 12, 5, 0, 250000),
+        stages=[
+            Stage_result(
+                name="test", success=False, command="pytest", output="1 failed ✗",
+                started_at=datetime(2026, 1, 1, 12, 1, 0), exit_code=1, wall_time=1.5,
+            ),
+            Stage_result(name="build", success=False, command="build", output="", skipped=True),
+        ],
+        summary="Stage test failed",
+        phase_timings={"clone": 0.5},
+    )
+
+
+def test_round_trip_keeps_types():
+    """
+    Datetimes and nested Stage_results survive encoding and decoding unchanged.
+    """
+    task_result = _task_result()
+
+    decoded = decode_task_result(encode_task_result(task_result))
+
+    assert decoded == task_result
+    assert isinstance(decoded.stages[0], Stage_result)
+    assert isinstance(decoded.stages[0].started_at, datetime)
+
+
+def test_encode_without_output():
+    """
+    The stage output can be left out, it decodes as empty output.
+    """
+    encoded = encode_task_result(_task_result(), with_output=False)
+
+    assert "output" not in json.loads(encoded)["stages"][0]
+    assert decode_task_result(encoded).stages[0].output == ""
+
+
+def test_decode_old_format():
+    """
+    Files written with asdict + json.dump(default=str) are still read.
+    """
+    task_result = _task_result()
+    old = json.dumps(asdict(task_result), default=str, indent=2)
+
+    assert decode_task_result(old) == task_result
+
+
+def test_decode_invalid_documents():
+    """
+    Documents that are not a run raise ValueError.
+    """
+    with pytest.raises(ValueError):
+        decode_task_result("[]")
+    with pytest.raises(ValueError):
+        decode_task_result('{"run_id": "r1"}')
+    with pytest.raises(ValueError):
+        decode_task_result('{"run_id": "r1", "repo_url": "u", "branch": "b", '
+                           '"commit_sha": "c", "status": "s", "stages": [{"name": "x"}]}')
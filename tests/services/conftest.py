@@ -0,0 +1,55 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple
+
+import pytest
+
+
+class Github_stub:
+    """
+    Local stand-in for the GitHub statuses API. Every POST is recorded and
+    answered with the next queued (status, headers) response, 201 once the queue is empty.
+    """
+
+    def __init__(self) -> None:
+        self.requests: List[Dict[str, object]] = []
+        self.responses: List[Tuple[int, Dict[str, str]]] = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def respond(self, status: int, headers: Dict[str, str]) -> None:
+        with self.lock:
+            self.responses.append((status, headers))
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub.lock:
+                    stub.requests.append({"path": self.path, "json": json.loads(body)})
+                    status, headers = stub.responses.pop(0) if stub.responses else (201, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def github_stub() -> Iterator[Github_stub]:
+    stub = Github_stub()
+    thread = threading.Thread(target=stub.server.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
@@ -0,0 +1,89 @@
+import os
+
+from basic_ci.services.dependency_cache_service import Dependency_cache
+
+
+def _workspace(path, lock: str = "lock v1"):
+    venv = path / ".venv"
+    (venv / "bin").mkdir(parents=True)
+    (venv / "lib").mkdir()
+    (venv / "lib" / "package.py").write_text("x" * 1000)
+    (venv / "bin" / "tool").write_text(f"#!{venv.resolve()}/bin/python\nimport package\n")
+    (path / "uv.lock").write_text(lock)
+    return path
+
+
+def test_key_depends_on_lock_files(tmp_path):
+    """
+    The key changes with the lock file and is None without any lock file.
+    """
+    cache = Dependency_cache(tmp_path / "cache")
+    first = _workspace(tmp_path / "first")
+    second = _workspace(tmp_path / "second", lock="lock v2")
+
+    assert cache.key(first) is not None
+    assert cache.key(first) == cache.key(_workspace(tmp_path / "same"))
+    assert cache.key(first) != cache.key(second)
+    assert cache.key(tmp_path) is None
+    assert cache.environment() == {"UV_CACHE_DIR": str((tmp_path / "cache" / "packages").resolve())}
+
+
+def test_saved_venv_is_linked_and_relocated_into_new_workspace(tmp_path):
+    """
+    A snapshot is hardlinked into the next workspace, scripts point to the new venv
+    while the snapshot keeps the original ones.
+    """
+    cache = Dependency_cache(tmp_path / "cache", snapshots=True)
+    first = _workspace(tmp_path / "first")
+    key = cache.key(first)
+    assert key is not None
+
+    assert cache.save_venv(first, key)
+    assert not cache.save_venv(first, key)
+    second = tmp_path / "second"
+    second.mkdir()
+    assert cache.restore_venv(second, key)
+
+    restored = second / ".venv"
+    assert restored.joinpath("bin", "tool").read_text().startswith(f"#!{restored.resolve()}/bin/python")
+    assert os.path.samefile(restored / "lib" / "package.py", first / ".venv" / "lib" / "package.py")
+    assert first.joinpath(".venv", "bin", "tool").read_text().startswith(f"#!{(first / '.venv').resolve()}")
+    assert not cache.restore_venv(second, key)
+
+
+def test_least_recently_restored_snapshot_is_evicted(tmp_path):
+    """
+    Beyond max_bytes the oldest snapshot is removed, but not while a run uses the cache.
+    """
+    cache = Dependency_cache(tmp_path / "cache", max_bytes=1500, snapshots=True)
+    old = _workspace(tmp_path / "old", lock="old")
+    new = _workspace(tmp_path / "new", lock="new")
+    old_key, new_key = cache.key(old), cache.key(new)
+    assert old_key is not None and new_key is not None
+    cache.save_venv(old, old_key)
+    os.utime(tmp_path / "cache" / "venvs" / old_key, (0, 0))
+
+    with cache.in_use():
+        cache.save_venv(new, new_key)
+        assert cache.stats()["snapshots"] == 2
+
+    assert cache.evict() == 1
+    assert cache.stats()["snapshots"] == 1
+    assert (tmp_path / "cache" / "venvs" / new_key).is_dir()
+
+
+def test_package_cache_is_bounded_without_snapshots(tmp_path):
+    """
+    The package cache is evicted beyond max_bytes even if venvs are not snapshotted.
+    """
+    cache = Dependency_cache(tmp_path / "cache", max_bytes=10)
+    cache.environment()
+    (cache.package_cache / "wheel.whl").write_bytes(b"x" * 1000)
+    workspace = _workspace(tmp_path / "workspace")
+    key = cache.key(workspace)
+    assert key is not None
+
+    assert not cache.save_venv(workspace, key)
+    assert cache.stats()["bytes"] == 1000
+    assert cache.evict() == 1
+    assert cache.stats()["bytes"] == 0
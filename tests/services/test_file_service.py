@@ -155,4 +155,102 @@ def test_workspace_restriction_blocks_outside_paths(tmp_path: Path):
     fs.create_folder(workspace)
 
     with pytest.raises(PermissionError):
-        fs.create_folder(outside / "should_fail")
\ No newline at end of file
+        fs.create_folder(outside / "should_fail")
+
+def _tree(root: Path) -> Path:
+    (root / "nested").mkdir(parents=True)
+    (root / "a.txt").write_text("A" * 10000)
+    (root / "nested" / "b.txt").write_text("B")
+    (root / "link").symlink_to("a.txt")
+    return root
+
+
+def test_fast_copy_directory_copies_contents_and_symlinks(tmp_path: Path):
+    """
+    test_fast_copy_directory_copies_contents_and_symlinks verifies that the fast
+    mode copies every file, recreates symlinks and reports the strategies used.
+
+    :param tmp_path: Temporary directory provided by pytest
+    :return: None
+    """
+    fs = FileService()
+    src = _tree(tmp_path / "src")
+
+    report = fs.copy_directory(src, tmp_path / "dst", fast=True)
+
+    assert report is not None
+    assert (tmp_path / "dst" / "a.txt").read_text() == "A" * 10000
+    assert (tmp_path / "dst" / "nested" / "b.txt").read_text() == "B"
+    assert (tmp_path / "dst" / "link").readlink() == Path("a.txt")
+    assert report.files == 2 and report.bytes == 10001
+    assert report.strategies["symlink"] == 1
+    assert report.strategy in FileService.COPY_STRATEGIES
+    assert not (tmp_path / "dst" / "a.txt").samefile(src / "a.txt")
+
+
+def test_fast_copy_directory_hardlinks(tmp_path: Path):
+    """
+    test_fast_copy_directory_hardlinks verifies that with hardlink=True the
+    files are hardlinked and existing files are replaced.
+
+    :param tmp_path: Temporary directory provided by pytest
+    :return: None
+    """
+    fs = FileService()
+    src = _tree(tmp_path / "src")
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "a.txt").write_text("old")
+
+    report = fs.copy_directory(src, tmp_path / "dst", fast=True, hardlink=True)
+
+    assert report is not None and report.strategy == "hardlink"
+    assert (tmp_path / "dst" / "a.txt").samefile(src / "a.txt")
+
+
+def test_fast_copy_falls_back_to_byte_copy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """
+    test_fast_copy_falls_back_to_byte_copy verifies that unsupported system calls
+    are skipped and the content is still copied.
+
+    :param tmp_path: Temporary directory provided by pytest
+    :return: None
+    """
+    def unsupported(*args: object) -> int:
+        raise OSError("not supported")
+
+    monkeypatch.setattr("basic_ci.services.file_service.fcntl.ioctl", unsupported)
+    monkeypatch.setattr("basic_ci.services.file_service.os.copy_file_range", unsupported)
+    monkeypatch.setattr("basic_ci.services.file_service.os.sendfile", unsupported)
+    fs = FileService()
+    src = _tree(tmp_path / "src")
+
+    report = fs.copy_directory(src, tmp_path / "dst", fast=True, workers=1)
+
+    assert report is not None and report.strategies == {"symlink": 1, "bytes": 2}
+    assert (tmp_path / "dst" / "a.txt").read_text() == "A" * 10000
+
+
+def test_fast_copy_does_not_accept_a_short_kernel_copy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """
+    test_fast_copy_does_not_accept_a_short_kernel_copy verifies that a system call
+    that copies nothing is treated as unsupported instead of leaving an empty file.
+
+    :param tmp_path: Temporary directory provided by pytest
+    :return: None
+    """
+    def unsupported(*args: object) -> int:
+        raise OSError("not supported")
+
+    def copies_nothing(*args: object) -> int:
+        return 0
+
+    monkeypatch.setattr("basic_ci.services.file_service.fcntl.ioctl", unsupported)
+    monkeypatch.setattr("basic_ci.services.file_service.os.copy_file_range", copies_nothing)
+    monkeypatch.setattr("basic_ci.services.file_service.os.sendfile", copies_nothing)
+    fs = FileService()
+    src = _tree(tmp_path / "src")
+
+    report = fs.copy_directory(src, tmp_path / "dst", fast=True, workers=1)
+
+    assert report is not None and report.strategies == {"symlink": 1, "bytes": 2}
+    assert (tmp_path / "dst" / "a.txt").read_text() == "A" * 10000
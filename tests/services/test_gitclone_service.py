@@ -1,5 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import pytest
+from git import Actor, GitCommandError, Repo
+
 from basic_ci.services.gitclone_service import GitcloneService
 
 
@@ -24,4 +29,117 @@ def test_clone_repo_calls_git_correctly():
         mock_repo_instance.git.checkout.assert_called_once_with("123456")
 
 
+def _make_origin(path: Path) -> tuple[Repo, list[str]]:
+    """
+    Creates a small local repository with two commits and returns it with their SHAs.
+    """
+    repo = Repo.init(path)
+    actor = Actor("CI", "ci@example.com")
+    shas = []
+    for content in ["one", "two"]:
+        (path / "file.txt").write_text(content)
+        repo.index.add(["file.txt"])
+        shas.append(repo.index.commit(content, author=actor, committer=actor).hexsha)
+    return repo, shas
+
+
+def test_mirror_strategy_checks_out_commit_from_shared_clone(tmp_path: Path):
+    """
+    With the mirror strategy the checkout borrows its objects from the cached mirror
+    and the mirror is reused for the next run.
+    """
+    _, shas = _make_origin(tmp_path / "origin")
+    service = GitcloneService(
+        repo_url=(tmp_path / "origin").as_uri(),
+        strategy="mirror",
+        cache_folder=tmp_path / "cache",
+    )
+
+    service.clone_repo(shas[0], str(tmp_path / "run1"))
+    service.clone_repo(shas[1], str(tmp_path / "run2"))
+
+    assert (tmp_path / "run1" / "file.txt").read_text() == "one"
+    assert (tmp_path / "run2" / "file.txt").read_text() == "two"
+    assert Repo(tmp_path / "run2").head.commit.hexsha == shas[1]
+    assert (tmp_path / "run2" / ".git" / "objects" / "info" / "alternates").exists()
+    assert len(list((tmp_path / "cache").glob("*.git"))) == 1
+
 
+def test_mirror_strategy_concurrent_runs(tmp_path: Path):
+    """
+    Several runs cloning through the same mirror at once all succeed.
+    """
+    _, shas = _make_origin(tmp_path / "origin")
+    service = GitcloneService(
+        repo_url=(tmp_path / "origin").as_uri(),
+        strategy="mirror",
+        cache_folder=tmp_path / "cache",
+    )
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [
+            pool.submit(service.clone_repo, shas[i % 2], str(tmp_path / f"run{i}"))
+            for i in range(4)
+        ]
+        for future in futures:
+            future.result()
+
+    for i in range(4):
+        assert Repo(tmp_path / f"run{i}").head.commit.hexsha == shas[i % 2]
+
+
+def test_unknown_strategy_raises():
+    with pytest.raises(ValueError):
+        GitcloneService(repo_url="https://github.com/example/fakerepo.git", strategy="nope")
+
+
+def test_shallow_strategy_fetches_only_requested_commit(tmp_path: Path):
+    """
+    The shallow strategy checks out the commit without fetching its history.
+    """
+    _, shas = _make_origin(tmp_path / "origin")
+    service = GitcloneService(repo_url=(tmp_path / "origin").as_uri(), strategy="shallow")
+
+    service.clone_repo(shas[1], str(tmp_path / "run"))
+
+    repo = Repo(tmp_path / "run")
+    assert repo.head.commit.hexsha == shas[1]
+    assert (tmp_path / "run" / "file.txt").read_text() == "two"
+    assert int(repo.git.rev_list("--count", "HEAD")) == 1
+
+
+def test_shallow_strategy_sparse_checkout(tmp_path: Path):
+    """
+    Only the configured sparse paths end up in the working tree.
+    """
+    origin, _ = _make_origin(tmp_path / "origin")
+    (tmp_path / "origin" / "src").mkdir()
+    (tmp_path / "origin" / "src" / "main.py").write_text("print()")
+    origin.index.add(["src/main.py"])
+    actor = Actor("CI", "ci@example.com")
+    sha = origin.index.commit("src", author=actor, committer=actor).hexsha
+    service = GitcloneService(
+        repo_url=(tmp_path / "origin").as_uri(), strategy="shallow", sparse_paths=["src/"]
+    )
+
+    service.clone_repo(sha, str(tmp_path / "run"))
+
+    assert (tmp_path / "run" / "src" / "main.py").exists()
+    assert not (tmp_path / "run" / "file.txt").exists()
+
+
+def test_shallow_strategy_falls_back_to_full_clone(tmp_path: Path):
+    """
+    If fetching the commit by SHA is refused the full clone is used instead.
+    """
+    with patch("basic_ci.services.gitclone_service.Repo") as mock_repo_class:
+        mock_repo_class.init.return_value.git.fetch.side_effect = GitCommandError("fetch")
+        (tmp_path / "run" / ".git").mkdir(parents=True)
+        service = GitcloneService(repo_url="https://github.com/example/fakerepo.git", strategy="shallow")
+
+        service.clone_repo(head_commit_hash="123456", directory=str(tmp_path / "run"))
+
+        mock_repo_class.clone_from.assert_called_once_with(
+            "https://github.com/example/fakerepo.git", str(tmp_path / "run")
+        )
+        mock_repo_class.clone_from.return_value.git.checkout.assert_called_once_with("123456")
@@ -0,0 +1,103 @@
+import asyncio
+import gzip
+from pathlib import Path
+from typing import List
+
+from basic_ci.services.log_stream_service import Log_stream_service, Log_tail
+from basic_ci.services.stage_log_store import Stage_log_store
+
+
+async def _collect(service: Log_stream_service, path: Path, offset: int = 0) -> List[str]:
+    return [event async for event in service.events(path, offset)]
+
+
+def _data(events: List[str]) -> str:
+    """Joins the data of the events the way an EventSource does."""
+    texts = []
+    for event in events:
+        lines = [line[len("data: "):] for line in event.split("\n") if line.startswith("data: ")]
+        texts.append("\n".join(lines))
+    return "".join(texts)
+
+
+def test_events_of_compressed_log_from_offset(tmp_path):
+    """
+    A saved log is sent from the requested byte offset and closed with an end event
+    whose id is the size of the log.
+    """
+    log_path = tmp_path / "00_setup.log.gz"
+    log_path.write_bytes(gzip.compress(b"line 1\nline 2\n"))
+
+    events = asyncio.run(_collect(Log_stream_service(), log_path, offset=7))
+
+    assert _data(events) == "line 2\n"
+    assert events[-1].startswith("id: 14\nevent: end\n")
+
+
+def test_events_of_compressed_log_start_at_block_of_offset(tmp_path):
+    """
+    A reconnect into a large saved log only decompresses the block its offset
+    falls into, the blocks before it are not read.
+    """
+    store = Stage_log_store()
+    store.BLOCK_SIZE = 64
+    log_path = tmp_path / "00_setup.log.gz"
+    content = b"".join(b"line %03d\n" % number for number in range(100))
+    log_index = store.write_compressed(log_path, [content])
+    with open(log_path, "r+b") as f:
+        f.write(b"\0" * log_index.blocks[1][1])  # the first block is not readable anymore
+    offset = log_index.blocks[-1][0] + 3
+
+    events = asyncio.run(_collect(Log_stream_service(store), log_path, offset=offset))
+
+    assert _data(events) == content[offset:].decode()
+    assert events[-1].startswith(f"id: {len(content)}\nevent: end\n")
+
+
+def test_events_without_log_ask_viewer_to_retry():
+    """
+    A stage that has not started yet has no log, the viewer is told to reconnect later.
+    """
+    events = asyncio.run(_collect(Log_stream_service(), None))
+
+    assert events == ["retry: 2000\nevent: waiting\ndata: \n\n"]
+
+
+def test_live_log_is_fanned_out_from_one_tail(tmp_path, monkeypatch):
+    """
+    Two viewers of a log that is being written share a single tail, get the
+    bytes written before they subscribed and everything appended afterwards,
+    and their streams end once the log is replaced by its compressed version.
+    """
+    monkeypatch.setattr(Log_tail, "POLL_INTERVAL", 0.01)
+    log_path = tmp_path / "00_setup.log"
+    log_path.write_bytes(b"before\n")
+    service = Log_stream_service()
+
+    async def scenario() -> List[List[str]]:
+        viewers = [
+            asyncio.create_task(_collect(service, log_path)),
+            asyncio.create_task(_collect(service, log_path, offset=3)),
+        ]
+        while len(service._tails) == 0 or len(service._tails[log_path]._subscribers) < 2:
+            await asyncio.sleep(0.01)
+        assert len(service._tails) == 1
+        with log_path.open("ab") as f:
+            f.write(b"after\n")
+        await asyncio.sleep(0.1)
+        log_path.unlink()
+        return list(await asyncio.gather(*viewers))
+
+    first, second = asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+
+    assert _data(first) == "before\nafter\n"
+    assert _data(second) == "ore\nafter\n"
+    assert "event: end" in first[-1]
+    assert service._tails == {}
+
+
+def test_format_event_splits_lines():
+    """
+    Every line of the data becomes its own data field.
+    """
+    assert Log_stream_service.format_event("a\nb", 3) == "id: 3\ndata: a\ndata: b\n\n"
@@ -0,0 +1,266 @@
+import threading
+import time
+from unittest.mock import MagicMock, Mock
+
+import requests
+
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.notification_outbox_service import Notification_outbox
+from basic_ci.services.notification_service import NotificationService
+
+URL = "https://api.github.com/repos/OWNER/REPO/statuses/abc"
+
+
+def _task_result(commit_sha: str = "abc", status: str = "success", summary: str = "pipeline ran without errors") -> TaskResult:
+    return TaskResult(
+        run_id="run",
+        repo_url="https://github.com/OWNER/REPO",
+        branch="main",
+        commit_sha=commit_sha,
+        status=status,
+        summary=summary,
+    )
+
+
+def _outbox(tmp_path, post, **kwargs) -> Notification_outbox:
+    service = NotificationService(github_token="FAKE_TOKEN")
+    service.post_github_status = post  # type: ignore[method-assign]
+    return Notification_outbox(tmp_path / "outbox.sqlite3", service, retry_delay=0.01, **kwargs)
+
+
+def _http_error(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+def test_enqueued_status_is_sent_in_background(tmp_path):
+    """
+    A status is stored, sent by the dispatcher and removed from the outbox.
+    """
+    post = Mock()
+    outbox = _outbox(tmp_path, post)
+    outbox.start()
+    try:
+        outbox.enqueue(_task_result())
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    post.assert_called_once()
+    url, payload = post.call_args.args
+    assert url == URL
+    assert payload["state"] == "success"
+    assert outbox.stats() == {"pending": 0, "in_flight": 0, "failed": 0, "sent": 1, "retried": 0, "coalesced": 0, "deferred": 0}
+
+
+def test_failed_status_is_retried(tmp_path):
+    """
+    Network errors and server errors are retried until the status is delivered.
+    """
+    post = Mock(side_effect=[requests.ConnectionError("reset"), _http_error(502), MagicMock()])
+    outbox = _outbox(tmp_path, post)
+    outbox.start()
+    try:
+        outbox.enqueue(_task_result())
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert post.call_count == 3
+    assert outbox.stats()["sent"] == 1
+    assert outbox.stats()["retried"] == 2
+
+
+def test_rejected_status_is_not_retried(tmp_path):
+    """
+    A status GitHub rejects (e.g. an unknown commit) is kept as failed at once,
+    a status failing max_attempts times as well.
+    """
+    post = Mock(side_effect=_http_error(422))
+    outbox = _outbox(tmp_path, post, max_attempts=3)
+    outbox.start()
+    try:
+        outbox.enqueue(_task_result())
+        assert outbox.flush(timeout=5)
+        assert post.call_count == 1
+
+        post.side_effect = requests.Timeout("timed out")
+        outbox.enqueue(_task_result())
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert post.call_count == 4
+    assert outbox.stats()["failed"] == 2
+    assert outbox.stats()["pending"] == 0
+
+
+def test_unexpected_errors_are_logged_and_count_as_attempts(tmp_path, caplog):
+    """
+    An error that is not a request error (e.g. a bug or the outbox database) is
+    logged and uses up an attempt, so the status is not sent again forever.
+    """
+    post = Mock(side_effect=KeyError("state"))
+    outbox = _outbox(tmp_path, post, max_attempts=2)
+    outbox.start()
+    try:
+        outbox.enqueue(_task_result())
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert post.call_count == 2
+    assert outbox.stats()["failed"] == 1
+    assert outbox.stats()["retried"] == 1
+    assert "failed unexpectedly" in caplog.text
+
+
+def test_pending_statuses_survive_restart(tmp_path):
+    """
+    Statuses not sent before the outbox stopped are sent by the next one.
+    """
+    _outbox(tmp_path, Mock()).enqueue(_task_result())
+
+    post = Mock()
+    outbox = _outbox(tmp_path, post)
+    outbox.start()
+    try:
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    post.assert_called_once()
+
+
+def test_sends_are_bounded_by_workers(tmp_path):
+    """
+    No more than `workers` statuses are sent at the same time.
+    """
+    running, most = [0], [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def slow_post(url, payload):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+
+    outbox = _outbox(tmp_path, slow_post, workers=2)
+    for i in range(5):
+        outbox.enqueue(_task_result(commit_sha=f"sha{i}"))
+    outbox.start()
+    try:
+        threading.Timer(0.2, release.set).start()
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert most[0] == 2
+    assert outbox.stats()["sent"] == 5
+
+
+def test_queued_statuses_of_a_commit_are_coalesced(tmp_path):
+    """
+    Only the latest status per commit and context is sent, statuses of other
+    commits and contexts are kept.
+    """
+    post = Mock()
+    outbox = _outbox(tmp_path, post)
+    outbox.enqueue(_task_result(status="pending", summary="queued"))
+    outbox.enqueue(_task_result(status="pending", summary="1/2 stages passed"))
+    outbox.enqueue(_task_result(status="success"))
+    outbox.enqueue(_task_result(status="success"), context="other")
+    outbox.enqueue(_task_result(commit_sha="def", status="pending", summary="queued"))
+    outbox.start()
+    try:
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    sent = sorted((url.rsplit("/", 1)[1], payload["context"], payload["state"]) for url, payload in (
+        call.args for call in post.call_args_list
+    ))
+    assert sent == [("abc", "basic-ci", "success"), ("abc", "other", "success"), ("def", "basic-ci", "pending")]
+    assert outbox.stats()["coalesced"] == 2
+
+
+def test_status_older_than_the_latest_is_dropped(tmp_path):
+    """
+    The "queued" status reported after the run already enqueued its result does
+    not replace that result.
+    """
+    post = Mock()
+    outbox = _outbox(tmp_path, post)
+    queued_at = time.time()
+    assert outbox.enqueue(_task_result(status="success")) is not None
+    assert outbox.enqueue(_task_result(status="pending", summary="queued"), created_at=queued_at) is None
+    outbox.start()
+    try:
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert [call.args[1]["state"] for call in post.call_args_list] == ["success"]
+
+
+def test_newer_status_waits_for_the_one_in_flight(tmp_path):
+    """
+    A status queued while an older one of the same commit is being sent is sent
+    after it, never at the same time.
+    """
+    sending = threading.Event()
+    release = threading.Event()
+    states = []
+
+    def slow_post(url, payload):
+        states.append(payload["state"])
+        if payload["state"] == "pending":
+            sending.set()
+            release.wait(5)
+
+    outbox = _outbox(tmp_path, slow_post)
+    outbox.start()
+    try:
+        outbox.enqueue(_task_result(status="pending", summary="queued"))
+        assert sending.wait(5)
+        outbox.enqueue(_task_result(status="success"))
+        time.sleep(0.1)
+        assert states == ["pending"]
+        release.set()
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert states == ["pending", "success"]
+
+
+def test_throttled_status_is_deferred_not_failed(tmp_path, github_stub):
+    """
+    A status rejected for the rate limit is sent again once GitHub allows it,
+    the throttled attempt does not count towards max_attempts.
+    """
+    service = NotificationService(github_token="FAKE_TOKEN", github_api_base=github_stub.url)
+    outbox = Notification_outbox(tmp_path / "outbox.sqlite3", service, max_attempts=1)
+    github_stub.respond(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 1)})
+    outbox.start()
+    try:
+        outbox.enqueue(_task_result())
+        assert outbox.flush(timeout=10)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert len(github_stub.requests) == 2
+    stats = outbox.stats()
+    assert (stats["sent"], stats["deferred"], stats["failed"]) == (1, 1, 0)
+
+
+def test_backoff_grows_exponentially_up_to_the_limit(tmp_path):
+    outbox = Notification_outbox(tmp_path / "outbox.sqlite3", Mock(), retry_delay=2, max_retry_delay=10)
+
+    assert 1 <= outbox.backoff(1) <= 2
+    assert 4 <= outbox.backoff(3) <= 8
+    assert 5 <= outbox.backoff(10) <= 10
@@ -1,8 +1,17 @@
+import time
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+import pytest
+import requests
+
+from basic_ci.core.config import Settings
 from basic_ci.schemes.TaskResult import TaskResult
-from basic_ci.services.notification_service import NotificationService
+from basic_ci.services.github_rate_limit import Rate_limited, get_Rate_limit_budget
+from basic_ci.services.notification_service import (
+    NotificationService,
+    get_NotificationService,
+)
 
 
 def test_send_github_status_builds_correct_request():
@@ -21,7 +30,7 @@ def test_send_github_status_builds_correct_request():
         stages=[],
     )
 
-    with patch("basic_ci.services.notification_service.requests.post") as post_mock:
+    with patch.object(service.session, "post") as post_mock:
         fake_resp = MagicMock()
         fake_resp.raise_for_status.return_value = None
         post_mock.return_value = fake_resp
@@ -33,7 +42,7 @@ def test_send_github_status_builds_correct_request():
         args, kwargs = post_mock.call_args
         url = args[0]
         json_payload = kwargs["json"]
-        headers = kwargs["headers"]
+        headers = service.session.headers
 
         assert url == "https://api.github.com/repos/OWNER/REPO/statuses/0123456789abcdef0123456789abcdef01234567"
 
@@ -44,3 +53,95 @@ def test_send_github_status_builds_correct_request():
         assert json_payload["context"] == "basic-ci"
         assert json_payload["description"] == "All steps succeeded"
         assert json_payload["target_url"] == "https://example.com/builds/abc123"
+
+
+def test_send_github_status_raises_on_error_response():
+    service = NotificationService(github_token="FAKE_TOKEN")
+    task_result = TaskResult(
+        run_id="abc123",
+        repo_url="https://github.com/OWNER/REPO",
+        branch="main",
+        commit_sha="0123456789abcdef0123456789abcdef01234567",
+        status="failure",
+    )
+
+    with patch.object(service.session, "post") as post_mock:
+        post_mock.return_value.raise_for_status.side_effect = requests.HTTPError("422")
+
+        with pytest.raises(requests.HTTPError):
+            service.send_github_status(task_result)
+
+
+def _status(commit_sha: str = "0123456789abcdef0123456789abcdef01234567") -> TaskResult:
+    return TaskResult(
+        run_id="abc123",
+        repo_url="https://github.com/OWNER/REPO",
+        branch="main",
+        commit_sha=commit_sha,
+        status="success",
+    )
+
+
+def test_rate_limit_headers_update_budget(github_stub):
+    service = NotificationService(github_token="FAKE_TOKEN", github_api_base=github_stub.url)
+    reset = int(time.time()) + 3600
+    github_stub.respond(201, {
+        "X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(reset),
+    })
+
+    service.send_github_status(_status())
+
+    assert github_stub.requests[0]["path"] == "/repos/OWNER/REPO/statuses/0123456789abcdef0123456789abcdef01234567"
+    stats = service.rate_limit.stats()
+    assert (stats["limit"], stats["remaining"], stats["wait"], stats["throttled"]) == (5000, 4999, 0, 0)
+    assert 3590 <= stats["reset_in"] <= 3600
+
+
+def test_throttled_request_holds_back_further_requests(github_stub):
+    """
+    After a secondary rate limit the service waits for Retry-After without
+    sending, after the budget is used up it waits for the reset.
+    """
+    service = NotificationService(github_token="FAKE_TOKEN", github_api_base=github_stub.url)
+    github_stub.respond(429, {"Retry-After": "30"})
+
+    with pytest.raises(Rate_limited) as throttled:
+        service.send_github_status(_status())
+    with pytest.raises(Rate_limited):
+        service.send_github_status(_status())
+
+    assert len(github_stub.requests) == 1
+    assert 25 <= throttled.value.retry_at - time.time() <= 30
+    assert service.rate_limit.stats()["throttled"] == 1
+
+    service = NotificationService(github_token="FAKE_TOKEN", github_api_base=github_stub.url, rate_limit_reserve=1)
+    github_stub.respond(201, {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": str(int(time.time()) + 60)})
+    service.send_github_status(_status())
+    service.send_github_status(_status())  # 2 left, one of them is reserved
+    with pytest.raises(Rate_limited):
+        service.send_github_status(_status())
+
+    assert len(github_stub.requests) == 3
+
+
+def test_services_share_the_rate_limit_of_the_token():
+    """
+    Every NotificationService of the factory takes from the same budget, with or
+    without outbox, so a new TaskRunner does not start with an empty one.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", NOTIFICATION_WORKERS=0)
+
+    first, second = get_NotificationService(settings), get_NotificationService(settings)
+
+    assert first is not second
+    assert first.rate_limit is second.rate_limit is get_Rate_limit_budget(settings)
+
+
+def test_forbidden_without_rate_limit_is_a_plain_error(github_stub):
+    service = NotificationService(github_token="FAKE_TOKEN", github_api_base=github_stub.url)
+    github_stub.respond(403, {"X-RateLimit-Remaining": "4000"})
+
+    with pytest.raises(requests.HTTPError) as error:
+        service.send_github_status(_status())
+
+    assert not isinstance(error.value, Rate_limited)
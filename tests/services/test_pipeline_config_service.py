@@ -40,4 +40,57 @@ def test_malformed_pipeline_config():
     settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", PIPELINE_CONFIG_PATH=str(malformed_pipeline_path))
     service = Pipeline_Config_service(settings=settings)
     with pytest.raises(ValueError):
-        service.load_pipeline_config()
\ No newline at end of file
+        service.load_pipeline_config()
+
+def test_pipeline_config_with_needs():
+    """
+    Test that `needs` and `max_parallel` are read and stages without `needs` depend on the previous stage.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", PIPELINE_CONFIG_PATH=str(DATA_DIR / "dag_pipeline.yaml"))
+    service = Pipeline_Config_service(settings=settings)
+    pipeline_config = service.load_pipeline_config()
+
+    assert pipeline_config.max_parallel == 2
+    assert pipeline_config.dependencies() == {
+        "setup": [],
+        "typecheck": ["setup"],
+        "test": ["setup"],
+        "build": ["test"],
+    }
+
+def test_cyclic_pipeline_config():
+    """
+    Test that a dependency cycle is detected when the configuration is loaded.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", PIPELINE_CONFIG_PATH=str(DATA_DIR / "cyclic_pipeline.yaml"))
+    service = Pipeline_Config_service(settings=settings)
+    with pytest.raises(ValueError, match="cycle"):
+        service.load_pipeline_config()
+
+def test_unknown_needs_pipeline_config(tmp_path):
+    """
+    Test that needing a stage that does not exist raises ValueError.
+    """
+    pipeline_path = tmp_path / "pipeline.yaml"
+    pipeline_path.write_text("stages:\n  - stage: a\n    command: echo a\n    needs: [missing]\n")
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", PIPELINE_CONFIG_PATH=str(pipeline_path))
+    service = Pipeline_Config_service(settings=settings)
+    with pytest.raises(ValueError, match="unknown stage"):
+        service.load_pipeline_config()
+
+def test_config_hash(tmp_path):
+    """
+    The config hash changes with the content of the file and is None without a file.
+    """
+    pipeline_path = tmp_path / "pipeline.yaml"
+    pipeline_path.write_text("stages:\n  - stage: a\n    command: echo a\n")
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy_secret", PIPELINE_CONFIG_PATH=str(pipeline_path))
+    service = Pipeline_Config_service(settings=settings)
+
+    first = service.config_hash()
+    pipeline_path.write_text("stages:\n  - stage: a\n    command: echo b\n")
+
+    assert first is not None
+    assert service.config_hash() not in (None, first)
+    pipeline_path.unlink()
+    assert service.config_hash() is None
@@ -1,7 +1,12 @@
+import subprocess
+import threading
+import time
 from unittest.mock import MagicMock
 
 from basic_ci.schemes.pipeline import PipelineConfig, Stage
 from basic_ci.services.pipeline_stage_service import Pipeline_stage_service
+from basic_ci.services.ServiceCommand import ServiceCommand
+from basic_ci.services.stage_cache_service import Stage_cache
 
 
 def test_pipeline_execution_logic(tmp_path):
@@ -36,4 +41,199 @@ def test_pipeline_execution_logic(tmp_path):
     assert results[1].success is False
     
     assert mock_command_service.run_command.call_count == 2
-    mock_command_service.run_command.assert_any_call(["ruff", "."], path=tmp_path)
\ No newline at end of file
+    mock_command_service.run_command.assert_any_call(["ruff", "."], path=tmp_path)
+
+def test_progress_is_reported_after_every_stage(tmp_path):
+    """
+    on_progress gets the results so far and the number of stages.
+    """
+    mock_command_service = MagicMock()
+    mock_config_service = MagicMock()
+    service = Pipeline_stage_service(mock_command_service, mock_config_service)
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="test-project",
+        stages=[Stage(stage="Lint", command="ruff ."), Stage(stage="Test", command="pytest")],
+    )
+    mock_command_service.run_command.return_value = MagicMock(returncode=0, stdout="OK", stderr="")
+    progress = []
+
+    service.run_stages(
+        tmp_path, on_progress=lambda results, total: progress.append(([r.name for r in results], total))
+    )
+
+    assert progress == [(["Lint"], 2), (["Lint", "Test"], 2)]
+
+
+def test_independent_stages_run_in_parallel(tmp_path):
+    """
+    Stages whose dependencies are done run at the same time, dependent stages wait for them.
+    """
+    mock_config_service = MagicMock()
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="dag",
+        max_parallel=2,
+        stages=[
+            Stage(stage="setup", command="setup"),
+            Stage(stage="typecheck", command="typecheck", needs=["setup"]),
+            Stage(stage="test", command="test", needs=["setup"]),
+            Stage(stage="build", command="build", needs=["typecheck", "test"]),
+        ],
+    )
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+
+    def run_command(command, path):
+        order.append(command[0])
+        if command[0] in ("typecheck", "test"):
+            barrier.wait()
+        return MagicMock(returncode=0, stdout="", stderr="")
+
+    mock_command_service = MagicMock()
+    mock_command_service.run_command.side_effect = run_command
+    service = Pipeline_stage_service(mock_command_service, mock_config_service)
+
+    results = service.run_stages(tmp_path)
+
+    assert [r.name for r in results] == ["setup", "typecheck", "test", "build"]
+    assert all(r.success for r in results)
+    assert order[0] == "setup" and order[-1] == "build"
+    assert not barrier.broken
+
+
+def test_fail_fast_skips_remaining_stages(tmp_path):
+    """
+    With fail_fast the stages after a failing stage are not run and are recorded as skipped,
+    while a failing stage with allow_failure does not stop the pipeline.
+    """
+    mock_config_service = MagicMock()
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="fail-fast",
+        fail_fast=True,
+        stages=[
+            Stage(stage="lint", command="lint", allow_failure=True),
+            Stage(stage="setup", command="setup"),
+            Stage(stage="test", command="test"),
+        ],
+    )
+    mock_command_service = MagicMock()
+    mock_command_service.run_command.return_value = MagicMock(returncode=1, stdout="", stderr="Error")
+    service = Pipeline_stage_service(mock_command_service, mock_config_service)
+
+    results = service.run_stages(tmp_path)
+
+    assert mock_command_service.run_command.call_count == 2
+    assert [r.is_failure() for r in results] == [False, True, False]
+    assert results[0].allow_failure and not results[0].skipped
+    assert results[2].skipped
+
+
+def test_fail_fast_cancels_running_sibling(tmp_path):
+    """
+    A failing stage kills the process group of a sibling stage that is still running.
+    """
+    mock_config_service = MagicMock()
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="fail-fast",
+        fail_fast=True,
+        max_parallel=2,
+        stages=[
+            Stage(stage="slow", command="sleep 30", needs=[]),
+            Stage(stage="broken", command="exit 3", needs=[]),
+        ],
+    )
+    service = Pipeline_stage_service(ServiceCommand(), mock_config_service)
+
+    start = time.monotonic()
+    results = service.run_stages(tmp_path)
+
+    assert time.monotonic() - start < 10
+    assert results[0].skipped
+    assert results[1].is_failure()
+
+
+def test_stage_output_streamed_to_log_folder(tmp_path):
+    """
+    With a log folder every stage writes its output to its own log file which the result references.
+    """
+    mock_config_service = MagicMock()
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="logs",
+        stages=[Stage(stage="say hello", command="echo hello"), Stage(stage="fail", command="exit 1")],
+    )
+    service = Pipeline_stage_service(ServiceCommand(), mock_config_service)
+
+    results = service.run_stages(tmp_path, log_folder=tmp_path / "logs")
+
+    assert results[0].log_file == "00_say_hello.log"
+    assert results[0].output == ""
+    assert (tmp_path / "logs" / "00_say_hello.log").read_text() == "hello\n"
+    assert results[1].log_file == "01_fail.log"
+    assert results[1].is_failure()
+    assert results[1].exit_code == 1
+    assert results[0].started_at is not None and results[0].wall_time > 0
+
+
+def _git_checkout(path):
+    path.mkdir()
+    (path / "src").mkdir()
+    (path / "src" / "app.py").write_text("print('v1')\n")
+    (path / "README.md").write_text("readme\n")
+    for command in (["init", "-q"], ["add", "."]):
+        subprocess.run(["git", *command], cwd=path, check=True)
+    return path
+
+
+def test_stage_with_unchanged_inputs_is_not_run_again(tmp_path):
+    """
+    A stage whose input files already passed is reported as cached without running,
+    changing one of its inputs runs it again.
+    """
+    checkout = _git_checkout(tmp_path / "checkout")
+    counter = tmp_path / "count"
+    mock_config_service = MagicMock()
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="cache",
+        stages=[Stage(stage="check", command=f"echo ran >> {counter}", inputs=["src/**"])],
+    )
+    service = Pipeline_stage_service(
+        ServiceCommand(), mock_config_service, stage_cache=Stage_cache(tmp_path / "cache.sqlite3")
+    )
+
+    first = service.run_stages(checkout)
+    (checkout / "README.md").write_text("changed\n")
+    subprocess.run(["git", "add", "."], cwd=checkout, check=True)
+    second = service.run_stages(checkout, log_folder=tmp_path / "logs")
+    (checkout / "src" / "app.py").write_text("print('v2')\n")
+    subprocess.run(["git", "add", "."], cwd=checkout, check=True)
+    third = service.run_stages(checkout)
+
+    assert not first[0].cached
+    assert second[0].cached and second[0].success
+    assert "Inputs unchanged" in (tmp_path / "logs" / second[0].log_file).read_text()
+    assert not third[0].cached
+    assert counter.read_text().count("ran") == 2
+
+
+def test_cached_stage_runs_when_a_stage_needing_it_runs(tmp_path):
+    """
+    A stage that a running stage needs is run as well, the running stage may need its side effects.
+    """
+    checkout = _git_checkout(tmp_path / "checkout")
+    mock_config_service = MagicMock()
+    mock_config_service.load_pipeline_config.return_value = PipelineConfig(
+        project="cache",
+        stages=[
+            Stage(stage="setup", command="touch installed", inputs=["src/**"]),
+            Stage(stage="test", command="test -f installed"),
+        ],
+    )
+    service = Pipeline_stage_service(
+        ServiceCommand(), mock_config_service, stage_cache=Stage_cache(tmp_path / "cache.sqlite3")
+    )
+
+    service.run_stages(checkout)
+    (checkout / "installed").unlink()
+    results = service.run_stages(checkout)
+
+    assert not results[0].cached
+    assert results[1].success
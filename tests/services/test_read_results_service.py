@@ -0,0 +1,137 @@
+from dataclasses import replace
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from basic_ci.core.config import Settings
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.file_service import FileService
+from basic_ci.services.read_results_service import Read_results_service
+from basic_ci.services.result_save_service import Results_save_service
+from basic_ci.services.run_index_service import get_Run_index_service
+
+
+def _save_run(settings: Settings, run_id: str = "run-1") -> None:
+    """
+    Saves a run with one streamed stage the same way TaskRunner does.
+    """
+    log_folder = f"{settings.SAVE_FOLDER}/{run_id}/logs"
+    FileService().create_folder(log_folder)
+    with open(f"{log_folder}/00_setup.log", "w") as f:
+        f.write("streamed output\n")
+    saver = Results_save_service(
+        file_service=FileService(), settings=settings, run_index=get_Run_index_service(settings)
+    )
+    saver.save_task_result(
+        TaskResult(
+            run_id=run_id,
+            repo_url="https://github.com/owner/repo",
+            branch="main",
+            commit_sha="abc123",
+            status="success",
+            started_at=datetime(2026, 1, 1, 12, 0, 0),
+            stages=[Stage_result(name="setup", success=True, command="make setup", output="", log_file="00_setup.log")],
+        )
+    )
+
+
+def test_get_task_result_reads_stage_logs(tmp_path):
+    """
+    Stages are returned as Stage_result objects and their streamed output is loaded from the log file.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    _save_run(settings)
+
+    task_result = Read_results_service(settings=settings).get_task_result("run-1", with_logs=True)
+
+    assert isinstance(task_result.stages[0], Stage_result)
+    assert task_result.stages[0].output == "streamed output\n"
+
+
+def test_get_task_result_loads_logs_lazily(tmp_path):
+    """
+    Without with_logs only the summary is read, the log stays available on request.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    _save_run(settings)
+    reader = Read_results_service(settings=settings)
+
+    stage = reader.get_task_result("run-1").stages[0]
+
+    assert stage.output == ""
+    assert stage.log_file == "00_setup.log.gz"
+    assert reader.read_stage_log("run-1", stage.log_file) == "streamed output\n"
+
+
+def test_get_runs_reads_run_index(tmp_path):
+    """
+    The overview is served from the run index, not from the result folders.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    _save_run(settings)
+    (tmp_path / "run-1" / "summary.json").unlink()
+
+    runs = Read_results_service(settings=settings).get_runs().runs
+
+    assert [run.run_id for run in runs] == ["run-1"]
+    assert runs[0].status == "success"
+
+
+def test_scan_saved_runs_does_not_read_logs(tmp_path):
+    """
+    Scanning the result folders (used for reindexing) does not load the stage logs.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    _save_run(settings)
+
+    runs = list(Read_results_service(settings=settings).scan_saved_runs())
+
+    assert [run.run_id for run in runs] == ["run-1"]
+    assert runs[0].stages[0].output == ""
+
+
+def test_stage_log_path_of_running_and_saved_runs(tmp_path):
+    """
+    While a run is running the plain log a stage streams to is found by the stage name,
+    once saved the compressed log is returned. Unknown stages of saved runs raise.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    saver = Results_save_service(file_service=FileService(), settings=settings)
+    reader = Read_results_service(settings=settings, run_index=Mock())
+    saver.save_task_result(
+        TaskResult(run_id="run-1", repo_url="u", branch="main", commit_sha="abc", status="running")
+    )
+    log_folder = tmp_path / "run-1" / "logs"
+
+    assert reader.stage_log_path("run-1", "run tests") is None
+    FileService().create_folder(log_folder)
+    (log_folder / "01_run_tests.log").write_text("running\n")
+    assert reader.stage_log_path("run-1", "run tests") == log_folder / "01_run_tests.log"
+
+    _save_run(settings)
+    assert reader.stage_log_path("run-1", "setup") == log_folder / "00_setup.log.gz"
+    with pytest.raises(FileNotFoundError):
+        reader.stage_log_path("run-1", "run tests")
+
+
+def test_get_task_result_is_cached_until_the_summary_changes(tmp_path):
+    """
+    Repeated reads of a run are served from the cache, saving the run again invalidates it.
+    Reading with logs does not change the cached summary.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    _save_run(settings)
+    reader = Read_results_service(settings=settings)
+
+    first = reader.get_task_result("run-1")
+    assert reader.get_task_result("run-1") is first
+    assert reader.get_task_result("run-1", with_logs=True).stages[0].output == "streamed output\n"
+    assert first.stages[0].output == ""
+
+    saver = Results_save_service(file_service=FileService(), settings=settings)
+    saver.save_task_result(replace(first, status="failure", summary="changed"))
+
+    assert reader.get_task_result("run-1").status == "failure"
+    assert (reader.cache.hits, reader.cache.misses) == (2, 2)
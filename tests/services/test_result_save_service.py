@@ -0,0 +1,89 @@
+import gzip
+import json
+from dataclasses import asdict
+from datetime import datetime
+
+from basic_ci.core.config import Settings
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.file_service import FileService
+from basic_ci.services.result_save_service import Results_save_service
+
+
+def _task_result(run_id: str = "run-1") -> TaskResult:
+    return TaskResult(
+        run_id=run_id,
+        repo_url="https://github.com/owner/repo",
+        branch="main",
+        commit_sha="abc123",
+        status="success",
+        started_at=datetime(2026, 1, 1, 12, 0, 0),
+        finished_at=datetime(2026, 1, 1, 12, 5, 0),
+        stages=[Stage_result(name="setup", success=True, command="make setup", output="ok")],
+        summary="pipeline ran without errors",
+    )
+
+
+def test_save_task_result_writes_summary_and_compressed_logs(tmp_path):
+    """
+    The result is stored as a compact summary.json without stage output in a folder
+    named after the run id, every stage output goes to its own compressed log.
+    No temporary files are left behind.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    saver = Results_save_service(file_service=FileService(), settings=settings)
+
+    saver.save_task_result(_task_result())
+
+    run_folder = tmp_path / "run-1"
+    assert sorted(p.name for p in run_folder.iterdir()) == ["logs", "summary.json"]
+    saved = json.loads((run_folder / "summary.json").read_text())
+    assert saved["status"] == "success"
+    assert saved["stages"][0]["name"] == "setup"
+    assert "output" not in saved["stages"][0]
+    assert saved["stages"][0]["log_file"] == "00_setup.log.gz"
+    assert sorted(p.name for p in (run_folder / "logs").iterdir()) == [
+        "00_setup.log.gz", "00_setup.log.gz.idx"
+    ]
+    assert gzip.decompress((run_folder / "logs" / "00_setup.log.gz").read_bytes()) == b"ok"
+
+
+def test_save_task_result_compresses_streamed_log(tmp_path):
+    """
+    A streamed stage log is compressed together with the output kept in the
+    Stage_result and the uncompressed log is removed.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    log_folder = tmp_path / "run-1" / "logs"
+    log_folder.mkdir(parents=True)
+    (log_folder / "00_setup.log").write_text("streamed\n")
+    task_result = _task_result()
+    task_result.stages[0].log_file = "00_setup.log"
+    task_result.stages[0].output = "cancelled"
+
+    Results_save_service(file_service=FileService(), settings=settings).save_task_result(task_result)
+
+    assert sorted(p.name for p in log_folder.iterdir()) == ["00_setup.log.gz", "00_setup.log.gz.idx"]
+    assert gzip.decompress((log_folder / "00_setup.log.gz").read_bytes()) == b"streamed\ncancelled"
+
+
+def test_migrate_legacy_run(tmp_path):
+    """
+    A run stored as a single taskResult.json is converted into the new layout
+    and migrating it again does nothing.
+    """
+    settings = Settings(GITHUB_WEBHOOK_SECRET="dummy", SAVE_FOLDER=str(tmp_path))
+    run_folder = tmp_path / "run-1"
+    run_folder.mkdir()
+    (run_folder / "taskResult.json").write_text(
+        json.dumps(asdict(_task_result()), indent=2, default=str)
+    )
+    saver = Results_save_service(file_service=FileService(), settings=settings)
+
+    assert saver.migrate_legacy_run(run_folder) is True
+    assert saver.migrate_legacy_run(run_folder) is False
+
+    assert sorted(p.name for p in run_folder.iterdir()) == ["logs", "summary.json"]
+    saved = json.loads((run_folder / "summary.json").read_text())
+    assert saved["started_at"] == "2026-01-01T12:00:00"
+    assert gzip.decompress((run_folder / "logs" / "00_setup.log.gz").read_bytes()) == b"ok"
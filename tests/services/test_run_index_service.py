@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pytest
+
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.run_index_service import Run_index_service
+
+
+def _task_result(
+    run_id: str, started_minute: int, status: str = "success", branch: str = "main", commit_sha: str = "abc123"
+) -> TaskResult:
+    return TaskResult(
+        run_id=run_id,
+        repo_url="https://github.com/owner/repo",
+        branch=branch,
+        commit_sha=commit_sha,
+        status=status,
+        started_at=datetime(2026, 1, 1, 12, started_minute),
+        finished_at=datetime(2026, 1, 1, 12, started_minute + 2),
+    )
+
+
+def test_upsert_and_list_newest_first(tmp_path):
+    """
+    Indexed runs are listed newest first with their duration.
+    """
+    index = Run_index_service(tmp_path / "index" / "index.sqlite3")
+    index.upsert(_task_result("old", 0))
+    index.upsert(_task_result("new", 10))
+
+    runs = index.list_runs().runs
+
+    assert [run.run_id for run in runs] == ["new", "old"]
+    assert runs[0].duration == 120
+    assert runs[0].started_at == datetime(2026, 1, 1, 12, 10)
+
+
+def test_upsert_updates_existing_run(tmp_path):
+    """
+    Saving a run again replaces its summary row instead of adding a second one.
+    """
+    index = Run_index_service(tmp_path / "index" / "index.sqlite3")
+    index.upsert(_task_result("run", 0, status="running"))
+    index.upsert(_task_result("run", 0, status="failure"))
+
+    runs = index.list_runs().runs
+
+    assert len(runs) == 1
+    assert runs[0].status == "failure"
+
+
+def test_rebuild_replaces_index(tmp_path):
+    """
+    Rebuilding drops rows of runs that no longer exist and accepts ISO string timestamps.
+    """
+    index = Run_index_service(tmp_path / "index" / "index.sqlite3")
+    index.upsert(_task_result("gone", 0))
+    loaded = _task_result("loaded", 5)
+    loaded.started_at = "2026-01-01 12:05:00"
+
+    count = index.rebuild([loaded])
+
+    assert count == 1
+    assert [run.run_id for run in index.list_runs().runs] == ["loaded"]
+
+
+def test_keyset_pagination_walks_all_runs(tmp_path):
+    """
+    Following next_cursor returns every run exactly once, newest first, including runs started at the same time.
+    """
+    index = Run_index_service(tmp_path / "index" / "index.sqlite3")
+    for i in range(7):
+        index.upsert(_task_result(f"run-{i}", started_minute=i // 2))
+
+    seen = []
+    cursor = None
+    while True:
+        page = index.list_runs(limit=3, cursor=cursor)
+        seen.extend(run.run_id for run in page.runs)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == ["run-6", "run-5", "run-4", "run-3", "run-2", "run-1", "run-0"]
+
+
+def test_filters(tmp_path):
+    """
+    branch, status and commit SHA prefix filters can be combined.
+    """
+    index = Run_index_service(tmp_path / "index" / "index.sqlite3")
+    index.upsert(_task_result("a", 0, branch="main", commit_sha="aaa111"))
+    index.upsert(_task_result("b", 1, branch="dev", commit_sha="aab222"))
+    index.upsert(_task_result("c", 2, branch="dev", commit_sha="bbb333", status="failure"))
+
+    assert [r.run_id for r in index.list_runs(branch="dev").runs] == ["c", "b"]
+    assert [r.run_id for r in index.list_runs(status="failure").runs] == ["c"]
+    assert [r.run_id for r in index.list_runs(commit_sha="AA").runs] == ["b", "a"]
+    assert [r.run_id for r in index.list_runs(branch="dev", commit_sha="aa").runs] == ["b"]
+
+
+def test_invalid_cursor_and_sha_prefix(tmp_path):
+    index = Run_index_service(tmp_path / "index" / "index.sqlite3")
+
+    with pytest.raises(ValueError):
+        index.list_runs(cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        index.list_runs(commit_sha="abc*")
+
+
+def test_find_build_returns_successful_run_of_same_tree(tmp_path):
+    """
+    A remembered build is found for the same tree and config hash while its run succeeded.
+    """
+    index = Run_index_service(tmp_path / "index.sqlite3")
+    index.upsert(_task_result("ok", 0))
+    index.remember_build("tree", "config", "ok")
+
+    assert index.find_build("tree", "config") == "ok"
+    assert index.find_build("tree", "other-config") is None
+    assert index.find_build("other-tree", "config") is None
+
+    index.upsert(_task_result("ok", 0, status="failure"))
+    assert index.find_build("tree", "config") is None
@@ -1,3 +1,6 @@
+import os
+import threading
+import time
 from pathlib import Path
 
 from basic_ci.services.ServiceCommand import ServiceCommand
@@ -22,4 +25,74 @@ def test_command_error():
     service = ServiceCommand()
     result =service.run_command(["vs?fwfiVäÅäl"], Path("."))
     assert result.returncode != 0  # Non-zero means error
-    assert result.stderr != ""  # There should be an error message in stderr
\ No newline at end of file
+    assert result.stderr != ""  # There should be an error message in stderr
+
+def test_command_runs_in_own_process_group():
+    """
+    Each command gets its own process group so concurrent runs can be killed separately.
+    """
+    service = ServiceCommand()
+    result = service.run_command(["ps", "-o", "pgid=", "-p", "$$"], Path("."))
+    assert result.returncode == 0
+    assert int(result.stdout.strip()) != os.getpgrp()
+
+
+def test_cancelled_command_is_killed():
+    """
+    Setting the cancel event kills the running command and its children.
+    """
+    service = ServiceCommand()
+    cancel_event = threading.Event()
+    threading.Timer(0.3, cancel_event.set).start()
+
+    start = time.monotonic()
+    result = service.run_command(["sleep", "30"], Path("."), cancel_event=cancel_event)
+
+    assert time.monotonic() - start < 10
+    assert result.returncode != 0
+
+
+def test_stream_command_writes_output_to_log(tmp_path: Path):
+    """
+    stdout and stderr of a streamed command end up in the log file, not in the result.
+    """
+    service = ServiceCommand()
+    log_path = tmp_path / "logs" / "stage.log"
+
+    result = service.stream_command(["echo out; echo err 1>&2"], tmp_path, log_path)
+
+    assert result.returncode == 0
+    assert result.stdout == ""
+    assert log_path.read_text() == "out\nerr\n"
+
+
+def test_stream_command_large_output(tmp_path: Path):
+    """
+    Output larger than the chunk size is copied completely.
+    """
+    service = ServiceCommand()
+    log_path = tmp_path / "stage.log"
+
+    result = service.stream_command(["head -c 1000000 /dev/zero"], tmp_path, log_path)
+
+    assert result.returncode == 0
+    assert log_path.stat().st_size == 1000000
+
+
+def test_command_records_timing_and_resources(tmp_path: Path):
+    """
+    The result contains wall-clock times, CPU times and the peak RSS of the command.
+    """
+    service = ServiceCommand()
+
+    result = service.stream_command(
+        ["python3 -c 'x = bytearray(50 * 1024 * 1024); sum(range(3000000))'"],
+        tmp_path,
+        tmp_path / "stage.log",
+    )
+
+    assert result.returncode == 0
+    assert result.started_at <= result.finished_at
+    assert result.wall_time > 0
+    assert result.user_time + result.sys_time > 0
+    assert result.max_rss_kb > 50 * 1024
@@ -0,0 +1,37 @@
+from basic_ci.schemes.stage_result import Stage_result
+from basic_ci.services.stage_cache_service import Stage_cache
+
+
+def _stage_result(name: str) -> Stage_result:
+    return Stage_result(name=name, success=True, command="make check", output="lots of output", exit_code=0)
+
+
+def test_put_and_get_without_output(tmp_path):
+    """
+    A stored result is returned for its key, without its output.
+    """
+    cache = Stage_cache(tmp_path / "cache" / "stage_cache.sqlite3")
+    cache.put("key", _stage_result("check"))
+
+    stored = cache.get("key")
+
+    assert stored is not None
+    assert stored.name == "check" and stored.success and stored.exit_code == 0
+    assert stored.output == ""
+    assert cache.get("other") is None
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    """
+    Beyond max_entries the result that was used least recently is evicted.
+    """
+    cache = Stage_cache(tmp_path / "stage_cache.sqlite3", max_entries=2)
+    cache.put("a", _stage_result("a"))
+    cache.put("b", _stage_result("b"))
+    assert cache.get("a") is not None
+
+    cache.put("c", _stage_result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats() == {"entries": 2, "max_entries": 2}
@@ -0,0 +1,108 @@
+import gzip
+
+from basic_ci.services.stage_log_store import Stage_log_store
+
+CONTENT = b"".join(f"line {i}\n".encode() for i in range(100)) + b"no newline"
+
+
+def _store() -> Stage_log_store:
+    store = Stage_log_store()
+    store.BLOCK_SIZE = 64  # many small blocks
+    return store
+
+
+def test_write_compressed_splits_log_into_line_blocks(tmp_path):
+    """
+    The log is a valid gzip file made of several blocks that start at line boundaries.
+    """
+    path = tmp_path / "00_test.log.gz"
+
+    log_index = _store().write_compressed(path, [CONTENT[:100], CONTENT[100:]])
+
+    assert gzip.decompress(path.read_bytes()) == CONTENT
+    assert (tmp_path / "00_test.log.gz.idx").exists()
+    assert log_index.size == len(CONTENT)
+    assert log_index.lines == 101
+    assert len(log_index.blocks) > 5
+    for raw_offset, _, first_line in log_index.blocks[1:]:
+        assert CONTENT[raw_offset - 1:raw_offset] == b"\n"
+        assert CONTENT[:raw_offset].count(b"\n") == first_line
+
+
+def test_long_lines_are_cut_into_blocks(tmp_path):
+    """
+    Output without line breaks is not buffered as a whole but cut into blocks,
+    lines and byte ranges spanning several blocks are read back in full.
+    """
+    path = tmp_path / "00_test.log.gz"
+    store = _store()
+    long_line = b"#" * 1000
+    content = b"first\n" + long_line + b"\nlast\n" + long_line
+    chunks = [content[i:i + 10] for i in range(0, len(content), 10)]
+
+    log_index = store.write_compressed(path, chunks)
+
+    assert gzip.decompress(path.read_bytes()) == content
+    assert log_index.lines == 4
+    sizes = [end[0] - start[0] for start, end in zip(log_index.blocks, log_index.blocks[1:])]
+    assert max(sizes) <= store.BLOCK_SIZE + 10
+    assert store.read_lines(path, 1, 2).lines == [long_line.decode(), "last"]
+    assert store.read_lines(path, 3, 1).lines == [long_line.decode()]
+    assert b"".join(store.iter_range(path, 500, 900)) == content[500:900]
+
+
+def test_iter_range_reads_only_requested_bytes(tmp_path):
+    """
+    Byte ranges are read from the compressed blocks, starting anywhere in the log.
+    """
+    path = tmp_path / "00_test.log.gz"
+    store = _store()
+    store.write_compressed(path, [CONTENT])
+
+    for start, end in [(0, 10), (63, 200), (500, None), (len(CONTENT) - 3, len(CONTENT) + 10)]:
+        assert b"".join(store.iter_range(path, start, end)) == CONTENT[start:end]
+
+
+def test_read_lines_windows_and_tail(tmp_path):
+    """
+    A window of lines can be read from any line, without offset the last lines are returned.
+    """
+    path = tmp_path / "00_test.log.gz"
+    store = _store()
+    store.write_compressed(path, [CONTENT])
+
+    page = store.read_lines(path, 42, 3)
+    assert (page.offset, page.lines, page.total_lines) == (42, ["line 42", "line 43", "line 44"], 101)
+    tail = store.read_lines(path, None, 2)
+    assert (tail.offset, tail.lines) == (99, ["line 99", "no newline"])
+    assert store.read_lines(path, 500, 10).lines == []
+
+
+def test_plain_and_unindexed_logs_are_read_the_same_way(tmp_path):
+    """
+    Plain logs of running stages and compressed logs without index are scanned.
+    """
+    plain_path = tmp_path / "00_test.log"
+    plain_path.write_bytes(CONTENT)
+    gzip_path = tmp_path / "01_test.log.gz"
+    gzip_path.write_bytes(gzip.compress(CONTENT))
+    store = Stage_log_store()
+
+    for path in (plain_path, gzip_path):
+        assert store.index(path).lines == 101
+        assert b"".join(store.iter_range(path, 5, 20)) == CONTENT[5:20]
+        assert store.read_lines(path, 10, 1).lines == ["line 10"]
+
+
+def test_empty_log(tmp_path):
+    """
+    A stage without output is stored as an empty but readable log.
+    """
+    path = tmp_path / "00_test.log.gz"
+    store = Stage_log_store()
+
+    log_index = store.write_compressed(path, [])
+
+    assert (log_index.size, log_index.lines) == (0, 0)
+    assert list(store.iter_range(path)) == []
+    assert store.read_lines(path, None, 10).lines == []
@@ -0,0 +1,51 @@
+from basic_ci.schemes.TaskResult import TaskResult
+from basic_ci.services.task_result_cache import Task_result_cache
+
+
+def _task_result(run_id: str) -> TaskResult:
+    return TaskResult(run_id=run_id, repo_url="u", branch="main", commit_sha="abc", status="success")
+
+
+def test_get_counts_hits_and_misses_and_checks_version():
+    """
+    A cached result is only returned for the same file version.
+    """
+    cache = Task_result_cache()
+    result = _task_result("r1")
+    cache.put("r1", (1, 10), result, '"etag"')
+
+    assert cache.get("r1", (1, 10)) == (result, '"etag"')
+    assert cache.get("r1", (2, 10)) is None
+    assert cache.get("r2", (1, 10)) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_evicts_least_recently_used_by_entries_and_bytes():
+    """
+    The least recently used runs are evicted once the entry or byte limit is exceeded.
+    """
+    cache = Task_result_cache(max_entries=2, max_bytes=100)
+    cache.put("r1", (1, 10), _task_result("r1"), "e")
+    cache.put("r2", (1, 10), _task_result("r2"), "e")
+    cache.get("r1", (1, 10))
+    cache.put("r3", (1, 10), _task_result("r3"), "e")
+
+    assert cache.get("r2", (1, 10)) is None
+    assert cache.get("r1", (1, 10)) is not None
+
+    cache.put("r4", (1, 95), _task_result("r4"), "e")
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 95
+    assert cache.evictions == 3
+
+
+def test_disabled_and_oversized_entries_are_not_cached():
+    """
+    A limit of 0 disables the cache and results larger than max_bytes are never cached.
+    """
+    disabled = Task_result_cache(max_entries=0)
+    disabled.put("r1", (1, 10), _task_result("r1"), "e")
+    small = Task_result_cache(max_bytes=5)
+    small.put("r1", (1, 10), _task_result("r1"), "e")
+
+    assert disabled.stats()["entries"] == small.stats()["entries"] == 0
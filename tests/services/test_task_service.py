@@ -224,4 +224,30 @@ def test_unique_run_ids_for_different_commits():
     
     assert task1.run_id == "run-commit_abc"
     assert task2.run_id == "run-commit_def"
-    assert task1.run_id != task2.run_id
\ No newline at end of file
+    assert task1.run_id != task2.run_id
+
+def test_create_task_takes_tree_id_of_head_commit():
+    """
+    The tree of the head commit is passed on with the task, it is the key of the build cache.
+    """
+    uid = MockUIDService()
+    service = TaskService(uid, task_runner=MagicMock())
+
+    dict_payload = _minimal_push_payload(after="deadbeef")
+    dict_payload["head_commit"] = {
+        "id": "deadbeef",
+        "message": "msg",
+        "timestamp": "2026-01-01T12:00:00Z",
+        "url": "https://github.com/owner/repo/commit/deadbeef",
+        "tree_id": "tree123",
+        "distinct": True,
+        "added": [],
+        "modified": [],
+        "removed": [],
+        "author": {"name": "alice", "email": None},
+        "committer": {"name": "alice", "email": None},
+    }
+    task = service.create_task(Push_payload.model_validate(dict_payload))
+
+    assert task.tree_id == "tree123"
+    assert service.create_task(_minimal_push_payload_obj()).tree_id is None
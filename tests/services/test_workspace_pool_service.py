@@ -0,0 +1,82 @@
+import threading
+from pathlib import Path
+
+from git import Actor, Repo
+
+from basic_ci.services.gitclone_service import GitcloneService
+from basic_ci.services.workspace_pool_service import Workspace_pool
+
+
+def _commit(repo: Repo, content: str) -> str:
+    actor = Actor("CI", "ci@example.com")
+    (Path(repo.working_dir) / "file.txt").write_text(content)
+    repo.index.add(["file.txt"])
+    return repo.index.commit(content, author=actor, committer=actor).hexsha
+
+
+def _pool(tmp_path: Path, **options) -> tuple[Workspace_pool, Repo]:
+    origin = Repo.init(tmp_path / "origin")
+    pool = Workspace_pool(
+        tmp_path / "pool", size=1, git_service=GitcloneService(origin.working_dir),
+        keep_paths=[".venv"], **options,
+    )
+    return pool, origin
+
+
+def test_workspace_is_reset_for_the_next_commit(tmp_path):
+    """
+    The second run reuses the checkout, fetches its new commit and removes untracked
+    files except the kept paths.
+    """
+    pool, origin = _pool(tmp_path)
+    first = _commit(origin, "one")
+
+    workspace = pool.acquire()
+    assert pool.checkout(workspace, first) is False
+    (workspace / "build.out").write_text("artifact")
+    (workspace / ".venv").mkdir()
+    (workspace / "file.txt").write_text("modified")
+    pool.release(workspace)
+
+    second = _commit(origin, "two")
+    workspace = pool.acquire()
+    assert pool.checkout(workspace, second) is True
+
+    assert Repo(workspace).head.commit.hexsha == second
+    assert (workspace / "file.txt").read_text() == "two"
+    assert not (workspace / "build.out").exists()
+    assert (workspace / ".venv").is_dir()
+    assert pool.stats() == {"size": 1, "free": 0, "reused": 1, "cloned": 1}
+
+
+def test_broken_or_worn_workspace_is_cloned_again(tmp_path):
+    """
+    A workspace failing the health check or used max_uses times is cloned again.
+    """
+    pool, origin = _pool(tmp_path, max_uses=2)
+    sha = _commit(origin, "one")
+    workspace = pool.acquire()
+
+    pool.checkout(workspace, sha)
+    (workspace / ".git" / "HEAD").write_text("garbage")
+    assert pool.checkout(workspace, sha) is False
+    assert pool.checkout(workspace, sha) is True
+    assert pool.checkout(workspace, sha) is False
+    assert (workspace / "file.txt").read_text() == "one"
+
+
+def test_acquire_waits_for_a_free_workspace(tmp_path):
+    """
+    With all workspaces leased the next run waits until one is released.
+    """
+    pool, _ = _pool(tmp_path)
+    workspace = pool.acquire()
+    leased = []
+    waiter = threading.Thread(target=lambda: leased.append(pool.acquire()))
+    waiter.start()
+    waiter.join(0.2)
+    assert leased == []
+
+    pool.release(workspace)
+    waiter.join(5)
+    assert leased == [workspace]
@@ -0,0 +1,67 @@
+import threading
+
+from basic_ci.services.workspace_reaper_service import Workspace_reaper
+
+
+def test_discard_moves_workspace_away_and_deletes_it(tmp_path):
+    """
+    The workspace disappears from its place at once and is deleted in the background.
+    """
+    workspace = tmp_path / ("a" * 24)
+    (workspace / ".venv").mkdir(parents=True)
+    (workspace / ".venv" / "file").write_text("x")
+    reaper = Workspace_reaper(tmp_path / "trash")
+
+    reaper.discard(workspace)
+    assert not workspace.exists()
+    reaper.wait(timeout=5)
+
+    assert list((tmp_path / "trash").iterdir()) == []
+    assert reaper.stats() == {"pending": 0, "deleted": 1}
+
+
+def test_deletions_are_bounded_by_workers(tmp_path, monkeypatch):
+    """
+    No more than `workers` folders are deleted at the same time.
+    """
+    reaper = Workspace_reaper(tmp_path / "trash", workers=2)
+    running, most = [0], [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def slow_rmtree(path):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+
+    monkeypatch.setattr("basic_ci.services.workspace_reaper_service.shutil.rmtree", slow_rmtree)
+    for i in range(5):
+        (tmp_path / f"workspace{i}").mkdir()
+        reaper.discard(tmp_path / f"workspace{i}")
+    threading.Timer(0.2, release.set).start()
+    reaper.wait(timeout=5)
+
+    assert most[0] == 2
+    assert reaper.stats()["deleted"] == 5
+
+
+def test_sweep_removes_trash_and_workspaces_of_crashed_runs(tmp_path):
+    """
+    At startup the trash is emptied and workspaces of saved runs are deleted, other
+    folders in the temp folder are left alone.
+    """
+    temp, save = tmp_path / "tmp", tmp_path / "results"
+    crashed, foreign, unknown = "a" * 24, "other-program", "b" * 24
+    for name in (crashed, foreign, unknown):
+        (temp / name).mkdir(parents=True)
+    (save / crashed).mkdir(parents=True)
+    (tmp_path / "trash" / "left-over").mkdir(parents=True)
+    reaper = Workspace_reaper(tmp_path / "trash", workers=0)
+
+    assert reaper.sweep(temp, save) == 2
+
+    assert sorted(path.name for path in temp.iterdir()) == [unknown, foreign]
+    assert list((tmp_path / "trash").iterdir()) == []